@@ -5,9 +5,11 @@ import sys
 import queue
 from pathlib import Path
 from src.device.serial_device_controller import SerialDeviceController
+from src.device.transaction_scheduler import TransactionScheduler
 from src.gui.gui import DeviceGUI
 from src.device.device_poller import DevicePoller
 from src.device.device_model import DeviceModel
+from src.device.connection_supervisor import ConnectionSupervisor
 from src.fireballProxy.fireballProxy import FireballProxy
 from src.device.Desint_controller import ArduinoDesint
 
@@ -41,10 +43,15 @@ def main():
         device_id=config.get("device_id", 3),
     )
 
+    # Все обращения к порту идут через планировщик: остановка вне очереди опроса
+    scheduler = TransactionScheduler(controller)
+
     # Создаем poller
-    poller = DevicePoller(controller, interval=0.005)
+    poller = DevicePoller(scheduler, interval=0.005)
     desint = ArduinoDesint()
-    model = DeviceModel(controller, config, poller, desint)
+    model = DeviceModel(scheduler, config, poller, desint)
+    # Переподключение при сбросе/отключении USB-адаптера
+    model.init_supervisor(ConnectionSupervisor(model))
 
     app = DeviceGUI(model, desint)
 
@@ -9,8 +9,56 @@ CRC7_POLYNOMIAL = 0x89  # x^7 + x^3 + 1
 DEFAULT_PORT = "COM3"        # или "/dev/ttyUSB0" для Linux
 DEFAULT_BAUDRATE = 38400
 DEFAULT_DEVICE_ID = 0x03     # Адрес устройства (MY_ADDRESS)
-READ_TIMEOUT = 2.0
+READ_TIMEOUT = 2.0           # верхняя граница адаптивного таймаута ответа
 WRITE_TIMEOUT = 2.0
+# Предельное ожидание результата вызова асинхронного контроллера из потока, с
+ASYNC_CALL_TIMEOUT = 5.0
+# Адаптивный таймаут ответа (сверх времени передачи кадров), с
+MIN_RESPONSE_TIMEOUT = 0.003
+INITIAL_RESPONSE_TIMEOUT = 0.1
+# Срок актуальности теневой копии регистров настроек, с
+SHADOW_TTL = 5.0
+# Поиск устройства: скорости порта (по порядку) и общий лимит времени поиска, с
+DISCOVERY_BAUDRATES = (38400, 115200, 57600, 19200, 9600)
+DISCOVERY_TIMEOUT = 0.3
+# Переподключение при потере порта: пауза между попытками (растёт вдвое), с
+RECONNECT_MIN_BACKOFF = 0.2
+RECONNECT_MAX_BACKOFF = 5.0
+# Пауза опроса, пока порт не подключен, с
+DISCONNECTED_POLL_INTERVAL = 0.1
+# Частоты фонового опроса регистров, Гц
+POLL_RATE_STATUS = 200
+POLL_RATE_PERIOD = 20
+# Частоты опроса по фазам процесса (см. PollPolicy), Гц
+POLL_RATE_STATUS_IDLE = 50
+# в фазах движения - остаток доли шины после регистров периода, но не больше
+# этой частоты (170-200 Гц при 38400 бод в зависимости от задержки ответа,
+# 400 Гц при 115200)
+POLL_RATE_STATUS_ACTIVE = 400
+POLL_RATE_PERIOD_ACTIVE = 50
+# Глубина истории опроса на регистр, записей (65536 - около 160 с при 400 Гц)
+HISTORY_CAPACITY = 65536
+# Автомат цикла подачи: повторы неподтверждённой команды и длина журнала переходов
+FSM_COMMAND_RETRIES = 3
+FSM_TRACE_SIZE = 200
+# Последовательности шагов: последние секунды ожидания без Event.wait (точность старта шага)
+SEQUENCE_SPIN = 0.002
+# Серия циклов: пауза между циклами, предельная длительность цикла и ожидание старта, с
+BATCH_GAP = 5.0
+BATCH_RUN_TIMEOUT = 600.0
+BATCH_START_TIMEOUT = 5.0
+# Период обновления окна, мс (фронты битов статуса между обновлениями копятся в подписке StateStream)
+GUI_REFRESH_INTERVAL = 20
+# Доля пропускной способности шины, которую может занимать фоновый опрос
+POLL_BUS_BUDGET = 0.8
+# Часть пакета фонового опроса между проверками очереди, кадров (не меньше набора опроса)
+PREEMPT_FRAMES = 3
+
+# Приоритеты транзакций (меньше - важнее), см. TransactionScheduler
+PRIORITY_EMERGENCY = 0       # аварийная остановка
+PRIORITY_CONTROL = 1         # команды управления
+PRIORITY_SETTINGS = 2        # чтение/запись настроек
+PRIORITY_POLL = 3            # фоновый опрос
 
 # Адреса регистров
 REG_STATUS = 0x00
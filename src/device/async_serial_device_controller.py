@@ -0,0 +1,359 @@
+"""Модуль асинхронной работы с устройством по RS232 (VMK Protocol, CRC7) на asyncio"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+import serial
+from src import constants as C
+from src.vmk_codec import VmkCodec, VmkStreamDecoder, FRAME_SIZE
+from src.device.rtt_estimator import RttEstimator, frame_time
+
+
+class _Transaction:
+    """Запрос клиента в очереди контроллера"""
+
+    __slots__ = ("request", "expected", "future")
+
+    def __init__(self, request, expected, future):
+        self.request = request
+        self.expected = expected
+        self.future = future
+
+
+class AsyncSerialDeviceController:
+    """
+    Асинхронный контроллер: один порт, много логических клиентов.
+
+    Запросы клиентов попадают во внутреннюю очередь, обработчик очереди
+    объединяет подряд идущие запросы без общих адресов в одну посылку.
+    Приём идёт через неблокирующий порт: на POSIX - по готовности дескриптора
+    (loop.add_reader), иначе - опросом буфера порта с шагом в один кадр.
+    """
+
+    def __init__(self, port=C.DEFAULT_PORT, baudrate=C.DEFAULT_BAUDRATE,
+                 device_id=C.DEFAULT_DEVICE_ID, timeout=C.READ_TIMEOUT, max_coalesce=16):
+        """
+        :param max_coalesce: сколько запросов клиентов можно объединить в одну посылку
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.codec = VmkCodec(device_id)
+        self.decoder = VmkStreamDecoder(self.codec.device_id)
+        self.timeout = timeout
+        self.max_coalesce = max_coalesce
+        self.serial = None
+
+        self.rtt = {}
+        self.link_rtt = RttEstimator(max_timeout=timeout)
+        self.timeouts = 0
+        self.transactions = 0
+        self.bursts = 0
+
+        self._loop = None
+        self._queue = None
+        self._carry = None
+        self._worker_task = None
+        self._reader_task = None
+        self._use_add_reader = False
+        # текущая посылка: ожидаемые адреса и событие завершения
+        self._inflight = None
+        self._waiting = 0
+        self._done = None
+        self._sent_time = 0.0
+        self._sent_frames = 0
+        self._received = 0
+
+    @property
+    def device_id(self):
+        return self.codec.device_id
+
+    async def connect(self, port=None, baudrate=None, timeout=None):
+        """Открывает COM-порт в неблокирующем режиме и запускает обработчик очереди"""
+        if port:
+            self.port = port
+        if baudrate:
+            self.baudrate = baudrate
+        if timeout is not None:
+            self.timeout = timeout
+        self._loop = asyncio.get_running_loop()
+        try:
+            self.serial = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
+                timeout=0,
+                write_timeout=C.WRITE_TIMEOUT
+            )
+        except Exception as e:
+            print(f"[ERROR] Не удалось открыть {self.port}: {e}")
+            self.serial = None
+            return False
+
+        self.decoder.reset()
+        self.rtt = {}
+        self.link_rtt = RttEstimator(max_timeout=self.timeout)
+        self._queue = asyncio.Queue()
+        self._carry = None
+        try:
+            self._loop.add_reader(self.serial.fileno(), self._on_readable)
+            self._use_add_reader = True
+        except (AttributeError, NotImplementedError, OSError):
+            self._use_add_reader = False
+            self._reader_task = self._loop.create_task(self._poll_reader())
+        self._worker_task = self._loop.create_task(self._worker())
+        return True
+
+    async def disconnect(self):
+        """Останавливает обработчик и закрывает порт"""
+        self._release()
+
+    def _release(self):
+        """
+        Снимает обработчики приёма и очереди и закрывает порт; клиенты,
+        не дождавшиеся ответа, получают пустой результат.
+        """
+        current = asyncio.current_task() if self._loop is not None and self._loop.is_running() else None
+        for task in (self._worker_task, self._reader_task):
+            # посылку в работе завершает finally обработчика очереди
+            if task is not None and task is not current:
+                task.cancel()
+        self._worker_task = None
+        self._reader_task = None
+        if self.serial is not None:
+            if self._use_add_reader:
+                self._loop.remove_reader(self.serial.fileno())
+            if self.serial.is_open:
+                self.serial.close()
+            self.serial = None
+        if self._queue is not None:
+            pending = [self._carry] if self._carry is not None else []
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            for transaction in pending:
+                if not transaction.future.done():
+                    transaction.future.set_result(transaction.expected)
+            self._carry = None
+
+    def is_connected(self):
+        """Проверка состояния соединения"""
+        return self.serial is not None and self.serial.is_open
+
+    # ------------------- Приём -------------------
+
+    def _on_readable(self):
+        try:
+            data = self.serial.read(self.serial.in_waiting or 1)
+        except Exception as e:
+            # порт потерян: без снятия обработчика цикл событий вызывал бы его непрерывно
+            print(f"[ERROR] async read: {e}")
+            self._release()
+            return
+        if data:
+            self._on_data(data)
+
+    async def _poll_reader(self):
+        """Запасной вариант приёма для циклов без add_reader (Windows)"""
+        step = frame_time(self.baudrate)
+        while True:
+            try:
+                waiting = self.serial.in_waiting
+                if waiting:
+                    self._on_data(self.serial.read(waiting))
+            except Exception as e:
+                print(f"[ERROR] async read: {e}")
+                self._release()
+                return
+            await asyncio.sleep(step)
+
+    def _on_data(self, data):
+        expected = self._inflight
+        responded = []
+        frames = self.decoder.feed(data, time.perf_counter())
+        for _, address, value, timestamp in frames:
+            if expected is None or address not in expected or expected[address] is not None:
+                continue
+            expected[address] = value
+            self._received += 1
+            responded.append(address)
+            self._waiting -= 1
+
+        if responded:
+            # Время чтения - момент прихода последнего байта: точно оно только для
+            # последнего кадра чтения, у предыдущих задержка была бы завышена
+            if frames[-1][1] == responded[-1] and not self.decoder.pending_bytes():
+                address = responded.pop()
+                wire = frame_time(self.baudrate) * (self._sent_frames + self._received)
+                rtt = max(frames[-1][3] - self._sent_time - wire, 0.0)
+                self._estimator(address).sample(rtt)
+                self.link_rtt.sample(rtt)
+            for address in responded:
+                self._estimator(address).on_response()
+            if not self._waiting:
+                self._done.set()
+
+    def _estimator(self, address):
+        estimator = self.rtt.get(address)
+        if estimator is None:
+            estimator = self.rtt[address] = RttEstimator(max_timeout=self.timeout, link=self.link_rtt)
+        return estimator
+
+    # ------------------- Очередь запросов -------------------
+
+    async def _next_batch(self):
+        """Берёт из очереди подряд идущие запросы без пересечения адресов"""
+        first = self._carry if self._carry is not None else await self._queue.get()
+        self._carry = None
+        batch = [first]
+        addresses = set(first.expected)
+        while len(batch) < self.max_coalesce and not self._queue.empty():
+            transaction = self._queue.get_nowait()
+            if addresses.intersection(transaction.expected):
+                self._carry = transaction
+                break
+            batch.append(transaction)
+            addresses.update(transaction.expected)
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            expected = {}
+            for transaction in batch:
+                expected.update(transaction.expected)
+            request = b"".join(transaction.request for transaction in batch)
+            try:
+                await self._exchange(request, expected)
+            except Exception as e:
+                print(f"[ERROR] async exchange: {e}")
+            finally:
+                # и при отмене обработчика (disconnect): клиенты посылки не должны ждать вечно
+                self.bursts += 1
+                for transaction in batch:
+                    for addr in transaction.expected:
+                        transaction.expected[addr] = expected[addr]
+                    if not transaction.future.done():
+                        transaction.future.set_result(transaction.expected)
+
+    async def _exchange(self, request, expected):
+        frames = len(request) // FRAME_SIZE
+        wire = frame_time(self.baudrate) * (frames + len(expected))
+        timeout = wire + max(self._estimator(addr).timeout() for addr in expected)
+
+        self._inflight = expected
+        self._waiting = len(expected)
+        self._done = asyncio.Event()
+        self._received = 0
+        self._sent_frames = frames
+        self.serial.write(request)
+        self._sent_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            for addr, value in expected.items():
+                if value is None:
+                    self._estimator(addr).on_timeout()
+        finally:
+            self._inflight = None
+
+    async def _submit(self, request, expected):
+        if not self.is_connected():
+            return expected
+        future = self._loop.create_future()
+        self.transactions += 1
+        await self._queue.put(_Transaction(request, expected, future))
+        return await future
+
+    # ------------------- API -------------------
+
+    async def read_register(self, address):
+        """Чтение регистра"""
+        result = await self._submit(self.codec.read_frame(address), {address: None})
+        return result[address]
+
+    async def write_register(self, address, value):
+        """Запись в регистр"""
+        result = await self._submit(self.codec.write_frame(address, value), {address: None})
+        return result[address] is not None
+
+    async def read_registers(self, addresses):
+        """Пакетное чтение: dict addr -> value (None, если ответ не получен)"""
+        addresses = tuple(addresses)
+        if not addresses:
+            return {}
+        return await self._submit(self.codec.read_burst(addresses), dict.fromkeys(addresses))
+
+    async def write_registers(self, values):
+        """Пакетная запись: dict addr -> bool (подтверждена ли запись)"""
+        if not values:
+            return {}
+        request = b"".join(self.codec.write_frame(addr, value) for addr, value in values.items())
+        result = await self._submit(request, dict.fromkeys(values))
+        return {addr: ack is not None for addr, ack in result.items()}
+
+
+class AsyncControllerBridge:
+    """
+    Синхронный интерфейс SerialDeviceController поверх AsyncSerialDeviceController.
+
+    Цикл событий работает в отдельном потоке, поэтому DeviceModel, DevicePoller,
+    GUI и FireballProxy могут работать с асинхронным контроллером без изменений:
+    их запросы не держат общую блокировку порта и объединяются в общие посылки.
+    """
+
+    def __init__(self, controller: AsyncSerialDeviceController, call_timeout=C.ASYNC_CALL_TIMEOUT):
+        """:param call_timeout: предельное ожидание результата одного вызова, с"""
+        self.controller = controller
+        self.call_timeout = call_timeout
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def _call(self, coro, default=None):
+        """Выполнение в цикле событий; по таймауту вызов отменяется и возвращается default"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(self.call_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            print(f"[ERROR] async call: нет результата за {self.call_timeout} с")
+            return default
+
+    @property
+    def device_id(self):
+        return self.controller.device_id
+
+    def connect(self, port=None, baudrate=None, timeout=None):
+        return self._call(self.controller.connect(port, baudrate, timeout), False)
+
+    def disconnect(self):
+        self._call(self.controller.disconnect())
+
+    def is_connected(self):
+        return self.controller.is_connected()
+
+    # priority принимается для совместимости с TransactionScheduler и не используется
+
+    def read_register(self, address, priority=None):
+        return self._call(self.controller.read_register(address))
+
+    def write_register(self, address, value, priority=None):
+        return self._call(self.controller.write_register(address, value), False)
+
+    def read_registers(self, addresses, out=None, priority=None):
+        addresses = tuple(addresses)
+        result = self._call(self.controller.read_registers(addresses), dict.fromkeys(addresses))
+        if out is None:
+            return result
+        out.update(result)
+        return out
+
+    def write_registers(self, values, wait_ack=True, priority=None):
+        """
+        :param wait_ack: если False, посылка ставится в очередь без ожидания
+            подтверждений и возвращаются False, как у SerialDeviceController
+        """
+        if not wait_ack:
+            asyncio.run_coroutine_threadsafe(self.controller.write_registers(dict(values)), self.loop)
+            return dict.fromkeys(values, False)
+        return self._call(self.controller.write_registers(values), dict.fromkeys(values, False))
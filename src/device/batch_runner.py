@@ -0,0 +1,263 @@
+"""Модуль серийного запуска циклов подачи без оператора
+
+BatchRunner запускает подряд N циклов DeviceModel (старт, подача, возврат,
+продувка), выдерживая паузу между ними, и останавливает серию при сбое.
+Этапы и их длительности берутся из переходов FeederStateMachine. Каждый
+цикл дописывается строкой JSON в файл журнала вместе с настройками T_*,
+так что по журналу можно подбирать настройки на максимальную
+производительность (проб в час).
+"""
+
+import json
+import threading
+import time
+from collections import namedtuple
+from src import constants as C
+from src.device import feeder_fsm as fsm
+
+# stages: этап -> длительность, с; settings: настройки, с которыми шёл цикл
+RunRecord = namedtuple("RunRecord", ["index", "started", "duration_s", "stages", "ok", "reason", "settings"])
+
+# переходы в IDLE из этих этапов - нормальное завершение цикла
+_FINAL_STATES = (fsm.RETURN, fsm.PURGE)
+
+
+class BatchRunner:
+    """Серия циклов подачи одного дозатора"""
+
+    def __init__(self, model, runs, gap=C.BATCH_GAP, manual=False, on_desint=False, path=None,
+                 run_timeout=C.BATCH_RUN_TIMEOUT, start_timeout=C.BATCH_START_TIMEOUT):
+        """
+        :param model: DeviceModel
+        :param runs: число циклов
+        :param gap: пауза между концом цикла и следующим стартом, с
+        :param manual: цикл ведёт хост (SequenceEngine), иначе - CMD_START устройству
+        :param path: файл журнала циклов (JSON Lines, дописывается); None - без записи
+        :param run_timeout: предельная длительность цикла, с
+        :param start_timeout: сколько ждать выхода из IDLE после старта, с
+        """
+        self.model = model
+        self.runs = runs
+        self.gap = gap
+        self.manual = manual
+        self.on_desint = on_desint
+        self.path = path
+        self.run_timeout = run_timeout
+        self.start_timeout = start_timeout
+
+        self.records = []
+        self.running = False
+        self.reason = None
+        self.started = None
+        self.finished = None
+        self.thread = None
+        self.func_run = None
+
+        self._transitions = []
+        self._changed = threading.Condition()
+        self._cancel = threading.Event()
+        self._previous_func = None
+
+    def init_func_run(self, func):
+        """Передаём callback для завершённых циклов: func(RunRecord)"""
+        self.func_run = func
+
+    # ------------------- Управление -------------------
+
+    def start(self):
+        """Запуск серии в фоновом потоке; False - серия уже идёт"""
+        if self.running:
+            return False
+        self.running = True
+        self.reason = None
+        self.records = []
+        self._cancel.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return True
+
+    def cancel(self, reason="cancel"):
+        """Остановка серии: текущий цикл прерывается, моторы останавливаются"""
+        self.reason = reason
+        self._cancel.set()
+        with self._changed:
+            self._changed.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return not self.running
+
+    # ------------------- Серия -------------------
+
+    def _run(self):
+        machine = self.model.fsm
+        self._previous_func = machine.func_transition
+        machine.init_func_transition(self._on_transition)
+        self.started = time.monotonic()
+        self._log(f"[BATCH] Серия: {self.runs} циклов, пауза {self.gap} с")
+        try:
+            for index in range(self.runs):
+                if index and self._cancel.wait(self.gap):
+                    break
+                record = self._run_once(index)
+                self.records.append(record)
+                self._save(record)
+                if self.func_run:
+                    self.func_run(record)
+                self._log(f"[BATCH] Цикл {index + 1}/{self.runs}: {record.duration_s:.1f} с"
+                          + ("" if record.ok else f", сбой: {record.reason}"))
+                if not record.ok:
+                    self.reason = self.reason or record.reason
+                    break
+        except Exception as e:
+            self.reason = str(e)
+            print(f"[BatchRunner] Ошибка: {e}")
+        finally:
+            machine.init_func_transition(self._previous_func)
+            self.finished = time.monotonic()
+            self.running = False
+            stats = self.stats()
+            self._log(f"[BATCH] Серия завершена: {stats['completed']}/{self.runs}, "
+                      f"{stats['samples_per_hour']:.1f} проб/ч")
+
+    def _run_once(self, index):
+        model = self.model
+        machine = model.fsm
+        settings = self._settings()
+        with self._changed:
+            self._transitions = []
+        started = time.monotonic()
+
+        reason = self._fault()
+        if reason is None and machine.state != fsm.IDLE:
+            reason = f"цикл не завершён ({machine.state})"
+        if reason is None:
+            if self.manual:
+                ok = model.start_process_manual_init(self.on_desint)
+            else:
+                ok = model.start_process()
+            if not ok:
+                reason = "нет подтверждения старта"
+        if reason is None:
+            reason = self._wait_cycle(started)
+        if reason is not None and machine.state != fsm.IDLE:
+            self._stop()
+
+        with self._changed:
+            transitions = list(self._transitions)
+        finished = transitions[-1].timestamp if reason is None else time.monotonic()
+        return RunRecord(index, started, finished - started, self._stages(transitions, finished),
+                         reason is None, reason, settings)
+
+    def _wait_cycle(self, started):
+        """Ожидание выхода из IDLE и возврата в него; None - цикл завершён нормально"""
+        machine = self.model.fsm
+        with self._changed:
+            left_idle = False
+            while True:
+                if self._cancel.is_set():
+                    return self.reason
+                reason = self._fault()
+                if reason is not None:
+                    return reason
+                for transition in self._transitions:
+                    if transition.source == fsm.IDLE:
+                        left_idle = True
+                    elif left_idle and transition.target == fsm.IDLE:
+                        if transition.source in _FINAL_STATES and transition.reason != "stop":
+                            return None
+                        return f"прерван в {transition.source} ({transition.reason})"
+                elapsed = time.monotonic() - started
+                limit = self.run_timeout if left_idle else self.start_timeout
+                if elapsed >= limit:
+                    return f"таймаут в {machine.state}"
+                # ожидание перехода; соединение проверяется не реже раза в секунду
+                self._changed.wait(min(limit - elapsed, 1.0))
+
+    def _on_transition(self, transition):
+        with self._changed:
+            self._transitions.append(transition)
+            self._changed.notify_all()
+        if self._previous_func:
+            self._previous_func(transition)
+
+    def _fault(self):
+        model = self.model
+        if not model.is_connected():
+            return "нет соединения"
+        supervisor = model.supervisor
+        if supervisor is not None and supervisor.state == "degraded":
+            return "соединение восстанавливается"
+        return None
+
+    def _stop(self):
+        model = self.model
+        if self.manual:
+            model.stop_process_manual()
+        else:
+            model.stop_process()
+            model.motor1_stop()
+            model.motor2_stop()
+
+    def _settings(self):
+        settings = dict(self.model.read_timings())
+        settings["increase_back_speed"] = bool(self.model.increase_back_speed)
+        settings["manual"] = self.manual
+        return settings
+
+    @staticmethod
+    def _stages(transitions, finished):
+        """Длительность каждого этапа цикла, с (повторные заходы суммируются)"""
+        stages = {}
+        for current, following in zip(transitions, transitions[1:] + [None]):
+            if current.target == fsm.IDLE:
+                continue
+            end = following.timestamp if following is not None else finished
+            stages[current.target] = stages.get(current.target, 0.0) + end - current.timestamp
+        return stages
+
+    # ------------------- Журнал и сводка -------------------
+
+    def _save(self, record):
+        if self.path is None:
+            return
+        line = dict(record._asdict(), wall_time=time.time() - (time.monotonic() - record.started))
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"[BatchRunner] Ошибка записи журнала: {e}")
+
+    def _log(self, message):
+        if self.model.command_loger is not None:
+            self.model.command_loger(message)
+
+    def stats(self):
+        """
+        Сводка серии. samples_per_hour - по фактическому времени серии
+        (циклы и паузы между ними), cycle_per_hour - предел без пауз.
+        """
+        records = self.records
+        completed = [record for record in records if record.ok]
+        end = self.finished if not self.running and self.finished else time.monotonic()
+        elapsed = end - self.started if self.started is not None else 0.0
+        mean = sum(record.duration_s for record in completed) / len(completed) if completed else 0.0
+        stages = {}
+        for record in completed:
+            for stage, seconds in record.stages.items():
+                stages[stage] = stages.get(stage, 0.0) + seconds / len(completed)
+        return {
+            "runs": len(records),
+            "completed": len(completed),
+            "failed": len(records) - len(completed),
+            "running": self.running,
+            "reason": self.reason,
+            "elapsed_s": elapsed,
+            "mean_cycle_s": mean,
+            "mean_stage_s": stages,
+            "samples_per_hour": len(completed) * 3600 / elapsed if elapsed > 0 else 0.0,
+            "cycle_per_hour": 3600 / mean if mean else 0.0,
+        }
@@ -0,0 +1,192 @@
+"""Модуль записи и воспроизведения обмена по VMK протоколу
+
+Формат файла: заголовок HEADER, затем записи RECORD фиксированной длины
+(15 байт). Каждая запись - один кадр или его часть:
+    ts_ns   u64  время time.monotonic_ns() отправки/приёма
+    dir     u8   DIR_TX (запрос) или DIR_RX (ответ)
+    length  u8   число байт кадра (5, меньше - кадр с потерянными байтами)
+    data    5s   байты кадра, дополненные нулями
+Фиксированная длина записей позволяет открывать файл через numpy.memmap.
+"""
+
+import struct
+import time
+from src.vmk_codec import VmkStreamDecoder, FRAME_SIZE, FRAME_MARKER
+
+MAGIC = b"VMKCAP01"
+HEADER = struct.Struct("<8sII")      # magic, скорость порта, резерв
+RECORD = struct.Struct("<QBB5s")
+DIR_TX = 0
+DIR_RX = 1
+
+
+class CaptureWriter:
+    """
+    Запись кадров в файл захвата.
+
+    Принятые байты разбиваются на кадры по байту-маркеру (старшие биты 11
+    есть только у первого байта кадра), поэтому кадры с потерянными или
+    искажёнными байтами сохраняются как есть и видны при разборе.
+    """
+
+    def __init__(self, path, baudrate=0, buffering=64 * 1024):
+        self.path = path
+        self.file = open(path, "wb", buffering=buffering)
+        self.file.write(HEADER.pack(MAGIC, baudrate, 0))
+        self._rx = bytearray()
+        self._rx_ts = 0
+        self.records = 0
+
+    def write_tx(self, data, ts_ns=None):
+        """Отправленная посылка (целое число кадров)"""
+        if ts_ns is None:
+            ts_ns = time.monotonic_ns()
+        pack = RECORD.pack
+        write = self.file.write
+        for pos in range(0, len(data), FRAME_SIZE):
+            frame = bytes(data[pos:pos + FRAME_SIZE])
+            write(pack(ts_ns, DIR_TX, len(frame), frame))
+        self.records += (len(data) + FRAME_SIZE - 1) // FRAME_SIZE
+
+    def write_rx(self, data, ts_ns=None):
+        """Принятые байты (произвольные куски потока)"""
+        if ts_ns is None:
+            ts_ns = time.monotonic_ns()
+        size = len(data)
+        # обычный случай: целые кадры без остатка от предыдущего приёма
+        if not self._rx and size % FRAME_SIZE == 0 \
+                and all(data[pos] & FRAME_MARKER == FRAME_MARKER for pos in range(0, size, FRAME_SIZE)):
+            pack = RECORD.pack
+            write = self.file.write
+            for pos in range(0, size, FRAME_SIZE):
+                write(pack(ts_ns, DIR_RX, FRAME_SIZE, bytes(data[pos:pos + FRAME_SIZE])))
+            self.records += size // FRAME_SIZE
+            return
+
+        for byte in bytes(data):
+            if byte & FRAME_MARKER == FRAME_MARKER and self._rx:
+                self._flush_rx()
+            if not self._rx:
+                self._rx_ts = ts_ns
+            self._rx.append(byte)
+            if len(self._rx) == FRAME_SIZE:
+                self._flush_rx()
+
+    def _flush_rx(self):
+        self.file.write(RECORD.pack(self._rx_ts, DIR_RX, len(self._rx), bytes(self._rx)))
+        self._rx.clear()
+        self.records += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self._rx:
+            self._flush_rx()
+        self.file.close()
+
+
+def read_capture(path):
+    """
+    Чтение файла захвата.
+
+    :return: (baudrate, генератор (ts_ns, direction, bytes))
+    """
+    f = open(path, "rb")
+    magic, baudrate, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        f.close()
+        raise ValueError(f"{path}: не файл захвата VMK")
+
+    def records():
+        with f:
+            size = RECORD.size
+            while True:
+                chunk = f.read(size * 4096)
+                if not chunk:
+                    break
+                for ts_ns, direction, length, data in RECORD.iter_unpack(chunk[:len(chunk) - len(chunk) % size]):
+                    yield ts_ns, direction, data[:length]
+
+    return baudrate, records()
+
+
+class ReplayController:
+    """
+    Контроллер-заглушка для воспроизведения: DeviceModel работает как с
+    подключённым устройством, но команды никуда не отправляются.
+    """
+
+    def __init__(self):
+        self.writes = []
+
+    def connect(self, port=None, baudrate=None, timeout=None):
+        return True
+
+    def disconnect(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def read_register(self, address, priority=None, device_id=None):
+        return None
+
+    def write_register(self, address, value, priority=None, device_id=None):
+        self.writes.append((address, value))
+        return False
+
+    def read_registers(self, addresses, out=None, priority=None, device_id=None):
+        result = out if out is not None else {}
+        for addr in addresses:
+            result[addr] = None
+        return result
+
+    def write_registers(self, values, wait_ack=True, priority=None, device_id=None):
+        self.writes.extend(values.items())
+        return dict.fromkeys(values, False)
+
+
+def replay(path, model=None, device_id=None, speed=None):
+    """
+    Прогоняет захват через декодер и (если задана) DeviceModel.
+
+    :param model: DeviceModel, получающая значения ответов через ingest()
+    :param device_id: учитывать ответы только этого устройства (None - всех)
+    :param speed: во сколько раз быстрее реального времени (None - без пауз)
+    :return: dict со статистикой воспроизведения
+    """
+    _, records = read_capture(path)
+    decoder = VmkStreamDecoder(device_id)
+    tx_decoder = VmkStreamDecoder(device_id)
+    counts = {"tx_frames": 0, "rx_frames": 0, "records": 0}
+    first_ts = last_ts = None
+    start = time.perf_counter()
+
+    for ts_ns, direction, data in records:
+        counts["records"] += 1
+        if first_ts is None:
+            first_ts = ts_ns
+        last_ts = ts_ns
+        if speed:
+            pause = (ts_ns - first_ts) / 1e9 / speed - (time.perf_counter() - start)
+            if pause > 0:
+                time.sleep(pause)
+        if direction == DIR_TX:
+            counts["tx_frames"] += len(tx_decoder.feed(data, ts_ns / 1e9))
+            continue
+        for _, address, value, _ in decoder.feed(data, ts_ns / 1e9):
+            counts["rx_frames"] += 1
+            if model is not None:
+                model.ingest(address, value, ts_ns / 1e9)
+                model.publish_state()
+
+    elapsed = time.perf_counter() - start
+    span = (last_ts - first_ts) / 1e9 if first_ts is not None else 0.0
+    return dict(
+        counts,
+        span_s=span,
+        elapsed_s=elapsed,
+        speedup=span / elapsed if elapsed else 0.0,
+        decoder=decoder.stats(),
+    )
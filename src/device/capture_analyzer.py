@@ -0,0 +1,181 @@
+"""Модуль пакетного (NumPy) разбора файлов захвата и потоков байт VMK
+
+Кадры разбираются и проверяются по CRC7 целиком массивами, без цикла
+по кадрам в Python, поэтому часовые захваты опроса 200 Гц (миллионы кадров)
+обрабатываются за секунды. Файл захвата открывается через numpy.memmap.
+"""
+
+import numpy as np
+from src import constants as C
+from src.vmk_codec import CRC7_FRAME_TABLES, FRAME_SIZE, FRAME_MARKER, WRITE_FLAG
+from src.device.capture import HEADER, MAGIC, DIR_RX, DIR_TX
+from src.device.status_word import STATUS_BITS
+
+# Запись файла захвата (см. capture.RECORD)
+RECORD_DTYPE = np.dtype([
+    ("ts", "<u8"),
+    ("dir", "u1"),
+    ("length", "u1"),
+    ("data", "u1", (FRAME_SIZE,)),
+])
+
+# Разобранный кадр
+FRAME_DTYPE = np.dtype([
+    ("ts", "<u8"),          # время, нс (time.monotonic_ns)
+    ("dir", "u1"),          # DIR_TX / DIR_RX
+    ("device_id", "u1"),
+    ("address", "u1"),
+    ("value", "<u2"),
+    ("write", "?"),
+    ("crc_ok", "?"),
+])
+
+_CRC_TABLES = np.array(CRC7_FRAME_TABLES, dtype=np.uint8)
+
+
+def load_capture(path):
+    """
+    Открывает файл захвата без чтения в память.
+
+    :return: (baudrate, массив записей RECORD_DTYPE на memmap)
+    """
+    with open(path, "rb") as f:
+        magic, baudrate, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path}: не файл захвата VMK")
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size)
+    return baudrate, records
+
+
+def _decode(data, valid):
+    """
+    Разбор массива кадров (N, 5).
+
+    :param valid: предварительная маска пригодности (например, длина записи == 5)
+    """
+    b1, b2, b3, b4, b5 = (data[:, i] for i in range(FRAME_SIZE))
+    crc = _CRC_TABLES[0][b1] ^ _CRC_TABLES[1][b2] ^ _CRC_TABLES[2][b3] ^ _CRC_TABLES[3][b4]
+    crc_ok = valid & ((b1 & FRAME_MARKER) == FRAME_MARKER) \
+        & (((b2 | b3 | b4 | b5) & 0x80) == 0) & (crc == b5)
+
+    value = ((b1.astype(np.uint16) >> 3) & 0x03) << 14 \
+        | (b3.astype(np.uint16) & 0x7F) << 7 | (b4.astype(np.uint16) & 0x7F)
+    frames = np.empty(len(data), dtype=FRAME_DTYPE)
+    frames["device_id"] = b1 & 0x07
+    frames["address"] = b2 & 0x7F
+    frames["value"] = value
+    frames["write"] = (b1 & WRITE_FLAG) != 0
+    frames["crc_ok"] = crc_ok
+    return frames
+
+
+def decode_records(records):
+    """Кадры из записей файла захвата (по одному на запись)"""
+    frames = _decode(np.asarray(records["data"]), np.asarray(records["length"]) == FRAME_SIZE)
+    frames["ts"] = records["ts"]
+    frames["dir"] = records["dir"]
+    return frames
+
+
+def decode_buffer(buf, ts=0, direction=DIR_RX):
+    """
+    Кадры из сырого потока байт (bytes, bytearray, memmap).
+
+    Кандидаты в кадры - все позиции байта-маркера; кандидат, не прошедший
+    проверку, остаётся в результате с crc_ok = False. Время у всех кадров
+    одинаковое (ts), так как в сыром потоке меток времени нет.
+    """
+    raw = np.frombuffer(buf, dtype=np.uint8) if not isinstance(buf, np.ndarray) else buf
+    if len(raw) < FRAME_SIZE:
+        return np.empty(0, dtype=FRAME_DTYPE)
+    starts = np.flatnonzero((raw[:len(raw) - FRAME_SIZE + 1] & FRAME_MARKER) == FRAME_MARKER)
+    data = raw[starts[:, None] + np.arange(FRAME_SIZE)]
+    frames = _decode(data, np.ones(len(starts), dtype=bool))
+    frames["ts"] = ts
+    frames["dir"] = direction
+    return frames
+
+
+def _runs(mask):
+    """Начала и концы (включительно) серий True в булевом массиве"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges[0::2], edges[1::2] - 1
+
+
+def error_bursts(frames, min_length=1):
+    """
+    Серии подряд идущих испорченных принятых кадров.
+
+    :return: структурированный массив (start_ns, end_ns, frames)
+    """
+    rx = frames[frames["dir"] == DIR_RX]
+    starts, ends = _runs(~rx["crc_ok"])
+    lengths = ends - starts + 1
+    keep = lengths >= min_length
+    bursts = np.empty(int(keep.sum()), dtype=[("start_ns", "<u8"), ("end_ns", "<u8"), ("frames", "<u4")])
+    bursts["start_ns"] = rx["ts"][starts[keep]]
+    bursts["end_ns"] = rx["ts"][ends[keep]]
+    bursts["frames"] = lengths[keep]
+    return bursts
+
+
+def status_dwell(frames, device_id=C.DEFAULT_DEVICE_ID):
+    """
+    Время пребывания битов статуса во включённом состоянии.
+
+    Серия считается от первого чтения статуса с установленным битом до
+    первого чтения со сброшенным битом (или до конца захвата).
+
+    :return: dict имя бита -> {count, total_s, mean_s, max_s, min_s}
+    """
+    status = frames[(frames["dir"] == DIR_RX) & frames["crc_ok"] & ~frames["write"]
+                    & (frames["address"] == C.REG_STATUS) & (frames["device_id"] == device_id)]
+    report = {}
+    if not len(status):
+        return report
+    ts = status["ts"].astype(np.int64)
+    words = status["value"]
+    for bit, name in STATUS_BITS.items():
+        starts, ends = _runs((words >> bit) & 1 == 1)
+        if not len(starts):
+            report[name] = {"count": 0, "total_s": 0.0, "mean_s": 0.0, "max_s": 0.0, "min_s": 0.0}
+            continue
+        # конец серии - первое чтение после неё, иначе последнее чтение захвата
+        stop = np.minimum(ends + 1, len(ts) - 1)
+        dwell = (ts[stop] - ts[starts]) / 1e9
+        report[name] = {
+            "count": int(len(dwell)),
+            "total_s": float(dwell.sum()),
+            "mean_s": float(dwell.mean()),
+            "max_s": float(dwell.max()),
+            "min_s": float(dwell.min()),
+        }
+    return report
+
+
+def summary(frames, device_id=C.DEFAULT_DEVICE_ID, top=10):
+    """Сводный отчёт по захвату"""
+    rx = frames["dir"] == DIR_RX
+    ok = frames["crc_ok"]
+    span = (int(frames["ts"][-1]) - int(frames["ts"][0])) / 1e9 if len(frames) else 0.0
+    addresses, counts = np.unique(frames["address"][rx & ok], return_counts=True)
+    bursts = error_bursts(frames)
+    worst = np.sort(bursts, order="frames")[::-1][:top]
+    return {
+        "frames": int(len(frames)),
+        "tx_frames": int((frames["dir"] == DIR_TX).sum()),
+        "rx_frames": int(rx.sum()),
+        "rx_errors": int((rx & ~ok).sum()),
+        "rx_error_rate": float((rx & ~ok).sum() / rx.sum()) if rx.any() else 0.0,
+        "span_s": span,
+        "rx_per_address": {f"0x{int(a):02X}": int(n) for a, n in zip(addresses, counts)},
+        "error_bursts": int(len(bursts)),
+        "worst_bursts": [
+            {"start_s": (int(b["start_ns"]) - int(frames["ts"][0])) / 1e9,
+             "duration_ms": (int(b["end_ns"]) - int(b["start_ns"])) / 1e6,
+             "frames": int(b["frames"])}
+            for b in worst
+        ],
+        "status_dwell": status_dwell(frames, device_id),
+    }
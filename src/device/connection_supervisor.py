@@ -0,0 +1,130 @@
+"""Модуль контроля соединения с устройством и автоматического переподключения"""
+
+import threading
+import time
+from src import constants as C
+
+
+class ConnectionSupervisor:
+    """
+    Следит за соединением DeviceModel и восстанавливает его после потери порта.
+
+    После разрыва (сброс или отключение USB-адаптера) порт переоткрывается
+    в фоновом потоке с растущей паузой между попытками. Соединение считается
+    восстановленным, когда устройство прошло verify_device(); после этого
+    настройки из теневой копии, снятой в момент разрыва, записываются обратно
+    (только отличающиеся от прочитанных с устройства).
+    """
+
+    def __init__(self, model, min_backoff=C.RECONNECT_MIN_BACKOFF, max_backoff=C.RECONNECT_MAX_BACKOFF,
+                 check_interval=0.05):
+        """
+        :param model: DeviceModel
+        :param check_interval: период проверки соединения, с
+        """
+        self.model = model
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+        self.port = None
+        self.baudrate = None
+        self.watching = False
+        self.running = True
+        self._wake = threading.Event()
+
+        # метрики
+        self.state = "stopped"
+        self.losses = 0
+        self.recoveries = 0
+        self.failed_attempts = 0
+        self.last_recover_time = 0.0
+        self.max_recover_time = 0.0
+        self.degraded_time = 0.0
+        self._degraded_since = None
+
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def watch(self, port, baudrate):
+        """Начать контроль подключения (вызывается после успешного connect)"""
+        self.port = port
+        self.baudrate = baudrate
+        self.watching = True
+        self.state = "connected"
+        self._wake.set()
+
+    def unwatch(self):
+        """Прекратить контроль (отключение по команде оператора)"""
+        self.watching = False
+        self._close_degraded()
+        self.state = "stopped"
+        # прерываем паузу между попытками переподключения
+        self._wake.set()
+
+    def close(self):
+        self.unwatch()
+        self.running = False
+        self._wake.set()
+        self.thread.join(timeout=1.0)
+
+    def metrics(self):
+        """Время восстановления и время работы без связи, с"""
+        degraded_now = time.monotonic() - self._degraded_since if self._degraded_since is not None else 0.0
+        return {
+            "state": self.state,
+            "losses": self.losses,
+            "recoveries": self.recoveries,
+            "failed_attempts": self.failed_attempts,
+            "last_recover_s": self.last_recover_time,
+            "max_recover_s": self.max_recover_time,
+            "degraded_s": self.degraded_time + degraded_now,
+            "degraded_now_s": degraded_now,
+        }
+
+    def _log(self, message):
+        if self.model.command_loger is not None:
+            self.model.command_loger(message)
+
+    def _close_degraded(self):
+        if self._degraded_since is not None:
+            self.degraded_time += time.monotonic() - self._degraded_since
+            self._degraded_since = None
+
+    def _loop(self):
+        while self.running:
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
+            if not self.watching or self.model.is_connected():
+                continue
+            self._recover()
+
+    def _recover(self):
+        self.losses += 1
+        self.state = "degraded"
+        self._degraded_since = time.monotonic()
+        snapshot = self.model.settings_snapshot()
+        self._log(f"[WARN] Связь с {self.port} потеряна, переподключение...")
+
+        backoff = self.min_backoff
+        while self.running and self.watching:
+            if self.model.controller.connect(self.port, self.baudrate) and self.model.verify_device():
+                if not self.watching:
+                    # оператор отключился, пока шло переподключение
+                    self.model.controller.disconnect()
+                    return
+                self.model.restore_settings(snapshot)
+                recover_time = time.monotonic() - self._degraded_since
+                self._close_degraded()
+                self.recoveries += 1
+                self.last_recover_time = recover_time
+                self.max_recover_time = max(self.max_recover_time, recover_time)
+                self.state = "connected"
+                self._log(f"[OK] Связь восстановлена за {recover_time:.2f} с")
+                return
+            if self.model.controller.is_connected():
+                # порт открылся, но устройство не ответило
+                self.model.controller.disconnect()
+            self.failed_attempts += 1
+            self._wake.wait(backoff)
+            self._wake.clear()
+            backoff = min(backoff * 2, self.max_backoff)
@@ -11,7 +11,7 @@ from constants import (
     REG_TEMPERATURE, REG_POSITION_LO, REG_POSITION_HI, REG_COMMAND, REG_SET_PRESSURE, REG_SET_POSITION,
     CMD_START, CMD_OPEN, CMD_CLOSE, CMD_STOP, CMD_SAVE_FLASH, CMD_MIDDLE_POSITION
 )
-from crc import crc7_generate
+from src.vmk_codec import VmkCodec
 
 
 class DeviceController:
@@ -21,7 +21,8 @@ class DeviceController:
         """Инициализация контроллера устройства"""
         self.ip = ip
         self.port = port
-        self.device_id = device_id & 0x07  # 3 бита (0-7)
+        self.codec = VmkCodec(device_id)  # 3 бита (0-7)
+        self.device_id = self.codec.device_id
         self.sock = None
         self.connection_lock = threading.Lock()
         self._init_queues()
@@ -87,39 +88,13 @@ class DeviceController:
 
     def _build_frame(self, address, write=False, data=0x0000):
         """Собирает кадр согласно протоколу."""
-        byte1 = (
-                0xC0 |
-                (0x20 if write else 0x00) |
-                ((data >> 15) & 0x01) << 4 |
-                ((data >> 14) & 0x01) << 3 |
-                self.device_id
-        )
-        byte2 = address & 0x7F
-        byte3 = (data >> 7) & 0x7F
-        byte4 = data & 0x7F
-
-        frame = bytes([byte1, byte2, byte3, byte4])
-        crc = crc7_generate(frame)
-        return frame + bytes([crc & 0x7F])
+        if write:
+            return self.codec.write_frame(address, data)
+        return self.codec.read_frame(address)
 
     def _parse_response(self, response, expected_address):
         """Парсит ответное сообщение."""
-        if len(response) != 5:
-            return None
-        if (response[0] & 0xC0) != 0xC0:
-            return None
-        if (response[0] & 0x07) != self.device_id:
-            return None
-        if (response[1] & 0x7F) != expected_address:
-            return None
-        if crc7_generate(response[:4]) != (response[4] & 0x7F):
-            return None
-
-        return (
-                ((response[0] >> 4) & 0x03) << 14 |
-                (response[2] & 0x7F) << 7 |
-                response[3] & 0x7F
-        )
+        return self.codec.decode(response, expected_address)
 
     def read_register(self, address):
         """Чтение регистра с автоматическим переподключением"""
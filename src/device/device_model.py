@@ -1,30 +1,59 @@
 import time
-import queue
+import numpy as np
+from types import MappingProxyType
 import serial.tools.list_ports
 import src.constants as C
+from src.device.register_cache import RegisterCache
+from src.device.discovery import discover
+from src.device.poll_policy import PollPolicy
+from src.device.state_stream import StateStream
+from src.device.timeseries import TimeSeriesStore
+from src.device.device_state import DeviceState
+from src.device.status_word import StatusWord, StatusFlag, MOTOR_M1, MOTOR_M2
+from src.device.feeder_fsm import FeederStateMachine
 
 
 class DeviceModel:
-    def __init__(self, controller, config, poller=None, desint=None):
+    def __init__(self, controller, config, poller=None, desint=None, registers_map=None):
         """
         :param controller: SerialDeviceController
         :param config: кортеж с настройками устройства и коэфф. пересчета
         :param poller: DevicePoller (необязателен, можно запускать при подключении)
+        :param registers_map: карта регистров настроек устройства (по умолчанию C.REGISTERS_MAP)
         """
         self.controller = controller
         self.poller = poller
         self.config = config
+        self.registers_map = registers_map if registers_map is not None else C.REGISTERS_MAP
         self.desint = desint
         self.on_desint = False
         self.command_loger = None
 
         self.manual = None
-        self.manual_start = False
-        self.manual_start_time = time.time()
+        # Этапы цикла подачи; в ручном режиме автомат сам командует моторами
+        self.fsm = FeederStateMachine(self)
+        # Результат последнего поиска устройств (DiscoveredDevice)
+        self.discovered = []
+        self.supervisor = None
 
+        # Теневая копия регистров: пишем и читаем только изменившееся/устаревшее
+        self.shadow = RegisterCache(ttl=C.SHADOW_TTL)
+
+        # Изменения значений и фронты битов статуса для подписчиков (GUI, журналы, автоматика)
+        self.stream = StateStream(self.registers_map)
+        # История всех прочитанных значений опрашиваемых регистров
+        self.history = TimeSeriesStore((C.REG_STATUS, C.REG_PERIOD_M1, C.REG_PERIOD_M2))
+
+        # Снимок состояния после последнего цикла опроса (подменяется целиком)
+        self.state = DeviceState()
+
+        # Ускоренное движение назад: флаг выставляет окно, читает поток опроса
+        self.increase_back_speed = False
+        self.m1_back = False
+        self._saved_period_m1 = None
 
         # Храним статусы и последние значения
-        self.status_flags = {}
+        self.status = StatusWord(0)
         self._update_status_flags(0)
         self.settings = {
             "SET_PERIOD_M1": {"default": 17.7, "alias": "Подача уст, мм/мин"},
@@ -44,49 +73,55 @@ class DeviceModel:
         self.start_time = 0
         self.end_time = None
 
-        # Ускоренное движение назад инициализируется как буул вар в гуе
-        self.increase_back_speed = None
-        self.m1_back = False
-
 
 
-        # подготовка очереди для непрерывного опроса
+        # подготовка непрерывного опроса
         if poller is not None:
-            self._init_poller_queue()
-            self.poller.init_func_calc_update_from_poller(self.update_from_poller)
-
-    def _init_poller_queue(self):
-        # Подготавливаем очереди для данных
-        status_queue = queue.Queue(maxsize=10)
-        motor1_queue = queue.Queue(maxsize=10)
-        motor2_queue = queue.Queue(maxsize=10)
+            self._init_poller()
+            self.poller.init_func_sample(self.ingest)
+            self.poller.init_func_calc_update_from_poller(self.publish_state)
 
-        self.polling_config = [
-            (C.REG_STATUS, status_queue),
-            (C.REG_PERIOD_M1, motor1_queue),
-            (C.REG_PERIOD_M2, motor2_queue),
-        ]
+    def _init_poller(self):
+        self.polling_config = [C.REG_STATUS, C.REG_PERIOD_M1, C.REG_PERIOD_M2]
 
-        self.poller.init_polling_config(self.polling_config)
+        self.poller.init_polling_config(self.polling_config, rates={
+            C.REG_STATUS: C.POLL_RATE_STATUS,
+            C.REG_PERIOD_M1: C.POLL_RATE_PERIOD,
+            C.REG_PERIOD_M2: C.POLL_RATE_PERIOD,
+        })
+        # частоты по фазе процесса: в простое периоды моторов не опрашиваются
+        self.poller.init_policy(PollPolicy())
 
     def init_command_loger(self, command_loger):
         self.command_loger = command_loger
 
     # Подключение
 
+    def init_supervisor(self, supervisor):
+        """ConnectionSupervisor, восстанавливающий соединение после потери порта"""
+        self.supervisor = supervisor
+
     def connect(self, port=None, baudrate=None):
+        self.shadow.invalidate()
+        # первое чтение после подключения публикуется целиком, даже если значения не изменились
+        self.stream.reset()
         is_connect = self.controller.connect(port, baudrate)
         if is_connect:
             if self.poller is not None:
                 self.poller.start()
+            if self.supervisor is not None:
+                self.supervisor.watch(port, baudrate)
         return is_connect
 
     def disconnect(self):
-        if self.controller.is_connected():
-            self.controller.disconnect()
+        if self.supervisor is not None:
+            self.supervisor.unwatch()
+        # опрос останавливается до закрытия порта, чтобы не читать из закрытого порта
         if self.poller is not None:
             if self.poller.running:
                 self.poller.stop()
+        if self.controller.is_connected():
+            self.controller.disconnect()
 
     def is_connected(self):
         """Проверка состояния соединения"""
@@ -102,15 +137,32 @@ class DeviceModel:
             ports.append(p.device)
         return ports
 
+    def discover_devices(self, baudrates=None, device_ids=None, timeout=C.DISCOVERY_TIMEOUT):
+        """
+        Параллельный поиск устройств на всех портах с VID/PID.
+        Порт текущего подключения пропускается.
+
+        :param baudrates: скорости для проверки (по умолчанию - текущая, затем C.DISCOVERY_BAUDRATES)
+        :param device_ids: адреса устройств (по умолчанию - все адреса шины 0..7)
+        :return: список DiscoveredDevice(port, baudrate, device_id, latency)
+        """
+        if baudrates is None:
+            current = self.config.get("baudrate", C.DEFAULT_BAUDRATE)
+            baudrates = (current,) + tuple(b for b in C.DISCOVERY_BAUDRATES if b != current)
+        if device_ids is None:
+            # сначала адрес текущего устройства, затем остальные
+            current = self.controller.device_id
+            device_ids = (current,) + tuple(i for i in range(8) if i != current)
+        busy = getattr(self.controller, "port", None) if self.controller.is_connected() else None
+        ports = [port for port in self.list_ports(only_with_vidpid=True) if port != busy]
+        self.discovered = discover(ports, baudrates, device_ids, timeout)
+        return self.discovered
+
     def find_device(self):
-        """Перебрать все порты и найти подходящее устройство"""
-        for port in self.list_ports(only_with_vidpid=True):
-            self.controller.connect(port=port, timeout=0.02)
-            if self.verify_device():
-                self.port = port
-                self.controller.disconnect()
-                return port
-            #self.controller.disconnect()
+        """Найти порт устройства (параллельный опрос всех портов)"""
+        for device in self.discover_devices():
+            self.port = device.port
+            return device.port
         return None
 
     # ------------------- Управление -------------------
@@ -123,21 +175,14 @@ class DeviceModel:
     def stop_process(self):
         if self.command_loger is not None:
             self.command_loger(f"reg: {hex(C.REG_CONTROL)}, write: {hex(C.CMD_NULL)}")
-        return self._write(C.REG_CONTROL, C.CMD_NULL)
+        return self._write(C.REG_CONTROL, C.CMD_NULL, C.PRIORITY_EMERGENCY)
 
     def start_process_manual_init(self, on_desint=False):
-        self.manual_start = True
-        self.manual_start_time = time.time()
         self.on_desint = on_desint
-
-    def start_process_manual(self):
-        self.manual_start = False
-        self.motor1_forward()
-        self.motor2_forward()
-        if self.on_desint:
-            self.desint.send_start()
+        return self.fsm.start_manual(on_desint)
 
     def stop_process_manual(self):
+        self.fsm.abort()
         if not self.is_end_process():
             self.motor1_stop()
             self.motor2_stop()
@@ -155,7 +200,7 @@ class DeviceModel:
     def motor1_stop(self):
         if self.command_loger is not None:
             self.command_loger(f"reg: {hex(C.REG_COM_M1)}, write: {hex(C.MOTOR_CMD_STOP)}")
-        return self._write(C.REG_COM_M1, C.MOTOR_CMD_STOP)
+        return self._write(C.REG_COM_M1, C.MOTOR_CMD_STOP, C.PRIORITY_EMERGENCY)
 
     def motor2_forward(self):
         if self.command_loger is not None:
@@ -170,7 +215,7 @@ class DeviceModel:
     def motor2_stop(self):
         if self.command_loger is not None:
             self.command_loger(f"reg: {hex(C.REG_COM_M2)}, write: {hex(C.MOTOR_CMD_STOP)}")
-        return self._write(C.REG_COM_M2, C.MOTOR_CMD_STOP)
+        return self._write(C.REG_COM_M2, C.MOTOR_CMD_STOP, C.PRIORITY_EMERGENCY)
 
     def valve1_on(self):
         if self.command_loger is not None:
@@ -236,6 +281,21 @@ class DeviceModel:
             return round(self.config['MOTOR_SPEED_2'] / period, 2)
         return 0
 
+    def mean_speed_m1(self, seconds):
+        """Средняя скорость подачи за последние seconds секунд (по истории опроса)"""
+        return self.history.time_weighted_mean(C.REG_PERIOD_M1, seconds, self._periods_to_speed(1))
+
+    def mean_speed_m2(self, seconds):
+        return self.history.time_weighted_mean(C.REG_PERIOD_M2, seconds, self._periods_to_speed(2))
+
+    def _periods_to_speed(self, motor):
+        k = self.config[f'MOTOR_SPEED_{motor}']
+
+        def transform(periods):
+            periods = periods.astype(np.float64)
+            return np.divide(k, periods, out=np.zeros_like(periods), where=periods > 0)
+        return transform
+
     # --------- Пересчёт в человеко-понятные величины ----------
     def period_to_speed_m1(self, period):
         if period and period > 0:
@@ -260,13 +320,15 @@ class DeviceModel:
     # ------------------- Настройки -------------------
 
     def apply_settings(self, settings_vars):
-        """Принимает dict name->value из GUI, конвертирует и пишет"""
+        """Принимает dict name->value из GUI, конвертирует и пишет одной посылкой"""
         MOTOR_SPEED_1 = self.config['MOTOR_SPEED_1']
         MOTOR_SPEED_2 = self.config['MOTOR_SPEED_2']
         self.settings_vars = settings_vars
 
+        values = {}
+        names = {}
         for name, value in settings_vars.items():
-            reg = C.REGISTERS_MAP.get(name)
+            reg = self.registers_map.get(name)
             if reg is None:
                 continue
 
@@ -277,30 +339,71 @@ class DeviceModel:
             else:
                 value_t = value.get()
 
-            try:
-                if self._write(reg, int(value_t)):
-                    self.command_loger(f"[OK] Установлено {name} = {value_t} → регистр 0x{reg:02X}")
-                else:
-                    self.command_loger(f"[ERR] Ошибка при записи {name}")
-            except Exception as e:
-                self.command_loger(f"[ERR] Ошибка при записи {name}: {e}")
+            values[reg] = int(value_t)
+            names[reg] = name
 
-    def read_settings(self, settings_vars):
-        """Читает регистры и обновляет dict name->value"""
+        # пишем только регистры, значение которых отличается от теневой копии
+        changed = self.shadow.diff(values)
+        try:
+            acks = self._write_many(changed)
+        except Exception as e:
+            self.shadow.invalidate()
+            self.command_loger(f"[ERR] Ошибка при записи настроек: {e}")
+            return
+
+        if len(changed) < len(values):
+            self.command_loger(f"[OK] Без изменений: {len(values) - len(changed)} рег., запись пропущена")
+        for reg, ok in acks.items():
+            if ok:
+                self.command_loger(f"[OK] Установлено {names[reg]} = {values[reg]} → регистр 0x{reg:02X}")
+            else:
+                self.command_loger(f"[ERR] Ошибка при записи {names[reg]}")
+
+    def read_timings(self):
+        """Времена этапов цикла (T_START, T_GRIND, T_PURGING), мс - из теневой копии или с устройства"""
+        regs = {name: self.registers_map[name] for name in ("T_START", "T_GRIND", "T_PURGING")}
+        stale = self.shadow.stale(list(regs.values()))
+        values = self._read_many(stale) if stale else {}
+        result = {}
+        for name, reg in regs.items():
+            value = values.get(reg)
+            if value is None:
+                value = self.shadow.get(reg)
+            if value is not None:
+                result[name] = value
+        return result
+
+    def read_settings(self, settings_vars, force=False):
+        """
+        Читает регистры одной посылкой и обновляет dict name->value.
+
+        :param force: читать все регистры с устройства, даже если теневая копия актуальна
+        """
 
         MOTOR_SPEED_1 = self.config['MOTOR_SPEED_1']
         MOTOR_SPEED_2 = self.config['MOTOR_SPEED_2']
         settings_vars_out = {}
 
+        regs = {}
         for name in settings_vars.keys():
-            reg = C.REGISTERS_MAP.get(name)
-            if reg is None:
-                continue
-            try:
-                val = self._read(reg)
-            except Exception as e:
-                self.command_loger(f"[ERR] Ошибка при записи {name}: {e}")
+            reg = self.registers_map.get(name)
+            if reg is not None:
+                regs[name] = reg
+
+        addresses = list(regs.values())
+        if force:
+            self.shadow.invalidate()
+        stale = self.shadow.stale(addresses)
+        try:
+            values = {reg: self.shadow.get(reg) for reg in addresses}
+            if stale:
+                values.update(self._read_many(stale))
+        except Exception as e:
+            self.command_loger(f"[ERR] Ошибка при чтении настроек: {e}")
+            return settings_vars_out
 
+        for name, reg in regs.items():
+            val = values.get(reg)
             if val is None:
                 self.command_loger(f"[ERR] Ошибка при чтении {name}")
                 continue
@@ -316,73 +419,119 @@ class DeviceModel:
 
         return settings_vars_out
 
+    def settings_snapshot(self):
+        """Значения регистров настроек из теневой копии: addr -> value"""
+        snapshot = {}
+        for name in self.settings:
+            reg = self.registers_map.get(name)
+            if reg is not None and reg in self.shadow.values:
+                snapshot[reg] = self.shadow.values[reg]
+        return snapshot
+
+    def restore_settings(self, snapshot):
+        """
+        Возвращает настройки устройства к снимку после переподключения:
+        регистры читаются и записываются только отличающиеся.
+        """
+        if not snapshot:
+            return {}
+        self.shadow.invalidate()
+        current = self._read_many(list(snapshot))
+        changed = {reg: val for reg, val in snapshot.items() if current.get(reg) != val}
+        acks = self._write_many(changed) if changed else {}
+        if self.command_loger is not None:
+            restored = sum(1 for ok in acks.values() if ok)
+            self.command_loger(f"[OK] Настройки восстановлены: {restored} из {len(changed)} рег. "
+                               f"(совпадало {len(snapshot) - len(changed)})")
+        return acks
+
     # ------------------- Статусы и обновления -------------------
 
-    def update_from_poller(self):
-        """Разбор очередей из poller и обновление модели"""
-        if self.poller is not None:
-            for addr, q in self.poller.polling_config:
-                while not q.empty():
-                    _, val = q.get()
-                    self.last_values[addr] = val
-
-                    if addr == C.REG_STATUS:
-                        self._update_status_flags(val)
-                    elif addr == C.REG_PERIOD_M1:
-                        self.last_motor_period["PERIOD_M1"] = val
-                    elif addr == C.REG_PERIOD_M2:
-                        self.last_motor_period["PERIOD_M2"] = val
+    def ingest(self, addr, val, timestamp=None):
+        """
+        Обновление модели значением регистра (из опроса или воспроизведения захвата)
+
+        :param timestamp: время чтения, time.monotonic()
+        """
+        self.last_values[addr] = val
+        self.history.append(addr, val, timestamp)
+
+        if addr == C.REG_STATUS:
+            self._update_status_flags(val)
+        elif addr == C.REG_PERIOD_M1:
+            self.last_motor_period["PERIOD_M1"] = val
+        elif addr == C.REG_PERIOD_M2:
+            self.last_motor_period["PERIOD_M2"] = val
+
+        # подписчики видят уже обновлённую модель
+        self.stream.publish(addr, val, timestamp)
+
+    def publish_state(self):
+        """Новый снимок состояния по значениям, прочитанным за цикл (вызывается потоком опроса)"""
+        period_m1 = self.last_motor_period["PERIOD_M1"]
+        period_m2 = self.last_motor_period["PERIOD_M2"]
+        self.state = DeviceState(
+            seq=self.state.seq + 1,
+            timestamp=time.monotonic(),
+            status=self.status.word,
+            period_m1=period_m1,
+            period_m2=period_m2,
+            speed_m1=self.period_to_speed_m1(period_m1),
+            speed_m2=self.period_to_speed_m2(period_m2),
+            values=MappingProxyType(dict(self.last_values)),
+        )
+        return self.state
+
+    @property
+    def status_flags(self):
+        """Биты статуса по именам (вычисляются при обращении)"""
+        return self.status
 
     def _update_status_flags(self, value: int):
-        bits = [
-            "START", "BEG_BLK", "END_BLK", "M1_FWD", "M1_BACK",
-            "M2_FWD", "M2_BACK", "VALVE1_ON", "VALVE2_ON", "RESET", "PING"
-        ]
-        for i, bit in enumerate(bits):
-            self.status_flags[bit] = bool(value & (1 << i))
+        status = self.status = StatusWord(value, self.status.word)
+
+        # после сброса устройства теневая копия недействительна
+        if status.rising & StatusFlag.RESET:
+            self.shadow.invalidate()
 
         # управление временем подачи
-        if self.status_flags.get("BEG_BLK"):
+        if status.test(StatusFlag.BEG_BLK):
             self.start_time = time.time()
             self.end_time = None
-        if self.status_flags.get("END_BLK") and self.end_time is None:
+        if status.test(StatusFlag.END_BLK) and self.end_time is None:
             self.end_time = time.time()
 
         # Управление повышением скорости назад
         self._set_back_speed()
 
-        if self.manual and self.is_end_blk() and not self.is_end_process():
-            self.motor2_forward()
-            self.motor1_backward()
-
-        if self.is_beg_blk() and self.is_m2_run() and not self.is_m1_run():
-            self.motor2_stop()
-
-        if self.manual_start:
-            delay_time = (time.time() - self.manual_start_time) * 1000
-            start_time = self.settings_vars.get('T_START')
-            if start_time is None:
-                self.apply_settings(self.read_settings(self.settings))
-                start_time = self.settings_vars.get('T_START')
-
-            start_time = start_time.get()
-
-            if delay_time >= start_time:
-                self.manual_start = False
-                self.start_process_manual()
+        # автоматическое управление моторами - по фронтам, см. FeederStateMachine
+        self.fsm.on_status(status)
 
     def _set_back_speed(self):
-        try:
-            if self.increase_back_speed.get():
-                if self.status_flags.get("M1_BACK") and not self.m1_back:
-                    reg_addr = C.REGISTERS_MAP.get('SET_PERIOD_M1')
-                    self._write(reg_addr, int(5000))
-                    self.m1_back = True
-                elif self.m1_back and self.is_beg_blk():
-                    self.apply_settings(self.settings_vars)
-                    self.m1_back = False
-        except AttributeError:
-            pass
+        """Вызывается из потока опроса: переменные окна (Tk) здесь не читаются"""
+        if not self.increase_back_speed:
+            return
+        reg_addr = self.registers_map.get('SET_PERIOD_M1')
+        if self.status.test(StatusFlag.M1_BACK) and not self.m1_back:
+            # период до ускорения - из теневой копии (последняя запись или чтение),
+            # после подключения или сброса копия пуста - читаем с устройства
+            saved = self.shadow.values.get(reg_addr)
+            if saved is None:
+                saved = self._read(reg_addr)
+            self._saved_period_m1 = saved
+            self.m1_back = True
+            if saved is None:
+                # до конца хода назад период не трогаем
+                if self.command_loger is not None:
+                    self.command_loger("[ERROR] Не удалось прочитать SET_PERIOD_M1, ускорение назад пропущено")
+                return
+            self._write(reg_addr, int(5000))
+        elif self.m1_back and self.is_beg_blk():
+            self.m1_back = False
+            saved = self._saved_period_m1
+            if saved is not None and not self._write(reg_addr, saved) and self.command_loger is not None:
+                self.command_loger(f"[ERROR] Не удалось восстановить SET_PERIOD_M1 = {saved}")
+
     def get_work_time(self):
         if self.end_time:
             return round(self.end_time - self.start_time, 1)
@@ -391,24 +540,52 @@ class DeviceModel:
         return 0
 
     def is_end_process(self):
-        return self.status_flags.get('M1_BACK')
+        return self.status.test(StatusFlag.M1_BACK)
 
     def is_end_blk(self):
-        return self.status_flags.get('END_BLK')
+        return self.status.test(StatusFlag.END_BLK)
 
     def is_beg_blk(self):
-        return self.status_flags.get('BEG_BLK')
+        return self.status.test(StatusFlag.BEG_BLK)
 
     def is_m2_run(self):
-        return self.status_flags.get('M2_FWD') or self.status_flags.get('M2_BACK')
+        return self.status.test(MOTOR_M2)
 
     def is_m1_run(self):
-        return self.status_flags.get('M1_FWD') or self.status_flags.get('M1_BACK')
+        return self.status.test(MOTOR_M1)
 
     # ------------------- Вспомогательные -------------------
 
-    def _write(self, reg, value):
-        return self.controller.write_register(reg, value)
+    # Теневая копия заполняется из прочитанных значений и подтверждённых записей
+
+    def _write(self, reg, value, priority=C.PRIORITY_CONTROL):
+        ok = self.controller.write_register(reg, value, priority=priority)
+        if ok:
+            self.shadow.store(reg, value)
+        else:
+            self.shadow.invalidate(reg)
+        return ok
 
     def _read(self, reg):
-        return self.controller.read_register(reg)
+        val = self.controller.read_register(reg, priority=C.PRIORITY_SETTINGS)
+        if val is not None:
+            self.shadow.store(reg, val)
+        return val
+
+    def _write_many(self, values):
+        if not values:
+            return {}
+        acks = self.controller.write_registers(values, priority=C.PRIORITY_SETTINGS)
+        for reg, ok in acks.items():
+            if ok:
+                self.shadow.store(reg, values[reg])
+            else:
+                self.shadow.invalidate(reg)
+        return acks
+
+    def _read_many(self, regs):
+        values = self.controller.read_registers(regs, priority=C.PRIORITY_SETTINGS)
+        for reg, val in values.items():
+            if val is not None:
+                self.shadow.store(reg, val)
+        return values
@@ -1,35 +1,170 @@
+import math
 import time
 import threading
+from src import constants as C
 from src.device.serial_device_controller import SerialDeviceController
+from src.device.rtt_estimator import frame_time
+from src.device.metrics import Metrics
+
+
+def bus_load(rates, baudrate, turnaround=0.0):
+    """
+    Доля времени шины, занимаемая опросом с частотами rates (addr -> Гц).
+
+    Каждое чтение - кадр запроса и кадр ответа; регистры опрашиваются
+    посылками с частотой самого частого из них, каждая посылка добавляет
+    задержку ответа устройства turnaround, с.
+    """
+    active = [rate for rate in rates.values() if rate]
+    frames = 2 * sum(active)
+    bursts = max(active) if active else 0.0
+    return frames * frame_time(baudrate) + bursts * turnaround
+
+
+class _RegisterSchedule:
+    """Расписание опроса одного регистра"""
+
+    __slots__ = ("period", "next_due", "reads", "overruns", "max_lag", "lag")
+
+    def __init__(self, period, lag):
+        """:param lag: Histogram опозданий чтения относительно срока"""
+        self.period = period
+        self.lag = lag
+        self.next_due = 0.0
+        self.reads = 0
+        # пропущенные слоты расписания (опрос не успевал)
+        self.overruns = 0
+        # наибольшее опоздание чтения относительно срока, с
+        self.max_lag = 0.0
 
 
 class DevicePoller:
-    """Фоновый опрос устройства в отдельном потоке"""
+    """
+    Фоновый опрос устройства в отдельном потоке.
+
+    У каждого регистра своя частота опроса. Сроки считаются по
+    time.perf_counter от расписания, а не от конца предыдущего цикла, поэтому
+    частота не уплывает. Регистры, срок которых наступил (или наступит раньше
+    половины наименьшего периода), читаются одной посылкой. Опоздание меньше
+    периода нагоняется, более длинное отставание пропускает слоты и
+    учитывается в overruns.
+
+    Частоты можно менять на ходу (set_rates); если задана политика
+    (init_policy), она выбирает частоты по каждому новому слову статуса.
+
+    Цикл опроса - интервал, за который каждый опрашиваемый регистр прочитан
+    хотя бы раз; его длительность уходит в func_calc_time, а
+    func_calc_update_from_poller вызывается после каждой посылки.
+    """
 
     def __init__(self, controller: SerialDeviceController, interval=0.01):
         """
         :param controller: экземпляр SerialDeviceController
-        :param polling_config: список (addr, queue)
-        :param interval: задержка между регистрами
+        :param interval: период опроса регистров без заданной частоты, с
+            (0 - без пауз, сколько позволяет шина)
         """
         self.controller = controller
         self.polling_config = None
+        self._addresses = ()
+        self._values = {}
         self.interval = interval
+        self.rates = {}
+        self._schedule = {}
+        self._slack = 0.0
+        self.policy = None
+        self._status = None
         self.running = False
         self.thread = None
         self.func_calc_time = None
         self.func_calc_update_from_poller = None
+        self.func_sample = None
         self.start_polling_time = 0
+        self._started = 0.0
+        self.cycles = 0
+        self.bursts = 0
+        # регистры, ещё не прочитанные в текущем цикле опроса
+        self._unread = set()
+        # Гистограммы: период циклов, длительность чтения, опоздание пробуждения,
+        # опоздание чтения каждого регистра (lag/0xNN)
+        self.metrics = Metrics()
+        self._cycle_time = self.metrics.histogram("cycle")
+        self._read_time = self.metrics.histogram("read")
+        self._sleep_overshoot = self.metrics.histogram("sleep_overshoot")
+
+    def init_polling_config(self, polling_config, rates=None):
+        """
+        :param polling_config: адреса опрашиваемых регистров
+        :param rates: частоты опроса addr -> Гц (остальные - с периодом interval)
+        """
+        self.polling_config = tuple(polling_config)
+        self.rates = dict(rates or {})
+        self._addresses = self.polling_config
+        self._values = {}
+        self._schedule = {addr: _RegisterSchedule(self._period(addr), self.metrics.histogram(f"lag/0x{addr:02X}"))
+                          for addr in self._addresses}
+        self._update_slack()
+
+    def init_policy(self, policy):
+        """
+        Политика частот опроса по статусу устройства (PollPolicy).
+
+        Требует опроса C.REG_STATUS; до первого чтения статуса действуют
+        частоты из init_polling_config.
+        """
+        self.policy = policy
+        self._status = None
+
+    def _period(self, addr):
+        if addr not in self.rates:
+            return self.interval
+        rate = self.rates[addr]
+        # частота 0 - регистр не опрашивается
+        return 1.0 / rate if rate else math.inf
+
+    def _update_slack(self):
+        periods = [s.period for s in self._schedule.values() if 0 < s.period < math.inf]
+        self._slack = min(periods) / 2 if periods else 0.0
 
-    def init_polling_config(self, polling_config):
-        self.polling_config = polling_config
+    def set_rates(self, rates, now=None):
+        """
+        Смена частот опроса без перезапуска.
+
+        Срок регистра, частота которого выросла, переносится ближе, чтобы
+        новая частота действовала сразу. Отключаемый регистр читается
+        последний раз, чтобы модель не осталась со значением, снятым на ходу.
+
+        :param rates: addr -> Гц (0 - не опрашивать); остальные регистры не меняются
+        """
+        if now is None:
+            now = time.perf_counter()
+        self.rates.update(rates)
+        for addr in rates:
+            schedule = self._schedule.get(addr)
+            if schedule is None:
+                continue
+            period = self._period(addr)
+            if period == schedule.period:
+                continue
+            if period == math.inf:
+                schedule.next_due = now
+            else:
+                schedule.next_due = min(schedule.next_due, now + period)
+            schedule.period = period
+        self._update_slack()
 
     def start(self):
         if self.polling_config is not None:
             if self.running:
                 return
             self.running = True
-            self.start_polling_time = time.time()
+            now = self.start_polling_time = self._started = time.perf_counter()
+            for schedule in self._schedule.values():
+                schedule.next_due = now
+            self._unread = self._polled()
+            budget = self.check_bus_budget()
+            if not budget["fits"]:
+                print(f"[DevicePoller] Частоты опроса не помещаются в шину {budget['baudrate']} бод: "
+                      f"загрузка {budget['utilization']:.0%} при допустимой {C.POLL_BUS_BUDGET:.0%}")
             self.thread = threading.Thread(target=self._loop, daemon=True)
             self.thread.start()
             return True
@@ -42,32 +177,137 @@ class DevicePoller:
             self.thread.join(timeout=1.0)
         self.thread = None
 
+    def _due(self, now):
+        """Регистры, которые нужно прочитать сейчас"""
+        limit = now + self._slack
+        return tuple(addr for addr in self._addresses if self._schedule[addr].next_due <= limit)
+
+    def _polled(self):
+        """Регистры, опрашиваемые при текущих частотах"""
+        return {addr for addr, schedule in self._schedule.items() if schedule.period < math.inf}
+
+    def _reschedule(self, addresses, now):
+        for addr in addresses:
+            schedule = self._schedule[addr]
+            schedule.reads += 1
+            lag = now - schedule.next_due
+            schedule.lag.record(lag)
+            if lag > schedule.max_lag:
+                schedule.max_lag = lag
+            schedule.next_due += schedule.period
+            # отставание больше периода: пропускаем слоты, а не опрашиваем подряд
+            if schedule.period > 0 and now - schedule.next_due > schedule.period:
+                skipped = int((now - schedule.next_due) // schedule.period)
+                schedule.overruns += skipped
+                schedule.next_due += skipped * schedule.period
+            elif schedule.period <= 0:
+                schedule.next_due = now
+
     def _loop(self):
         while self.running:
+            # без порта не опрашиваем: переподключение ведёт ConnectionSupervisor
+            if not self.controller.is_connected():
+                time.sleep(C.DISCONNECTED_POLL_INTERVAL)
+                continue
             try:
-                for addr, q in self.polling_config:
-                    val = self.controller.read_register(addr)
-                    if val is not None:
-                        if q.full():
-                            q.get()
-                        q.put((addr, val))
-                    time.sleep(self.interval)
-
-                # время цикла
-                period = int((time.time() - self.start_polling_time) * 1000)
-                self.start_polling_time = time.time()
-                if self.func_calc_time:
-                    self.func_calc_time(period)
+                now = time.perf_counter()
+                due = self._due(now)
+                if not due:
+                    next_due = min(s.next_due for s in self._schedule.values())
+                    pause = min(max(next_due - now, 0.0), C.DISCONNECTED_POLL_INTERVAL)
+                    time.sleep(pause)
+                    # опоздание пробуждения: планировщик ОС и GIL
+                    self._sleep_overshoot.record(time.perf_counter() - now - pause)
+                    continue
+
+                # все регистры, срок которых наступил, читаются одной посылкой
+                values = self.controller.read_registers(due, out=self._values, priority=C.PRIORITY_POLL)
+                self._read_time.record(time.perf_counter() - now)
+                self._reschedule(due, now)
+                if self.func_sample:
+                    timestamp = time.monotonic()
+                    for addr in due:
+                        val = values.get(addr)
+                        if val is not None:
+                            self.func_sample(addr, val, timestamp)
+
+                status = values.get(C.REG_STATUS) if C.REG_STATUS in due else None
+                if self.policy is not None and status is not None and status != self._status:
+                    self._status = status
+                    rates = self.policy.rates(status, *self._link())
+                    if any(self.rates.get(addr) != rate for addr, rate in rates.items()):
+                        self.set_rates(rates, now)
+
+                self.bursts += 1
+                self._unread.difference_update(due)
+                # время цикла: все опрашиваемые регистры прочитаны
+                if not self._unread:
+                    now = time.perf_counter()
+                    self._cycle_time.record(now - self.start_polling_time)
+                    period = int((now - self.start_polling_time) * 1000)
+                    self.start_polling_time = now
+                    self.cycles += 1
+                    self._unread = self._polled()
+                    if self.func_calc_time:
+                        self.func_calc_time(period)
                 if self.func_calc_update_from_poller:
                     self.func_calc_update_from_poller()
 
             except Exception as e:
                 print(f"[DevicePoller] Ошибка: {e}")
+                time.sleep(self.interval)
+
+    def check_bus_budget(self, baudrate=None):
+        """
+        Проверка, помещаются ли заданные частоты в пропускную способность шины.
+
+        Задержка ответа устройства - сглаженная оценка контроллера (до первых
+        замеров не учитывается). Регистры без частоты (interval = 0) не учитываются.
+
+        :return: dict с загрузкой шины (доля времени) и признаком fits
+        """
+        link_baudrate, turnaround = self._link()
+        if baudrate is None:
+            baudrate = link_baudrate
+        rates = {addr: 1.0 / s.period for addr, s in self._schedule.items() if s.period > 0}
+        utilization = bus_load(rates, baudrate, turnaround)
+        return {
+            "baudrate": baudrate,
+            "rates": rates,
+            "turnaround_ms": turnaround * 1000,
+            "utilization": utilization,
+            "fits": utilization <= C.POLL_BUS_BUDGET,
+        }
+
+    def _link(self):
+        """Скорость порта и сглаженная задержка ответа устройства, с"""
+        baudrate = getattr(self.controller, "baudrate", None) or C.DEFAULT_BAUDRATE
+        link = getattr(self.controller, "link_rtt", None)
+        turnaround = link.srtt if link is not None and link.srtt is not None else 0.0
+        return baudrate, turnaround
+
+    def stats(self):
+        """Фактическая частота, пропуски и опоздания по регистрам"""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        result = {}
+        for addr, schedule in self._schedule.items():
+            result[addr] = {
+                "rate_target": 1.0 / schedule.period if schedule.period > 0 else None,
+                "rate_actual": schedule.reads / elapsed if elapsed else 0.0,
+                "reads": schedule.reads,
+                "overruns": schedule.overruns,
+                "max_lag_ms": schedule.max_lag * 1000,
+            }
+        return result
 
     def init_func_time_calc(self, func):
         """Передаём callback для отчёта времени цикла"""
         self.func_calc_time = func
 
     def init_func_calc_update_from_poller(self, func):
-        """Передаём callback для отчёта времени цикла"""
-        self.func_calc_update_from_poller = func
\ No newline at end of file
+        """Передаём callback, вызываемый после каждого цикла опроса"""
+        self.func_calc_update_from_poller = func
+
+    def init_func_sample(self, func):
+        """Передаём callback для прочитанных значений: func(addr, value, timestamp)"""
+        self.func_sample = func
@@ -0,0 +1,57 @@
+"""Модуль неизменяемых снимков состояния устройства"""
+
+import time
+from types import MappingProxyType
+from src.device.status_word import STATUS_BIT_NUMBERS
+
+_EMPTY = MappingProxyType({})
+
+
+class DeviceState:
+    """
+    Согласованный снимок состояния после одного цикла опроса.
+
+    Поток опроса создаёт новый снимок на каждый цикл и подменяет ссылку
+    DeviceModel.state; читатели (окно, журналы) берут ссылку один раз и
+    работают с ней без блокировок: статус и периоды в снимке всегда из
+    одного цикла. Снимок не изменяется после создания.
+    """
+
+    __slots__ = ("seq", "timestamp", "status", "period_m1", "period_m2", "speed_m1", "speed_m2", "values")
+
+    def __init__(self, seq=0, timestamp=0.0, status=0, period_m1=0, period_m2=0,
+                 speed_m1=0.0, speed_m2=0.0, values=_EMPTY):
+        """
+        :param timestamp: время создания снимка, time.monotonic()
+        :param values: addr -> последнее прочитанное значение (только чтение)
+        """
+        setter = object.__setattr__
+        setter(self, "seq", seq)
+        setter(self, "timestamp", timestamp or time.monotonic())
+        setter(self, "status", status)
+        setter(self, "period_m1", period_m1)
+        setter(self, "period_m2", period_m2)
+        setter(self, "speed_m1", speed_m1)
+        setter(self, "speed_m2", speed_m2)
+        setter(self, "values", values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("DeviceState неизменяем")
+
+    def __delattr__(self, name):
+        raise AttributeError("DeviceState неизменяем")
+
+    def bit(self, number):
+        return bool(self.status >> number & 1)
+
+    def flag(self, name):
+        """Бит статуса по имени (START, END_BLK, ...)"""
+        return bool(self.status >> STATUS_BIT_NUMBERS[name] & 1)
+
+    def flags(self):
+        """Все биты статуса: имя -> bool (новый dict на каждый вызов)"""
+        return {name: bool(self.status >> bit & 1) for name, bit in STATUS_BIT_NUMBERS.items()}
+
+    def __repr__(self):
+        return (f"DeviceState(seq={self.seq}, status=0x{self.status:04X}, "
+                f"period_m1={self.period_m1}, period_m2={self.period_m2})")
@@ -0,0 +1,70 @@
+"""Модуль параллельного поиска устройств на COM-портах"""
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from src import constants as C
+from src.device.serial_device_controller import SerialDeviceController
+from src.device.rtt_estimator import frame_time
+
+DiscoveredDevice = namedtuple("DiscoveredDevice", "port baudrate device_id latency")
+
+
+def probe_port(port, baudrates, device_ids, deadline):
+    """
+    Опрос одного порта: чтение REG_VERIFY для каждого device_id на каждой
+    скорости, пока не ответит устройство или не наступит deadline.
+    Оставшееся время делится поровну между оставшимися попытками (таймаут
+    ответа - доля за вычетом передачи кадров), порт закрывается в любом случае.
+
+    :param deadline: момент окончания поиска (time.perf_counter)
+    :return: список DiscoveredDevice
+    """
+    found = []
+    for index, baudrate in enumerate(baudrates):
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        share = remaining / ((len(baudrates) - index) * len(device_ids))
+        # время передачи запроса и ответа добавляется к таймауту контроллером
+        share = max(share - 2 * frame_time(baudrate), C.MIN_RESPONSE_TIMEOUT)
+        controller = SerialDeviceController(port=port, baudrate=baudrate)
+        try:
+            if not controller.connect(timeout=share):
+                break
+            for device_id in device_ids:
+                if time.perf_counter() >= deadline:
+                    break
+                start = time.perf_counter()
+                value = controller.read_register(C.REG_VERIFY, device_id=device_id)
+                if value == C.VERIFY_CODE:
+                    found.append(DiscoveredDevice(port, baudrate, device_id & 0x07, time.perf_counter() - start))
+        except Exception as e:
+            print(f"[ERROR] Поиск на {port} @ {baudrate}: {e}")
+        finally:
+            controller.disconnect()
+        # все устройства на шине работают на одной скорости
+        if found:
+            break
+    return found
+
+
+def discover(ports, baudrates=C.DISCOVERY_BAUDRATES, device_ids=(C.DEFAULT_DEVICE_ID,),
+             timeout=C.DISCOVERY_TIMEOUT):
+    """
+    Параллельный поиск устройств: каждый порт опрашивается своим потоком,
+    поэтому общее время поиска не превышает timeout при любом числе портов.
+
+    :return: список DiscoveredDevice, отсортированный по задержке ответа
+    """
+    ports = list(ports)
+    if not ports:
+        return []
+    baudrates = tuple(baudrates)
+    device_ids = tuple(device_ids)
+    deadline = time.perf_counter() + timeout
+    found = []
+    with ThreadPoolExecutor(max_workers=len(ports), thread_name_prefix="discovery") as pool:
+        for result in pool.map(lambda port: probe_port(port, baudrates, device_ids, deadline), ports):
+            found.extend(result)
+    return sorted(found, key=lambda device: device.latency)
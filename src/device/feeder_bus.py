@@ -0,0 +1,299 @@
+"""Модуль работы с несколькими дозаторами на одной шине RS-485 (один порт, до 8 адресов)"""
+
+import threading
+import time
+from src import constants as C
+from src.device.device_model import DeviceModel
+
+
+class DeviceChannel:
+    """
+    Контроллер одного устройства на общей шине.
+
+    Подставляет device_id во все обращения к общему контроллеру
+    (SerialDeviceController или TransactionScheduler), поэтому DeviceModel
+    работает с устройством на шине так же, как с отдельным портом.
+    """
+
+    def __init__(self, controller, device_id):
+        self.controller = controller
+        self.device_id = device_id & 0x07
+
+    def _kwargs(self, priority):
+        kwargs = {"device_id": self.device_id}
+        if priority is not None:
+            kwargs["priority"] = priority
+        return kwargs
+
+    def connect(self, port=None, baudrate=None, timeout=None):
+        """Порт общий: открываем, только если он ещё не открыт"""
+        if self.controller.is_connected():
+            return True
+        return self.controller.connect(port=port, baudrate=baudrate, timeout=timeout)
+
+    def disconnect(self):
+        """Порт общий и закрывается через FeederBus.disconnect()"""
+
+    def is_connected(self):
+        return self.controller.is_connected()
+
+    def read_register(self, address, priority=None):
+        return self.controller.read_register(address, **self._kwargs(priority))
+
+    def write_register(self, address, value, priority=None):
+        return self.controller.write_register(address, value, **self._kwargs(priority))
+
+    def read_registers(self, addresses, out=None, priority=None):
+        return self.controller.read_registers(addresses, out=out, **self._kwargs(priority))
+
+    def write_registers(self, values, wait_ack=True, priority=None):
+        return self.controller.write_registers(values, wait_ack=wait_ack, **self._kwargs(priority))
+
+
+class BusDevicePoller:
+    """
+    Опрос одного устройства на шине. Интерфейс совпадает с DevicePoller,
+    но собственного потока нет: циклы опроса выполняет FeederBus.
+    """
+
+    def __init__(self, bus, channel, rate=None):
+        """
+        :param rate: целевая частота опроса устройства, Гц (None - сколько позволяет шина)
+        """
+        self.bus = bus
+        self.channel = channel
+        self.rate = rate
+        self.polling_config = None
+        self.running = False
+        self.func_calc_time = None
+        self.func_calc_update_from_poller = None
+        self.func_sample = None
+        self._addresses = ()
+        self._values = {}
+        self.next_due = 0.0
+        self.cycles = 0
+        self.last_period = 0.0
+        self._last_cycle = None
+
+    @property
+    def period(self):
+        return 1.0 / self.rate if self.rate else 0.0
+
+    def init_polling_config(self, polling_config, rates=None):
+        """Частоты отдельных регистров (rates) не поддерживаются: устройство опрашивается с частотой rate"""
+        self.polling_config = tuple(polling_config)
+        self._addresses = self.polling_config
+        self._values = {}
+
+    def init_policy(self, policy):
+        """Политика частот не поддерживается: частоту устройств на шине распределяет FeederBus"""
+
+    def init_func_time_calc(self, func):
+        self.func_calc_time = func
+
+    def init_func_calc_update_from_poller(self, func):
+        self.func_calc_update_from_poller = func
+
+    def init_func_sample(self, func):
+        self.func_sample = func
+
+    def start(self):
+        if self.polling_config is None:
+            return False
+        self.running = True
+        self.next_due = time.perf_counter()
+        self._last_cycle = None
+        self.bus.start()
+        return True
+
+    def stop(self):
+        self.running = False
+
+    def poll(self):
+        """Один цикл опроса устройства"""
+        values = self.channel.read_registers(self._addresses, out=self._values, priority=C.PRIORITY_POLL)
+        on_sample = self.bus.on_sample
+        timestamp = time.monotonic()
+        for addr in self._addresses:
+            val = values.get(addr)
+            if val is not None:
+                if self.func_sample:
+                    self.func_sample(addr, val, timestamp)
+                if on_sample is not None:
+                    on_sample(self.channel.device_id, addr, val, timestamp)
+
+        now = time.perf_counter()
+        if self._last_cycle is not None:
+            self.last_period = now - self._last_cycle
+            if self.func_calc_time:
+                self.func_calc_time(int(self.last_period * 1000))
+        self._last_cycle = now
+        self.cycles += 1
+        if self.func_calc_update_from_poller:
+            self.func_calc_update_from_poller()
+
+
+class FeederBus:
+    """
+    Несколько дозаторов за одним портом.
+
+    У каждого устройства своя DeviceModel и своя целевая частота опроса.
+    Один поток опрашивает устройства по ближайшему сроку (EDF): устройство
+    с частотой 100 Гц получает вдвое больше циклов, чем с 50 Гц. Устройства
+    без заданной частоты в EDF не участвуют и по очереди занимают только
+    время, когда ни одно устройство с частотой не ждёт опроса. Собственный
+    поток опроса (threaded) после потери порта переоткрывает его с растущей
+    паузой, как ConnectionSupervisor.
+    """
+
+    def __init__(self, controller, threaded=True, on_sample=None):
+        """
+        :param controller: SerialDeviceController или TransactionScheduler
+        :param threaded: запускать опрос в собственном потоке; иначе цикл опроса
+            выполняет вызывающий код через run() (например, пул FeederFarm)
+        :param on_sample: callback(device_id, addr, value, timestamp) на каждое значение
+        """
+        self.controller = controller
+        self.threaded = threaded
+        self.on_sample = on_sample
+        self.devices = {}
+        self.running = False
+        self.thread = None
+        self.port = None
+        self.baudrate = None
+        self.losses = 0
+        self._wake = threading.Event()
+
+    def add_device(self, device_id, config, rate=None, desint=None, registers_map=None):
+        """
+        Регистрирует устройство на шине.
+
+        :param config: настройки устройства (коэфф. пересчёта скоростей)
+        :param rate: целевая частота опроса, Гц
+        :param registers_map: карта регистров настроек, если отличается от C.REGISTERS_MAP
+        :return: DeviceModel устройства
+        :raises ValueError: адрес вне 0..7 или уже занят на шине
+        """
+        if not 0 <= device_id <= 0x07:
+            raise ValueError(f"device_id {device_id} вне диапазона 0..7")
+        if device_id in self.devices:
+            raise ValueError(f"device_id {device_id} уже зарегистрирован на шине")
+        channel = DeviceChannel(self.controller, device_id)
+        poller = BusDevicePoller(self, channel, rate)
+        model = DeviceModel(channel, config, poller, desint, registers_map)
+        self.devices[channel.device_id] = (model, poller)
+        return model
+
+    def model(self, device_id):
+        return self.devices[device_id][0]
+
+    def connect(self, port=None, baudrate=None):
+        """Открывает порт и запускает опрос всех устройств"""
+        self.port = port
+        self.baudrate = baudrate
+        connected = False
+        for model, _ in self.devices.values():
+            connected = model.connect(port, baudrate) or connected
+        return connected
+
+    def disconnect(self):
+        for model, _ in self.devices.values():
+            model.disconnect()
+        self.stop()
+        if self.controller.is_connected():
+            self.controller.disconnect()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._wake.clear()
+        if self.threaded:
+            self.thread = threading.Thread(target=self._serve, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def run(self):
+        """
+        Цикл опроса; возвращается после stop() или при потере порта
+        (переоткрытие порта - забота вызывающего, см. _serve и FeederFarm).
+        """
+        while self.running:
+            if not self.controller.is_connected():
+                return
+            try:
+                active = [poller for _, poller in self.devices.values() if poller.running]
+                if not active:
+                    time.sleep(0.01)
+                    continue
+
+                poller = self._next(active)
+                if poller is None:
+                    continue
+                poller.poll()
+                now = time.perf_counter()
+                if poller.rate:
+                    # отставание нагоняем не больше чем на один период
+                    poller.next_due = max(poller.next_due + poller.period, now - poller.period)
+                else:
+                    # очередь среди устройств без частоты: дольше всех ждавшее - первым
+                    poller.next_due = now
+            except Exception as e:
+                print(f"[FeederBus] Ошибка: {e}")
+
+    def _next(self, active):
+        """
+        Устройство для следующего цикла: просроченное устройство с частотой
+        с ближайшим сроком, иначе - устройство без частоты. Если опрашивать
+        некого, ждёт ближайшего срока и возвращает None.
+        """
+        rated = [poller for poller in active if poller.rate]
+        due = min(rated, key=lambda p: p.next_due) if rated else None
+        delay = due.next_due - time.perf_counter() if due is not None else 0.0
+        if delay <= 0 and due is not None:
+            return due
+        unrated = [poller for poller in active if not poller.rate]
+        if unrated:
+            return min(unrated, key=lambda p: p.next_due)
+        self._wake.wait(delay)
+        return None
+
+    def _serve(self):
+        """Собственный поток опроса: после потери порта переоткрываем его с растущей паузой"""
+        while self.running:
+            self.run()
+            if not self.running:
+                break
+            self.losses += 1
+            print(f"[FeederBus] Связь с {self.port} потеряна, переподключение...")
+            backoff = C.RECONNECT_MIN_BACKOFF
+            while self.running and not self.controller.connect(self.port, self.baudrate):
+                self._wake.wait(backoff)
+                backoff = min(backoff * 2, C.RECONNECT_MAX_BACKOFF)
+            if self.running:
+                # устройство могло перезагрузиться: теневые копии недостоверны
+                for model, _ in self.devices.values():
+                    model.shadow.invalidate()
+                print(f"[FeederBus] Связь с {self.port} восстановлена")
+
+    def status(self):
+        """Сводное состояние всех устройств на шине: device_id -> dict"""
+        result = {}
+        for device_id, (model, poller) in self.devices.items():
+            result[device_id] = {
+                "polling": poller.running,
+                "rate_target": poller.rate,
+                "rate_actual": round(1.0 / poller.last_period, 1) if poller.last_period else 0.0,
+                "cycles": poller.cycles,
+                "flags": dict(model.status_flags),
+                "speed_m1": model.get_speed_m1(),
+                "speed_m2": model.get_speed_m2(),
+                "work_time": model.get_work_time(),
+            }
+        return result
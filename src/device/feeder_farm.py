@@ -0,0 +1,146 @@
+"""Модуль параллельной работы нескольких дозаторов на отдельных COM-портах"""
+
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from src import constants as C
+from src.device.serial_device_controller import SerialDeviceController
+from src.device.feeder_bus import FeederBus
+
+FarmSample = namedtuple("FarmSample", "timestamp port device_id address value")
+
+
+class _PortSlot:
+    """Состояние одного порта фермы"""
+
+    def __init__(self, port, baudrate, bus):
+        self.port = port
+        self.baudrate = baudrate
+        self.bus = bus
+        self.state = "idle"
+        self.samples = 0
+        self.failures = 0
+        self.last_error = None
+
+    def as_dict(self):
+        return {
+            "state": self.state,
+            "samples": self.samples,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "devices": self.bus.status(),
+        }
+
+
+class FeederFarm:
+    """
+    Ферма дозаторов: N портов опрашиваются параллельно в пуле потоков.
+
+    Каждый порт обслуживает свой FeederBus (одно или несколько устройств)
+    в отдельном потоке пула. Ошибка или потеря порта затрагивает только его:
+    порт закрывается и переоткрывается с нарастающей паузой, остальные
+    продолжают работу. Значения всех портов сводятся в общий поток stream
+    с метками времени time.monotonic().
+
+    Используются потоки, а не процессы: pyserial отпускает GIL на время
+    ввода-вывода, а модели устройств должны быть доступны GUI в том же процессе.
+    """
+
+    def __init__(self, ports, config, stream_size=10000):
+        """
+        :param ports: список dict {"port", "baudrate", "devices": [{"device_id", "rate"}]}
+        :param config: общие настройки устройств (коэфф. пересчёта скоростей)
+        :param stream_size: ёмкость общего потока значений
+        """
+        self.config = config
+        # каждый порт занимает поток пула на всё время работы
+        self.workers = max(1, len(ports))
+        self.stream = queue.Queue(maxsize=stream_size)
+        self.slots = {}
+        self.running = False
+        self.executor = None
+        self._stream_lock = threading.Lock()
+
+        for item in ports:
+            port = item["port"]
+            controller = SerialDeviceController(port=port, baudrate=item.get("baudrate", C.DEFAULT_BAUDRATE))
+            slot = _PortSlot(port, controller.baudrate, None)
+            slot.bus = FeederBus(controller, threaded=False, on_sample=self._sample_handler(slot))
+            for device in item.get("devices", [{"device_id": C.DEFAULT_DEVICE_ID}]):
+                slot.bus.add_device(device["device_id"], config, rate=device.get("rate"))
+            self.slots[port] = slot
+
+    def _sample_handler(self, slot):
+        def on_sample(device_id, address, value, timestamp):
+            slot.samples += 1
+            sample = FarmSample(timestamp, slot.port, device_id, address, value)
+            with self._stream_lock:
+                if self.stream.full():
+                    self.stream.get_nowait()
+                self.stream.put_nowait(sample)
+        return on_sample
+
+    def model(self, port, device_id=C.DEFAULT_DEVICE_ID):
+        return self.slots[port].bus.model(device_id)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="feeder-farm")
+        for slot in self.slots.values():
+            self.executor.submit(self._run_port, slot)
+
+    def stop(self):
+        self.running = False
+        for slot in self.slots.values():
+            slot.bus.stop()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        for slot in self.slots.values():
+            slot.bus.disconnect()
+            slot.state = "idle"
+
+    def _run_port(self, slot):
+        """Обслуживание одного порта; ошибки не выходят за пределы порта"""
+        backoff = 0.5
+        while self.running:
+            try:
+                if not slot.bus.connect(slot.port, slot.baudrate):
+                    slot.state = "offline"
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, 10.0)
+                    continue
+                slot.state = "online"
+                backoff = 0.5
+                slot.bus.run()
+                if self.running:
+                    slot.state = "lost"
+                    slot.failures += 1
+            except Exception as e:
+                slot.state = "failed"
+                slot.failures += 1
+                slot.last_error = str(e)
+                print(f"[FeederFarm] {slot.port}: {e}")
+            finally:
+                if self.running:
+                    slot.bus.disconnect()
+            if self.running:
+                time.sleep(backoff)
+
+    def drain(self, max_items=None):
+        """Забирает накопленные значения из общего потока"""
+        items = []
+        while max_items is None or len(items) < max_items:
+            try:
+                items.append(self.stream.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def status(self):
+        """Состояние всех портов: port -> dict"""
+        return {port: slot.as_dict() for port, slot in self.slots.items()}
@@ -0,0 +1,234 @@
+"""Модуль конечного автомата цикла подачи пробы
+
+IDLE → DELAY → FEED → END_GRIND → RETURN → PURGE → IDLE
+
+Переходы выполняются по фронтам битов статуса (StatusWord.rising) и по
+истечении времени этапа, а не по уровням, поэтому каждая команда уходит
+один раз на переход. Команда без подтверждения повторяется сразу, всего
+не больше C.FSM_COMMAND_RETRIES попыток.
+
+В ручном режиме автомат сам ведёт цикл командами моторам и клапану:
+этапы выполняет SequenceEngine по точному таймеру, фронты он получает из
+потока опроса. В цикле, запущенном на устройстве (CMD_START), автомат
+только отслеживает этапы по статусу.
+"""
+
+import time
+from collections import deque, namedtuple
+from src import constants as C
+from src.device.status_word import StatusFlag, MOTOR_M1, MOTOR_M2
+from src.device.sequence import SequenceEngine, Step
+
+IDLE = "IDLE"
+DELAY = "DELAY"
+FEED = "FEED"
+END_GRIND = "END_GRIND"
+RETURN = "RETURN"
+PURGE = "PURGE"
+
+Transition = namedtuple("Transition", ["timestamp", "source", "target", "reason"])
+
+# Времена этапов ручного цикла, мс
+TIMINGS = ("T_START", "T_GRIND", "T_PURGING")
+
+
+class FeederStateMachine:
+    """Этапы цикла подачи одного дозатора (DeviceModel)"""
+
+    def __init__(self, model):
+        self.model = model
+        self.state = IDLE
+        self.since = time.monotonic()
+        # цикл ведёт хост (ручной режим); иначе - только наблюдение
+        self.manual = False
+        self.timings = {}
+        self.transitions = deque(maxlen=C.FSM_TRACE_SIZE)
+        self.func_transition = None
+        self.commands = 0
+        self._interlock = False
+        # этапы ручного цикла и отчёт план/факт последнего цикла (StepReport)
+        self.engine = SequenceEngine()
+        self.last_report = []
+
+    def init_func_transition(self, func):
+        """Передаём callback для переходов: func(Transition)"""
+        self.func_transition = func
+
+    # ------------------- Управление -------------------
+
+    def start_manual(self, on_desint=False):
+        """Запуск цикла в ручном режиме (все времена этапов отсчитывает хост)"""
+        if self.state != IDLE or self.engine.running:
+            return False
+        timings = self._load_timings()
+        if timings is None:
+            return False
+        self.timings = timings
+        self.manual = True
+        return self.engine.run(self.manual_steps(on_desint), on_done=self._sequence_done)
+
+    def manual_steps(self, on_desint=False):
+        """Шаги ручного цикла"""
+        model = self.model
+        timings = self.timings
+        purge = timings["T_PURGING"]
+
+        def feed():
+            self._enter(FEED, "T_START")
+            ok = self._send("motor1_forward", model.motor1_forward)
+            ok = self._send("motor2_forward", model.motor2_forward) and ok
+            if on_desint and model.desint is not None:
+                model.desint.send_start()
+            return ok
+
+        def back():
+            self._enter(RETURN, "T_GRIND")
+            ok = self._send("motor2_forward", model.motor2_forward)
+            return self._send("motor1_backward", model.motor1_backward) and ok
+
+        def at_home():
+            if not purge:
+                self._enter(IDLE, "BEG_BLK")
+                return True
+            self._enter(PURGE, "BEG_BLK")
+            return self._send("valve1_on", model.valve1_on)
+
+        def purge_end():
+            ok = self._send("valve1_off", model.valve1_off)
+            self._enter(IDLE, "T_PURGING")
+            return ok
+
+        steps = [
+            Step("start", lambda: self._enter(DELAY, "start")),
+            Step("feed", feed, delay_ms=timings["T_START"]),
+            Step("end_blk", lambda: self._enter(END_GRIND, "END_BLK"), until=StatusFlag.END_BLK),
+            Step("return", back, delay_ms=timings["T_GRIND"]),
+            Step("beg_blk", at_home, until=StatusFlag.BEG_BLK),
+        ]
+        if purge:
+            steps.append(Step("purge_end", purge_end, delay_ms=purge))
+        return steps
+
+    def _load_timings(self):
+        """
+        Времена этапов с устройства (теневая копия или чтение). Не прочитанные
+        берутся из последних применённых настроек окна, затем - из значений
+        по умолчанию; без них цикл не запускается (None).
+        """
+        model = self.model
+        timings = model.read_timings()
+        missing = [name for name in TIMINGS if name not in timings]
+        if not missing:
+            return timings
+        for name in missing:
+            value = model.settings_vars.get(name)
+            try:
+                value = value.get() if hasattr(value, "get") else value
+            except Exception:
+                value = None
+            if value is None:
+                value = model.settings.get(name, {}).get("default")
+            if value is not None:
+                timings[name] = int(value)
+        unresolved = [name for name in missing if name not in timings]
+        if unresolved:
+            message = f"[ERROR] Ручной цикл не запущен: нет значений {', '.join(unresolved)}"
+        else:
+            message = "[WARN] Не прочитаны с устройства, взяты из настроек: " \
+                      + ", ".join(f"{name}={timings[name]}" for name in missing)
+        if model.command_loger is not None:
+            model.command_loger(message)
+        return None if unresolved else timings
+
+    def abort(self, reason="stop"):
+        """Прерывание цикла (команды остановки моторов отправляет вызывающий)"""
+        self.engine.cancel()
+        if self.state == PURGE and self.manual:
+            self._send("valve1_off", self.model.valve1_off)
+        if self.state != IDLE:
+            self._enter(IDLE, reason)
+        self.manual = False
+
+    def _sequence_done(self, report):
+        self.last_report = report
+        self.manual = False
+        if self.model.command_loger is not None:
+            for step in report:
+                if step.planned_s is not None:
+                    self.model.command_loger(
+                        f"[SEQ] {step.name}: план {step.planned_s * 1000:.1f} мс, "
+                        f"факт {step.actual_s * 1000:.1f} мс ({step.error_ms:+.2f})")
+                else:
+                    self.model.command_loger(f"[SEQ] {step.name}: {step.actual_s * 1000:.1f} мс")
+
+    # ------------------- Разбор статуса -------------------
+
+    def on_status(self, status, now=None):
+        """
+        Новое слово статуса (StatusWord), вызывается на каждом чтении.
+
+        Команды отправляются только на переходах, поэтому в установившемся
+        состоянии чтение статуса не порождает записей.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        # M2 не должен вращаться в начальном положении при стоящем M1
+        interlock = status.test(StatusFlag.BEG_BLK) and status.test(MOTOR_M2) and not status.test(MOTOR_M1)
+        if interlock and not self._interlock:
+            self._send("motor2_stop", self.model.motor2_stop)
+        self._interlock = interlock
+
+        if self.manual:
+            self.engine.notify(status.rising)
+        else:
+            self._step_observed(status, now)
+
+    def _step_observed(self, status, now):
+        rising = status.rising
+        state = self.state
+        if state != IDLE and status.falling & StatusFlag.START:
+            self._enter(IDLE, "START off", now)
+        elif state == IDLE and rising & StatusFlag.START:
+            self._enter(DELAY, "START", now)
+        elif state == DELAY and rising & StatusFlag.M1_FWD:
+            self._enter(FEED, "M1_FWD", now)
+        elif state == FEED and rising & StatusFlag.END_BLK:
+            self._enter(END_GRIND, "END_BLK", now)
+        elif state in (FEED, END_GRIND) and rising & StatusFlag.M1_BACK:
+            self._enter(RETURN, "M1_BACK", now)
+        elif state == RETURN and rising & StatusFlag.BEG_BLK:
+            self._enter(PURGE, "BEG_BLK", now)
+
+    # ------------------- Вспомогательные -------------------
+
+    def _enter(self, state, reason, now=None):
+        if now is None:
+            now = time.monotonic()
+        transition = Transition(now, self.state, state, reason)
+        self.transitions.append(transition)
+        self.state = state
+        self.since = now
+        if self.model.command_loger is not None:
+            self.model.command_loger(f"[FSM] {transition.source} → {state} ({reason})")
+        if self.func_transition:
+            self.func_transition(transition)
+
+    def _send(self, name, func):
+        for _ in range(C.FSM_COMMAND_RETRIES):
+            self.commands += 1
+            if func():
+                return True
+        if self.model.command_loger is not None:
+            self.model.command_loger(f"[ERROR] {name}: нет подтверждения после {C.FSM_COMMAND_RETRIES} попыток")
+        return False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "manual": self.manual,
+            "in_state_s": time.monotonic() - self.since,
+            "commands": self.commands,
+            "sequence": self.engine.running,
+            "transitions": len(self.transitions),
+        }
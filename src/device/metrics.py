@@ -0,0 +1,158 @@
+"""Модуль постоянно включённых гистограмм задержек (в духе HdrHistogram)
+
+Значения хранятся в микросекундах в логарифмически-линейных корзинах:
+до 2**SUB_BITS мкс - с точностью 1 мкс, дальше каждая степень двойки
+делится на 2**(SUB_BITS-1) корзин, т.е. относительная погрешность не
+больше 1/2**(SUB_BITS-1) (1.6 %) во всём диапазоне до часов. Запись - пара
+целочисленных операций и инкремент, поэтому гистограммы не выключаются.
+"""
+
+import json
+import threading
+import time
+
+SUB_BITS = 7
+_SUB_COUNT = 1 << SUB_BITS
+_HALF = _SUB_COUNT >> 1
+# до 2**42 мкс (≈ 50 суток)
+_MAX_SHIFT = 42 - SUB_BITS
+BUCKETS = _SUB_COUNT + _MAX_SHIFT * _HALF
+
+
+def bucket_index(us):
+    if us < _SUB_COUNT:
+        return us if us > 0 else 0
+    shift = min(us.bit_length() - SUB_BITS, _MAX_SHIFT)
+    return _SUB_COUNT + (shift - 1) * _HALF + min((us >> shift) - _HALF, _HALF - 1)
+
+
+def bucket_value(index):
+    """Верхняя граница корзины, мкс"""
+    if index < _SUB_COUNT:
+        return index
+    shift, offset = divmod(index - _SUB_COUNT, _HALF)
+    shift += 1
+    return ((offset + _HALF + 1) << shift) - 1
+
+
+class Histogram:
+    """
+    Гистограмма задержек одного измерения.
+
+    Писатель один (поток, в котором идёт измерение); snapshot(reset=True)
+    из другого потока подменяет массив счётчиков целиком, так что окно
+    теряет не больше одной записи, сделанной в момент подмены.
+    """
+
+    def __init__(self):
+        self._counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.since = time.monotonic()
+
+    def record(self, seconds):
+        if seconds < 0:
+            seconds = 0.0
+        us = int(seconds * 1e6)
+        self._counts[bucket_index(us)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+
+    def reset(self):
+        self._counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.since = time.monotonic()
+
+    def percentile(self, p, counts=None, count=None):
+        """p-й процентиль, с (верхняя граница корзины)"""
+        counts = self._counts if counts is None else counts
+        count = self.count if count is None else count
+        if not count:
+            return 0.0
+        rank = max(int(count * p / 100.0 + 0.5), 1)
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return bucket_value(index) / 1e6
+        return self.max
+
+    def snapshot(self, reset=False):
+        """
+        Сводка: число, среднее, процентили, min/max, мс.
+
+        :param reset: начать новое окно (счётчики обнуляются)
+        """
+        counts, count, total, low, high, since = \
+            self._counts, self.count, self.total, self.min, self.max, self.since
+        if reset:
+            self.reset()
+        window = time.monotonic() - since
+        result = {
+            "count": count,
+            "window_s": window,
+            "rate": count / window if window > 0 else 0.0,
+            "mean_ms": total / count * 1000 if count else 0.0,
+            "min_ms": (low or 0.0) * 1000,
+            "max_ms": high * 1000,
+        }
+        for p in (50, 90, 99, 99.9):
+            result[f"p{p:g}_ms"] = self.percentile(p, counts, count) * 1000
+        return result
+
+    def buckets(self):
+        """Непустые корзины: [(верхняя граница, мкс, число)] - для экспорта"""
+        return [(bucket_value(index), n) for index, n in enumerate(self._counts) if n]
+
+
+class Metrics:
+    """Набор именованных гистограмм одного компонента (опрос, контроллер, планировщик)"""
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, seconds):
+        self.histogram(name).record(seconds)
+
+    def snapshot(self, reset=False):
+        """name -> сводка; reset=True начинает новое окно по всем гистограммам"""
+        return {name: histogram.snapshot(reset) for name, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def export(self, path=None, reset=False):
+        """
+        Сводки и корзины всех гистограмм в JSON.
+
+        :param path: файл для записи (None - только вернуть строку)
+        """
+        data = {
+            name: dict(histogram.snapshot(), buckets=histogram.buckets())
+            for name, histogram in sorted(self.histograms.items())
+        }
+        if reset:
+            self.reset()
+        text = json.dumps(data, indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
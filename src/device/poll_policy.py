@@ -0,0 +1,98 @@
+"""Модуль выбора частот фонового опроса по фазе процесса"""
+
+from src import constants as C
+from src.device.device_poller import bus_load
+
+# Биты движения моторов и соответствующие регистры текущего периода
+_MOTOR_BITS = (
+    ((1 << C.FS_M1_FWD) | (1 << C.FS_M1_BACK), C.REG_PERIOD_M1),
+    ((1 << C.FS_M2_FWD) | (1 << C.FS_M2_BACK), C.REG_PERIOD_M2),
+)
+_FORWARD = (1 << C.FS_M1_FWD) | (1 << C.FS_M2_FWD)
+_BACKWARD = (1 << C.FS_M1_BACK) | (1 << C.FS_M2_BACK)
+_RUNNING = (1 << C.FS_START) | (1 << C.FS_RUN)
+
+PHASE_IDLE = "idle"
+PHASE_RUN = "run"
+PHASE_FEED = "feed"
+PHASE_RETURN = "return"
+
+
+class PollPolicy:
+    """
+    Частоты опроса регистров в зависимости от слова статуса.
+
+    Фазы:
+        idle   - процесс не запущен, моторы стоят: редкий опрос статуса;
+        run    - процесс запущен, моторы стоят (задержка, помол, продувка);
+        feed   - мотор идёт вперёд, return - назад: частый опрос статуса,
+                 чтобы точнее поймать фронты BEG_BLK / END_BLK.
+    Регистр периода мотора опрашивается только пока этот мотор движется.
+    В фазах feed/return статус получает остаток доли шины budget после
+    регистров периода, но не больше своей частоты фазы. Если и периоды
+    не помещаются в budget, все частоты уменьшаются пропорционально.
+    """
+
+    def __init__(self, status_rates=None, period_rate=C.POLL_RATE_PERIOD_ACTIVE, budget=C.POLL_BUS_BUDGET):
+        """
+        :param status_rates: фаза -> частота опроса статуса, Гц
+        :param period_rate: частота опроса периода движущегося мотора, Гц
+        """
+        self.status_rates = {
+            PHASE_IDLE: C.POLL_RATE_STATUS_IDLE,
+            PHASE_RUN: C.POLL_RATE_STATUS,
+            PHASE_FEED: C.POLL_RATE_STATUS_ACTIVE,
+            PHASE_RETURN: C.POLL_RATE_STATUS_ACTIVE,
+        }
+        if status_rates:
+            self.status_rates.update(status_rates)
+        self.period_rate = period_rate
+        self.budget = budget
+        self.phase = None
+        self.transitions = 0
+
+    @staticmethod
+    def phase_of(status):
+        if status & _BACKWARD:
+            return PHASE_RETURN
+        if status & _FORWARD:
+            return PHASE_FEED
+        if status & _RUNNING:
+            return PHASE_RUN
+        return PHASE_IDLE
+
+    def rates(self, status, baudrate=C.DEFAULT_BAUDRATE, turnaround=0.0):
+        """
+        :param status: слово статуса (REG_STATUS)
+        :param turnaround: задержка ответа устройства на посылку, с
+        :return: addr -> Гц (0 - не опрашивать)
+        """
+        phase = self.phase_of(status)
+        if phase != self.phase:
+            self.phase = phase
+            self.transitions += 1
+
+        rates = {C.REG_STATUS: self.status_rates[phase]}
+        for bits, addr in _MOTOR_BITS:
+            rates[addr] = self.period_rate if status & bits else 0
+        if phase in (PHASE_FEED, PHASE_RETURN):
+            headroom = self._status_headroom(rates, baudrate, turnaround)
+            if headroom >= self.period_rate:
+                rates[C.REG_STATUS] = min(rates[C.REG_STATUS], headroom)
+
+        load = bus_load(rates, baudrate, turnaround)
+        if load > self.budget:
+            scale = self.budget / load
+            rates = {addr: rate * scale for addr, rate in rates.items()}
+        return rates
+
+    def _status_headroom(self, rates, baudrate, turnaround):
+        """
+        Наибольшая целая частота статуса, Гц, при которой опрос помещается в долю шины budget.
+
+        Статус опрашивается чаще остальных регистров, поэтому посылки задаёт
+        он: остальные регистры добавляют только свои кадры.
+        """
+        others = {addr: rate for addr, rate in rates.items() if addr != C.REG_STATUS}
+        per_hz = bus_load({C.REG_STATUS: 1}, baudrate, turnaround)
+        return int((self.budget - bus_load(others, baudrate)) / per_hz)
@@ -0,0 +1,96 @@
+"""Модуль теневой копии регистров устройства"""
+
+import time
+
+
+class RegisterCache:
+    """
+    Теневая копия регистров устройства.
+
+    Заполняется значениями прочитанных регистров и подтверждённых записей.
+    Позволяет не писать регистры, значение которых не изменилось, и не читать
+    регистры, прочитанные не раньше ttl секунд назад. ttl относится только к
+    чтению: изменения на стороне устройства (сброс, переподключение)
+    обрабатываются сбросом копии через invalidate().
+    """
+
+    def __init__(self, ttl=None):
+        """
+        :param ttl: срок актуальности значения, с (None - бессрочно)
+        """
+        self.ttl = ttl
+        self.values = {}
+        self.updated = {}
+        # записи, отправленные, но не подтверждённые устройством
+        self.dirty = {}
+        self.reads = 0
+        self.reads_saved = 0
+        self.writes = 0
+        self.writes_saved = 0
+
+    def store(self, address, value, timestamp=None):
+        """Запоминает значение, подтверждённое устройством"""
+        self.values[address] = value
+        self.updated[address] = time.monotonic() if timestamp is None else timestamp
+        self.dirty.pop(address, None)
+
+    def invalidate(self, address=None):
+        """Сбрасывает значение регистра (или всю копию)"""
+        if address is None:
+            self.values.clear()
+            self.updated.clear()
+            self.dirty.clear()
+            return
+        self.values.pop(address, None)
+        self.updated.pop(address, None)
+        self.dirty.pop(address, None)
+
+    def is_fresh(self, address, now=None):
+        if address not in self.values or address in self.dirty:
+            return False
+        if self.ttl is None:
+            return True
+        if now is None:
+            now = time.monotonic()
+        return now - self.updated[address] <= self.ttl
+
+    def get(self, address, default=None):
+        """Значение из копии, если оно актуально"""
+        if self.is_fresh(address):
+            return self.values[address]
+        return default
+
+    def stale(self, addresses):
+        """Адреса, которые нужно прочитать с устройства"""
+        now = time.monotonic()
+        stale = [addr for addr in addresses if not self.is_fresh(addr, now)]
+        self.reads += len(stale)
+        self.reads_saved += len(addresses) - len(stale)
+        return stale
+
+    def diff(self, values):
+        """
+        Записи, которые действительно нужно отправить: значения, отличные
+        от копии, отсутствующие в ней или ещё не подтверждённые (срок ttl
+        здесь не учитывается). Отобранные записи помечаются как
+        неподтверждённые до вызова store().
+        """
+        changed = {}
+        for addr, value in values.items():
+            if addr in self.values and addr not in self.dirty and self.values[addr] == value:
+                continue
+            changed[addr] = value
+            self.dirty[addr] = value
+        self.writes += len(changed)
+        self.writes_saved += len(values) - len(changed)
+        return changed
+
+    def stats(self):
+        """Статистика обращений к шине"""
+        return {
+            "reads": self.reads,
+            "reads_saved": self.reads_saved,
+            "writes": self.writes,
+            "writes_saved": self.writes_saved,
+            "dirty": len(self.dirty),
+        }
@@ -0,0 +1,71 @@
+"""Модуль оценки времени ответа устройства (по образцу RTO в TCP, RFC 6298)"""
+
+import src.constants as C
+from src.vmk_codec import FRAME_SIZE
+
+# Бит на байт при 8N1: старт + 8 данных + стоп
+BITS_PER_BYTE = 10
+
+
+def frame_time(baudrate):
+    """Время передачи одного кадра по линии, с"""
+    return FRAME_SIZE * BITS_PER_BYTE / baudrate
+
+
+class RttEstimator:
+    """
+    Сглаженная оценка задержки ответа одного регистра (алгоритм Якобсона/Карелса).
+
+    Оценивается только задержка сверх времени передачи кадров по линии
+    (обработка в устройстве, буферы USB-адаптера), поэтому оценка не зависит
+    от размера пакета и скорости порта.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+    MAX_BACKOFF = 8
+
+    def __init__(self, min_timeout=C.MIN_RESPONSE_TIMEOUT, max_timeout=C.READ_TIMEOUT,
+                 initial_timeout=C.INITIAL_RESPONSE_TIMEOUT, link=None):
+        """
+        :param link: общая оценка для линии; пока у регистра нет своих измерений,
+            используется её таймаут вместо initial_timeout
+        """
+        self.link = link
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.rto = initial_timeout
+        self.backoff = 1
+        self.samples = 0
+        self.timeouts = 0
+
+    def sample(self, rtt):
+        """Учитывает измеренную задержку ответа, с"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += self.BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.ALPHA * (rtt - self.srtt)
+        self.rto = self.srtt + self.K * self.rttvar
+        self.backoff = 1
+        self.samples += 1
+
+    def on_response(self):
+        """Ответ пришёл до таймаута, но без измерения задержки - сбрасываем удвоение"""
+        self.backoff = 1
+
+    def on_timeout(self):
+        """Ответ не пришёл - удваиваем таймаут до следующего успешного измерения"""
+        self.backoff = min(self.backoff * 2, self.MAX_BACKOFF)
+        self.timeouts += 1
+
+    def timeout(self):
+        """Текущий таймаут ожидания ответа (без учёта времени передачи), с"""
+        rto = self.rto
+        if self.srtt is None and self.link is not None and self.link.srtt is not None:
+            rto = self.link.rto
+        return min(self.max_timeout, max(self.min_timeout, rto) * self.backoff)
@@ -0,0 +1,146 @@
+"""Модуль точного выполнения последовательностей шагов на стороне хоста
+
+Шаг выполняется либо через заданное время после предыдущего шага, либо по
+фронту бита статуса. Время отсчитывается по time.perf_counter от момента,
+когда шаг должен был начаться по плану, а не от фактического, поэтому
+ошибки не накапливаются. Ожидание - Event.wait до deadline - spin, затем
+досыпание короткими sleep(0), так что точность старта не зависит от
+периода опроса и составляет доли миллисекунды.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from src import constants as C
+
+
+class Step:
+    """Шаг последовательности"""
+
+    __slots__ = ("name", "action", "delay_ms", "until", "timeout")
+
+    def __init__(self, name, action=None, delay_ms=0, until=None, timeout=None):
+        """
+        :param action: вызывается при выполнении шага (без аргументов)
+        :param delay_ms: пауза после предыдущего шага, мс
+        :param until: маска битов статуса: шаг выполняется по фронту любого из них
+            (после delay_ms)
+        :param timeout: предельное ожидание фронта, с (None - без предела)
+        """
+        self.name = name
+        self.action = action
+        self.delay_ms = delay_ms
+        self.until = until
+        self.timeout = timeout
+
+
+# planned_s / actual_s - от начала последовательности; planned_s = None у шагов по фронту
+StepReport = namedtuple("StepReport", ["name", "planned_s", "actual_s", "error_ms", "ok"])
+
+
+class SequenceEngine:
+    """Выполнение последовательности шагов в отдельном потоке"""
+
+    def __init__(self, spin=C.SEQUENCE_SPIN, clock=time.perf_counter):
+        """:param spin: сколько секунд перед сроком досыпать без Event.wait"""
+        self.spin = spin
+        self.clock = clock
+        self.thread = None
+        self.report = []
+        self.running = False
+        self._cancel = threading.Event()
+        self._edge = threading.Event()
+        self._edges = 0
+        self._lock = threading.Lock()
+
+    def run(self, steps, on_done=None):
+        """
+        Запуск последовательности. Предыдущая должна быть завершена.
+
+        :param on_done: вызывается в потоке последовательности со списком StepReport
+        :return: False, если последовательность уже выполняется
+        """
+        if self.running:
+            return False
+        self.running = True
+        self.report = []
+        self._cancel.clear()
+        self.thread = threading.Thread(target=self._run, args=(list(steps), on_done), daemon=True)
+        self.thread.start()
+        return True
+
+    def cancel(self):
+        self._cancel.set()
+        self._edge.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def notify(self, rising):
+        """Фронты битов статуса (StatusWord.rising) из потока опроса"""
+        if rising and self.running:
+            with self._lock:
+                self._edges |= rising
+            self._edge.set()
+
+    def _sleep_until(self, deadline):
+        """Ожидание срока; False - последовательность отменена"""
+        while True:
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return not self._cancel.is_set()
+            if remaining > self.spin:
+                if self._cancel.wait(remaining - self.spin):
+                    return False
+            else:
+                time.sleep(0)
+
+    def _wait_edge(self, mask, timeout):
+        """Ожидание фронта; False - отмена или таймаут"""
+        deadline = None if timeout is None else self.clock() + timeout
+        while not self._cancel.is_set():
+            with self._lock:
+                if self._edges & mask:
+                    self._edges = 0
+                    return True
+                self._edge.clear()
+            remaining = None if deadline is None else deadline - self.clock()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._edge.wait(remaining)
+        return False
+
+    def _run(self, steps, on_done):
+        start = planned = self.clock()
+        try:
+            for step in steps:
+                planned += step.delay_ms / 1000
+                if not self._sleep_until(planned):
+                    break
+                if step.until is not None:
+                    if not self._wait_edge(step.until, step.timeout):
+                        self.report.append(StepReport(step.name, None, self.clock() - start, None, False))
+                        break
+                    # следующие паузы отсчитываются от фронта
+                    planned = self.clock()
+                    target = None
+                else:
+                    target = planned - start
+                # фактический момент - начало шага, до выполнения действия
+                actual = self.clock() - start
+                error = (actual - target) * 1000 if target is not None else None
+                # фронты до этого момента к следующему шагу не относятся
+                with self._lock:
+                    self._edges = 0
+                ok = True
+                if step.action is not None:
+                    ok = step.action() is not False
+                self.report.append(StepReport(step.name, target, actual, error, ok))
+        except Exception as e:
+            print(f"[SequenceEngine] Ошибка: {e}")
+        finally:
+            # новая последовательность не стартует, пока on_done не отработал
+            try:
+                if on_done:
+                    on_done(self.report)
+            finally:
+                self.running = False
@@ -1,8 +1,12 @@
 import serial
 import threading
 import time
+from contextlib import contextmanager
 from src import constants as C
-from src.crc import crc7_generate
+from src.vmk_codec import VmkCodec, VmkStreamDecoder, FRAME_SIZE, ADDRESS_COUNT
+from src.device.rtt_estimator import RttEstimator, frame_time
+from src.device.capture import CaptureWriter
+from src.device.metrics import Metrics
 
 
 class SerialDeviceController:
@@ -12,10 +16,62 @@ class SerialDeviceController:
                  device_id=C.DEFAULT_DEVICE_ID, timeout=C.READ_TIMEOUT):
         self.port = port
         self.baudrate = baudrate
-        self.device_id = device_id
+        self.codec = VmkCodec(device_id)
+        # Кодеки остальных устройств на общей шине (RS-485), по device_id
+        self._codecs = {self.codec.device_id: self.codec}
+        # Декодер принимает кадры всех устройств, ответы сопоставляются по (device_id, addr)
+        self.decoder = VmkStreamDecoder()
+        self._target = self.codec.device_id
         self.timeout = timeout
+        self._max_timeout = timeout
+        # Адаптивный таймаут: время передачи кадров + сглаженная задержка ответа регистра
+        self.adaptive_timeout = True
+        self.rtt = {}
+        self.link_rtt = RttEstimator(max_timeout=timeout)
+        self.timeouts = 0
+        self._sent_time = 0.0
+        # момент последней отправки кадров в порт (perf_counter)
+        self.last_tx_time = 0.0
+        self._sent_frames = 0
+        self._received = 0
         self.lock = threading.Lock()
         self.serial = None
+        # сколько раз порт был потерян во время обмена
+        self.ports_lost = 0
+        # Записи, отправленные без ожидания подтверждения:
+        # (device_id, addr) -> (value, время отправки)
+        self.pending_acks = {}
+        self.acks_matched = 0
+        self.acks_lost = 0
+        # Буферы приёма/передачи выделяются один раз на все обмены
+        self._rx = bytearray(FRAME_SIZE * ADDRESS_COUNT)
+        self._rx_view = memoryview(self._rx)
+        self._tx = bytearray(FRAME_SIZE * ADDRESS_COUNT)
+        self._tx_view = memoryview(self._tx)
+        # Запись обмена в файл (см. start_capture)
+        self.capture = None
+        # Гистограммы: ожидание блокировки порта, длительность обмена, задержка ответа по регистрам
+        self.metrics = Metrics()
+        self._lock_wait = self.metrics.histogram("lock_wait")
+        self._exchange_time = self.metrics.histogram("exchange")
+        self._rtt_histograms = {}
+
+    @property
+    def device_id(self):
+        return self.codec.device_id
+
+    @device_id.setter
+    def device_id(self, value):
+        self.codec = self._codec(value)
+
+    def _codec(self, device_id):
+        """Кодек устройства (None - устройство по умолчанию)"""
+        if device_id is None:
+            return self.codec
+        codec = self._codecs.get(device_id & 0x07)
+        if codec is None:
+            codec = self._codecs[device_id & 0x07] = VmkCodec(device_id)
+        return codec
 
     @property
     def serial_port(self):
@@ -28,6 +84,9 @@ class SerialDeviceController:
             self.port = port
         if baudrate:
             self.baudrate = baudrate
+        self._max_timeout = timeout if timeout is not None else self.timeout
+        self.rtt = {}
+        self.link_rtt = RttEstimator(max_timeout=self._max_timeout)
         try:
             self.serial = serial.Serial(
                 port=self.port,
@@ -36,6 +95,7 @@ class SerialDeviceController:
                 write_timeout=timeout if timeout is not None else C.WRITE_TIMEOUT
             )
             if self.serial.is_open:
+                self.decoder.reset()
                 #self.start_polling()
                 return True
             return False
@@ -50,79 +110,303 @@ class SerialDeviceController:
         if self.serial and self.serial.is_open:
             self.serial.close()
             self.serial = None
+        if self.capture is not None:
+            self.capture.flush()
 
     def is_connected(self):
         """Проверка состояния соединения"""
         return self.serial is not None and self.serial.is_open
 
+    def _check_port(self, error):
+        """
+        Ошибка ввода-вывода означает потерю порта (сброс или отключение
+        USB-адаптера): порт закрывается, чтобы is_connected() сообщил
+        о разрыве, а ConnectionSupervisor переоткрыл его.
+        """
+        if not isinstance(error, (serial.SerialException, OSError)):
+            return
+        self.ports_lost += 1
+        try:
+            self.serial.close()
+        except Exception:
+            pass
+        self.serial = None
+
+    # ------------------- Запись обмена -------------------
+
+    def start_capture(self, path):
+        """Начинает запись всех кадров обмена в файл; подключение не прерывается"""
+        with self.lock:
+            if self.capture is not None:
+                self.capture.close()
+            self.capture = CaptureWriter(path, self.baudrate)
+        return self.capture
+
+    def stop_capture(self):
+        """Останавливает запись; возвращает число записанных кадров"""
+        with self.lock:
+            capture, self.capture = self.capture, None
+        if capture is None:
+            return 0
+        capture.close()
+        return capture.records
+
+    def _write(self, data):
+        self.serial.write(data)
+        self.last_tx_time = time.perf_counter()
+        if self.capture is not None:
+            self.capture.write_tx(data)
+
+    def _readinto(self, size):
+        n = self.serial.readinto(self._rx_view[:size]) or 0
+        if n and self.capture is not None:
+            self.capture.write_rx(self._rx_view[:n])
+        return n
+
     # ------------------- VMK Protocol -------------------
 
-    def _build_frame(self, address, write=False, data=0x0000):
-        """Собирает кадр согласно VMK протоколу"""
-        byte1 = (
-                0xC0 |
-                (0x20 if write else 0x00) |
-                ((data >> 15) & 0x01) << 4 |
-                ((data >> 14) & 0x01) << 3 |
-                self.device_id
-        )
-        byte2 = address & 0x7F
-        byte3 = (data >> 7) & 0x7F
-        byte4 = data & 0x7F
-
-        frame = bytes([byte1, byte2, byte3, byte4])
-        crc = crc7_generate(frame)
-        return frame + bytes([crc & 0x7F])
-
-    def _parse_response(self, response, expected_address):
-        """Парсит ответ от устройства"""
-        if len(response) != 5:
-            return None
-        if (response[0] & 0xC0) != 0xC0:
-            return None
-        if (response[0] & 0x07) != self.device_id:
-            return None
-        if (response[1] & 0x7F) != expected_address:
-            return None
-        if crc7_generate(response[:4]) != (response[4] & 0x7F):
-            return None
-
-        return (
-                ((response[0] >> 3) & 0x03) << 14 |
-                (response[2] & 0x7F) << 7 |
-                response[3] & 0x7F
-        )
+    def _match_ack(self, device_id, address):
+        """Сопоставляет ответ с ожидающей подтверждения записью"""
+        key = (device_id, address)
+        if key in self.pending_acks:
+            del self.pending_acks[key]
+            self.acks_matched += 1
+            return True
+        return False
+
+    def _feed(self, n, expected=None, timely=True):
+        """
+        Передаёт n принятых байт декодеру и раскладывает кадры:
+        ответы текущего устройства на ожидаемые адреса - в expected,
+        остальные - в подтверждения записей.
+
+        :param timely: чтение завершилось до таймаута порта; иначе момент приёма
+            кадров неизвестен и задержка ответа не измеряется
+        :return: количество заполненных адресов expected
+        """
+        filled = 0
+        responded = []
+        frames = self.decoder.feed(self._rx_view[:n], time.perf_counter())
+        for device_id, address, value, timestamp in frames:
+            if expected is not None and device_id == self._target \
+                    and address in expected and expected[address] is None:
+                expected[address] = value
+                filled += 1
+                self._received += 1
+                responded.append((device_id, address))
+            else:
+                self._match_ack(device_id, address)
+
+        if responded and timely:
+            # Время чтения - момент прихода последнего байта: точно оно только для
+            # последнего кадра чтения, у предыдущих задержка была бы завышена
+            if frames[-1][:2] == responded[-1] and not self.decoder.pending_bytes():
+                device_id, address = responded.pop()
+                # задержка ответа сверх времени передачи запроса и предыдущих ответов
+                wire = frame_time(self.baudrate) * (self._sent_frames + self._received)
+                rtt = max(frames[-1][3] - self._sent_time - wire, 0.0)
+                self._estimator(address, device_id).sample(rtt)
+                self.link_rtt.sample(rtt)
+                self._rtt_histogram(device_id, address).record(rtt)
+            for device_id, address in responded:
+                self._estimator(address, device_id).on_response()
+        return filled
+
+    def _drain(self):
+        """
+        Разбирает байты, пришедшие до отправки запроса (запоздавшие ответы).
+        Вместо сброса буфера они проходят через декодер, чтобы не терять
+        подтверждения записей, отправленных без ожидания.
+        """
+        waiting = self.serial.in_waiting
+        while waiting:
+            n = self._readinto(min(waiting, len(self._rx)))
+            if not n:
+                break
+            self._feed(n)
+            waiting = self.serial.in_waiting
+        # всё, что не пришло за таймаут, считаем потерянным
+        if self.pending_acks:
+            now = time.time()
+            for key, (_, sent) in list(self.pending_acks.items()):
+                if now - sent > self.timeout:
+                    del self.pending_acks[key]
+                    self.acks_lost += 1
+
+    def _estimator(self, address, device_id=None):
+        key = (self.device_id if device_id is None else device_id, address)
+        estimator = self.rtt.get(key)
+        if estimator is None:
+            estimator = self.rtt[key] = RttEstimator(max_timeout=self._max_timeout, link=self.link_rtt)
+        return estimator
+
+    def _rtt_histogram(self, device_id, address):
+        key = (device_id, address)
+        histogram = self._rtt_histograms.get(key)
+        if histogram is None:
+            histogram = self._rtt_histograms[key] = self.metrics.histogram(f"rtt/{device_id}/0x{address:02X}")
+        return histogram
+
+    @contextmanager
+    def _locked(self):
+        """Блокировка порта с учётом времени ожидания"""
+        start = time.perf_counter()
+        with self.lock:
+            self._lock_wait.record(time.perf_counter() - start)
+            yield
+
+    def response_timeout(self, addresses, request_frames=None, device_id=None):
+        """
+        Время ожидания ответов на посылку: передача кадров запроса и ответов
+        по линии плюс наибольшая из оценок задержки ответа регистров.
+        """
+        if not self.adaptive_timeout:
+            return self._max_timeout
+        addresses = tuple(addresses)
+        if request_frames is None:
+            request_frames = len(addresses)
+        wire = frame_time(self.baudrate) * (request_frames + len(addresses))
+        return wire + max(self._estimator(addr, device_id).timeout() for addr in addresses)
+
+    def _set_read_timeout(self, timeout):
+        # округляем до мс, чтобы не перенастраивать порт на каждом чтении
+        timeout = round(timeout + 0.0005, 3)
+        if self.serial.timeout != timeout:
+            self.serial.timeout = timeout
+
+    def _exchange(self, request, expected, codec):
+        """
+        Отправляет посылку и собирает ответы из потока, пока не будут получены
+        все ожидаемые адреса или не истечёт адаптивный таймаут.
+
+        :param expected: dict addr -> None, заполняется значениями из ответов
+        :param codec: кодек устройства, которому адресована посылка
+        """
+        self._drain()
+        self._target = codec.device_id
+        missing = [addr for addr, value in expected.items() if value is None]
+        waiting = len(missing)
+        timeout = self.response_timeout(missing, len(request) // FRAME_SIZE, codec.device_id)
+
+        self._write(request)
+        self._sent_time = self.last_tx_time
+        self._sent_frames = len(request) // FRAME_SIZE
+        self._received = 0
+        deadline = self._sent_time + timeout
+        while waiting:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self._set_read_timeout(remaining)
+            need = min(max(waiting * FRAME_SIZE - self.decoder.pending_bytes(), 1), len(self._rx))
+            n = self._readinto(need)
+            if not n:
+                break
+            # неполное чтение - порт ждал до таймаута (потерянный байт)
+            waiting -= self._feed(n, expected, timely=n == need)
+
+        self._exchange_time.record(time.perf_counter() - self._sent_time)
+        if waiting:
+            self.timeouts += 1
+            for addr in missing:
+                if expected[addr] is None:
+                    self._estimator(addr, codec.device_id).on_timeout()
 
     # ------------------- API -------------------
 
-    def read_register(self, address):
+    # priority принимается для совместимости с TransactionScheduler и не используется.
+    # device_id - адрес устройства на общей шине (None - устройство по умолчанию).
+
+    def read_register(self, address, priority=None, device_id=None):
         """Чтение регистра"""
-        with self.lock:
+        with self._locked():
             if not self.is_connected():
                 return None
             try:
-                request = self._build_frame(address, write=False)
-                self.serial.reset_input_buffer()
-                self.serial.write(request)
-                #time.sleep(0.02)
-                response = self.serial.read(5)
-                return self._parse_response(response, address)
+                codec = self._codec(device_id)
+                expected = {address: None}
+                self._exchange(codec.read_frame(address), expected, codec)
+                return expected[address]
             except Exception as e:
                 print(f"[ERROR] read_register 0x{address:02X}: {e}")
+                self._check_port(e)
                 return None
 
-    def write_register(self, address, value):
+    def write_register(self, address, value, priority=None, device_id=None):
         """Запись в регистр"""
-        with self.lock:
+        with self._locked():
             if not self.is_connected():
                 return False
             try:
-                request = self._build_frame(address, write=True, data=value)
-                self.serial.reset_input_buffer()
-                self.serial.write(request)
-                time.sleep(0.005)
-                response = self.serial.read(5)
-                return self._parse_response(response, address) is not None
+                codec = self._codec(device_id)
+                codec.encode_write_into(self._tx, 0, address, value)
+                expected = {address: None}
+                self._exchange(self._tx_view[:FRAME_SIZE], expected, codec)
+                return expected[address] is not None
             except Exception as e:
                 print(f"[ERROR] write_register 0x{address:02X}: {e}")
-                return False
\ No newline at end of file
+                self._check_port(e)
+                return False
+
+    def read_registers(self, addresses, out=None, priority=None, device_id=None):
+        """
+        Пакетное чтение: все запросы уходят одной посылкой,
+        ответы сопоставляются по адресу.
+
+        :param addresses: адреса регистров
+        :param out: dict для результата (переиспользуется, чтобы не создавать новый)
+        :return: dict addr -> value (None, если ответ не получен)
+        """
+        addresses = tuple(addresses)
+        result = out if out is not None else {}
+        for addr in addresses:
+            result[addr] = None
+        if not addresses:
+            return result
+        with self._locked():
+            if not self.is_connected():
+                return result
+            try:
+                codec = self._codec(device_id)
+                self._exchange(codec.read_burst(addresses), result, codec)
+            except Exception as e:
+                print(f"[ERROR] read_registers {[hex(a) for a in addresses]}: {e}")
+                self._check_port(e)
+        return result
+
+    def write_registers(self, values, wait_ack=True, priority=None, device_id=None):
+        """
+        Пакетная запись: все кадры уходят одной посылкой.
+
+        :param values: dict addr -> value
+        :param wait_ack: ждать подтверждений; если False, подтверждения
+            сопоставляются позже, при следующих обменах (см. pending_acks)
+        :return: dict addr -> bool (подтверждена ли запись)
+        """
+        result = dict.fromkeys(values, False)
+        if not values:
+            return result
+        with self._locked():
+            if not self.is_connected():
+                return result
+            try:
+                codec = self._codec(device_id)
+                size = 0
+                for addr, value in values.items():
+                    codec.encode_write_into(self._tx, size, addr, value)
+                    size += FRAME_SIZE
+                if not wait_ack:
+                    self._drain()
+                    self._write(self._tx_view[:size])
+                    now = time.time()
+                    for addr, value in values.items():
+                        self.pending_acks[(codec.device_id, addr)] = (value, now)
+                    return result
+                acks = dict.fromkeys(values)
+                self._exchange(self._tx_view[:size], acks, codec)
+                for addr, ack in acks.items():
+                    result[addr] = ack is not None
+            except Exception as e:
+                print(f"[ERROR] write_registers {[hex(a) for a in values]}: {e}")
+                self._check_port(e)
+        return result
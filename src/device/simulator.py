@@ -0,0 +1,370 @@
+"""Модуль эмуляции дозатора по VMK протоколу на псевдотерминале (Linux)
+
+Запуск отдельным процессом (путь к порту печатается при старте):
+    python -m src.device.simulator --latency 0.001 --jitter 0.0005 --loss 0.001
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+import tty
+from src import constants as C
+from src.vmk_codec import VmkStreamDecoder, build_frame
+from src.device.rtt_estimator import frame_time
+
+# Значения регистров после включения (периоды - мкс на шаг, времена - мс)
+DEFAULT_REGISTERS = {
+    C.REG_SET_PERIOD_M1: 500,
+    C.REG_SET_PERIOD_M2: 500,
+    C.REG_T_START: 1000,
+    C.REG_T_GRIND: 2000,
+    C.REG_T_PURGING: 1000,
+}
+
+# Регистры, которые устройство вычисляет само; запись в них игнорируется
+READ_ONLY = (C.REG_STATUS, C.REG_PERIOD_M1, C.REG_PERIOD_M2, C.REG_VERIFY)
+
+
+class SimulatedFeeder:
+    """
+    Модель дозатора: регистры, моторы, клапаны и автоматический цикл.
+
+    Мотор 1 перемещает шнек между концевиками BEG_BLK (позиция 0) и END_BLK
+    (позиция travel) со скоростью 1e6 / SET_PERIOD_M1 шагов в секунду и
+    останавливается на концевике. Цикл по CMD_START: задержка T_START →
+    подача (M1 и M2 вперёд) → помол T_GRIND на END_BLK → возврат (M1 назад) →
+    продувка клапаном 1 в течение T_PURGING на BEG_BLK.
+
+    Состояние пересчитывается лениво при обращении к регистрам, события
+    (концевики, таймеры фаз) обрабатываются в порядке их наступления.
+    """
+
+    def __init__(self, device_id=C.DEFAULT_DEVICE_ID, travel=10000, clock=time.monotonic):
+        """
+        :param travel: ход шнека между концевиками, шагов
+        :param clock: источник времени, с
+        """
+        self.device_id = device_id & 0x07
+        self.travel = travel
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """Сброс устройства: регистры по умолчанию, взведён бит RESET"""
+        self.registers = dict.fromkeys(range(C.REG_COM_V2 + 1), 0)
+        self.registers.update(DEFAULT_REGISTERS)
+        self.registers[C.REG_VERIFY] = C.VERIFY_CODE
+        self.position = 0.0
+        self.m1 = 0
+        self.m2 = 0
+        self.valve1 = False
+        self.valve2 = False
+        self.phase = None
+        self.phase_deadline = None
+        self.reset_flag = True
+        self.ping_flag = False
+        self.cycles = 0
+        self.now = self.clock()
+
+    # ------------------- Регистры -------------------
+
+    def read(self, address):
+        self.advance()
+        if address == C.REG_STATUS:
+            value = self.status_word()
+            # RESET и PING сообщаются один раз
+            self.reset_flag = False
+            self.ping_flag = False
+            return value
+        if address == C.REG_PERIOD_M1:
+            return self.registers[C.REG_SET_PERIOD_M1] if self.m1 else 0
+        if address == C.REG_PERIOD_M2:
+            return self.registers[C.REG_SET_PERIOD_M2] if self.m2 else 0
+        return self.registers.get(address, 0)
+
+    def write(self, address, value):
+        """Запись регистра; возвращает значение для подтверждения"""
+        self.advance()
+        if address in READ_ONLY:
+            return self.read(address)
+        self.registers[address] = value
+        if address == C.REG_CONTROL:
+            self._control(value)
+        elif address == C.REG_COM_M1:
+            self.m1 = self._motor_direction(value, self.m1)
+        elif address == C.REG_COM_M2:
+            self.m2 = self._motor_direction(value, self.m2)
+        elif address == C.REG_COM_V1:
+            self.valve1 = self._valve_state(value, self.valve1)
+        elif address == C.REG_COM_V2:
+            self.valve2 = self._valve_state(value, self.valve2)
+        return value
+
+    def status_word(self):
+        bits = {
+            C.FS_START: self.phase is not None,
+            C.FS_BEG_BLK: self.position <= 0,
+            C.FS_END_BLK: self.position >= self.travel,
+            C.FS_M1_FWD: self.m1 > 0,
+            C.FS_M1_BACK: self.m1 < 0,
+            C.FS_M2_FWD: self.m2 > 0,
+            C.FS_M2_BACK: self.m2 < 0,
+            C.FS_VALVE1_ON: self.valve1,
+            C.FS_VALVE2_ON: self.valve2,
+            C.FS_RUN: bool(self.m1 or self.m2),
+            C.FS_RESET: self.reset_flag,
+            C.FS_PING: self.ping_flag,
+        }
+        word = 0
+        for bit, on in bits.items():
+            if on:
+                word |= 1 << bit
+        return word
+
+    @staticmethod
+    def _motor_direction(command, current):
+        if command == C.MOTOR_CMD_START_FWD:
+            return 1
+        if command == C.MOTOR_CMD_START_BACK:
+            return -1
+        if command == C.MOTOR_CMD_STOP:
+            return 0
+        return current
+
+    @staticmethod
+    def _valve_state(command, current):
+        if command == C.VALVE_CMD_ON:
+            return True
+        if command == C.VALVE_CMD_OFF:
+            return False
+        return current
+
+    def _control(self, command):
+        if command == C.CMD_START:
+            if self.phase is None:
+                self._enter("delay", C.REG_T_START)
+        elif command == C.CMD_CHECK:
+            self.ping_flag = True
+        elif command in (C.CMD_STOP, C.CMD_NULL):
+            self.m1 = self.m2 = 0
+            self.valve1 = self.valve2 = False
+            self.phase = None
+            self.phase_deadline = None
+
+    # ------------------- Движение и цикл -------------------
+
+    def _speed(self):
+        period = self.registers[C.REG_SET_PERIOD_M1]
+        return 1e6 / period if period > 0 else 0.0
+
+    def _enter(self, phase, timer_register=None):
+        self.phase = phase
+        self.phase_deadline = None
+        if timer_register is not None:
+            self.phase_deadline = self.now + self.registers[timer_register] / 1000
+
+    def advance(self, now=None):
+        """Продвигает модель до момента now"""
+        if now is None:
+            now = self.clock()
+        while self.now < now:
+            step_end = now
+            event = None
+            speed = self._speed()
+            if self.m1 and speed:
+                target = self.travel if self.m1 > 0 else 0
+                reach = self.now + abs(target - self.position) / speed
+                if reach <= step_end:
+                    step_end, event = reach, "limit"
+            if self.phase_deadline is not None and self.phase_deadline <= step_end:
+                step_end, event = self.phase_deadline, "timer"
+
+            if self.m1 and speed:
+                self.position += self.m1 * speed * (step_end - self.now)
+                self.position = min(max(self.position, 0.0), float(self.travel))
+            self.now = step_end
+            if event == "limit":
+                self._on_limit()
+            elif event == "timer":
+                self._on_timer()
+            if event is None:
+                break
+
+    def _on_limit(self):
+        at_end = self.m1 > 0
+        self.position = float(self.travel) if at_end else 0.0
+        self.m1 = 0
+        if self.phase == "feed" and at_end:
+            self._enter("grind", C.REG_T_GRIND)
+        elif self.phase == "return" and not at_end:
+            self.m2 = 0
+            self.valve1 = True
+            self._enter("purge", C.REG_T_PURGING)
+
+    def _on_timer(self):
+        if self.phase == "delay":
+            self.m1 = self.m2 = 1
+            self._enter("feed")
+        elif self.phase == "grind":
+            self.m1 = -1
+            self._enter("return")
+        elif self.phase == "purge":
+            self.valve1 = False
+            self.phase = None
+            self.phase_deadline = None
+            self.cycles += 1
+
+
+class VmkSimulator:
+    """
+    Эмулятор шины с дозаторами на псевдотерминале.
+
+    Отвечает на кадры VMK от имени устройств из device_ids (кадры других
+    адресов игнорируются, как на RS-485). Время ответа складывается из
+    передачи кадров на заданной скорости (если baudrate задан), задержки
+    latency и случайной добавки до jitter. Ответные байты могут теряться
+    (loss) и искажаться (corruption) с заданной вероятностью на байт.
+    """
+
+    def __init__(self, device_ids=(C.DEFAULT_DEVICE_ID,), latency=0.0005, jitter=0.0, loss=0.0,
+                 corruption=0.0, baudrate=None, travel=10000, seed=None, on_frame=None):
+        """
+        :param latency: время подготовки ответа устройством, с
+        :param jitter: случайная добавка к latency (равномерно от 0 до jitter), с
+        :param loss: вероятность потери байта ответа
+        :param corruption: вероятность искажения байта ответа (инверсия одного бита)
+        :param baudrate: эмулировать время передачи на этой скорости (None - без задержки)
+        :param seed: начальное значение генератора случайных чисел (воспроизводимость)
+        :param on_frame: callback(device_id, address, write, timestamp) на каждый принятый кадр
+        """
+        self.devices = {device_id & 0x07: SimulatedFeeder(device_id, travel) for device_id in device_ids}
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.corruption = corruption
+        self.baudrate = baudrate
+        self.on_frame = on_frame
+        self.random = random.Random(seed)
+        self.decoder = VmkStreamDecoder(with_write=True)
+        self.port = None
+        self.running = False
+        self.thread = None
+        self._master = None
+        self._slave = None
+        self.frames = 0
+        self.replies = 0
+        self.lost_bytes = 0
+        self.corrupted_bytes = 0
+
+    def device(self, device_id=C.DEFAULT_DEVICE_ID):
+        return self.devices[device_id & 0x07]
+
+    def start(self):
+        """Открывает псевдотерминал и запускает обработку; возвращает путь к порту"""
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "replies": self.replies,
+            "lost_bytes": self.lost_bytes,
+            "corrupted_bytes": self.corrupted_bytes,
+            "decoder": self.decoder.stats(),
+        }
+
+    def _serve(self):
+        master = self._master
+        wire = frame_time(self.baudrate) if self.baudrate else 0.0
+        rx_line = 0.0
+        tx_line = 0.0
+        while self.running:
+            try:
+                data = os.read(master, 4096)
+            except OSError:
+                break
+            received = time.perf_counter()
+            rx_line = max(rx_line, received)
+            for device_id, address, value, timestamp, write in self.decoder.feed(data, received):
+                self.frames += 1
+                rx_line += wire
+                if self.on_frame is not None:
+                    self.on_frame(device_id, address, write, timestamp)
+                device = self.devices.get(device_id)
+                if device is None:
+                    continue
+                reply_value = device.write(address, value) if write else device.read(address)
+
+                delay = self.latency + (self.random.uniform(0.0, self.jitter) if self.jitter else 0.0)
+                send_at = max(rx_line, tx_line) + delay
+                pause = send_at - time.perf_counter()
+                if pause > 0:
+                    time.sleep(pause)
+                tx_line = max(send_at, time.perf_counter()) + wire
+                reply = self._damage(build_frame(device_id, address, data=reply_value))
+                try:
+                    os.write(master, reply)
+                except OSError:
+                    return
+                self.replies += 1
+
+    def _damage(self, frame):
+        if not (self.loss or self.corruption):
+            return frame
+        out = bytearray()
+        for byte in frame:
+            if self.loss and self.random.random() < self.loss:
+                self.lost_bytes += 1
+                continue
+            if self.corruption and self.random.random() < self.corruption:
+                byte ^= 1 << self.random.randrange(8)
+                self.corrupted_bytes += 1
+            out.append(byte)
+        return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Эмулятор дозатора VMK на псевдотерминале")
+    parser.add_argument("--ids", type=int, nargs="+", default=[C.DEFAULT_DEVICE_ID])
+    parser.add_argument("--latency", type=float, default=0.0005)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--corruption", type=float, default=0.0)
+    parser.add_argument("--baudrate", type=int, default=None)
+    parser.add_argument("--travel", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = VmkSimulator(args.ids, args.latency, args.jitter, args.loss, args.corruption,
+                             args.baudrate, args.travel, args.seed)
+    print(simulator.start(), flush=True)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+        print(simulator.stats())
+
+
+if __name__ == "__main__":
+    main()
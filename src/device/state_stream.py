@@ -0,0 +1,184 @@
+"""Модуль потока изменений состояния устройства (издатель/подписчики)
+
+Издатель (DeviceModel) передаёт каждое прочитанное значение регистра, а
+подписчики получают только изменения: событие на новое значение регистра и
+по событию на каждый переключившийся бит статуса. У событий сквозной номер
+seq и время time.monotonic(), так что пропуски и порядок видны потребителю.
+
+Темы:
+    register/<имя>  - значение регистра (имя из C.REGISTERS_MAP или 0xNN)
+    status/<бит>    - бит статуса (имя из констант FS_*), значение True/False
+Подписка задаётся шаблонами тем (fnmatch: "status/*", "register/PERIOD_M?")
+и необязательным фильтром событий.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+from fnmatch import fnmatchcase
+from src import constants as C
+from src.device.status_word import STATUS_BITS
+
+StateEvent = namedtuple("StateEvent", ["seq", "timestamp", "topic", "value", "previous"])
+
+
+class Subscription:
+    """
+    Подписка на темы потока.
+
+    С callback события передаются в потоке издателя (обработчик должен быть
+    быстрым и не трогать Tk). Без callback события копятся в очереди
+    ограниченной длины: при переполнении отбрасываются самые старые и
+    растёт dropped; забирать их - get() или drain() из своего потока.
+    """
+
+    def __init__(self, stream, topics, callback=None, predicate=None, maxsize=1000):
+        self.stream = stream
+        self.topics = (topics,) if isinstance(topics, str) else tuple(topics)
+        self.callback = callback
+        self.predicate = predicate
+        self.events = deque(maxlen=maxsize)
+        self.dropped = 0
+        self.delivered = 0
+        self._matches = {}
+        self._ready = threading.Condition()
+
+    def matches(self, topic):
+        result = self._matches.get(topic)
+        if result is None:
+            result = self._matches[topic] = any(fnmatchcase(topic, pattern) for pattern in self.topics)
+        return result
+
+    def _deliver(self, event):
+        if self.predicate is not None and not self.predicate(event):
+            return
+        self.delivered += 1
+        if self.callback is not None:
+            try:
+                self.callback(event)
+            except Exception as e:
+                print(f"[StateStream] Ошибка подписчика {self.topics}: {e}")
+            return
+        with self._ready:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout=None):
+        """Следующее событие (None, если за timeout событий не было)"""
+        with self._ready:
+            if not self.events and not self._ready.wait_for(lambda: self.events, timeout):
+                return None
+            return self.events.popleft()
+
+    def drain(self, max_items=None):
+        """Все накопленные события (не больше max_items)"""
+        with self._ready:
+            count = len(self.events) if max_items is None else min(max_items, len(self.events))
+            return [self.events.popleft() for _ in range(count)]
+
+    def close(self):
+        self.stream.unsubscribe(self)
+
+
+class StateStream:
+    """Поток изменений значений регистров и фронтов битов статуса одного устройства"""
+
+    def __init__(self, registers_map=None, status_register=C.REG_STATUS):
+        """
+        :param registers_map: имя -> адрес регистра (по умолчанию C.REGISTERS_MAP)
+        :param status_register: регистр, биты которого публикуются отдельно
+        """
+        registers_map = registers_map if registers_map is not None else C.REGISTERS_MAP
+        self._register_topics = {addr: f"register/{name}" for name, addr in registers_map.items()}
+        self._register_topics.setdefault(status_register, "register/STATUS")
+        self._bit_topics = tuple((1 << bit, f"status/{name}") for bit, name in STATUS_BITS.items())
+        self.status_register = status_register
+        self.seq = 0
+        self.published = 0
+        self._values = {}
+        self._topics = {}
+        self._subscriptions = ()
+        self._lock = threading.Lock()
+
+    def topic(self, address):
+        topic = self._register_topics.get(address)
+        if topic is None:
+            topic = self._register_topics[address] = f"register/0x{address:02X}"
+        return topic
+
+    def subscribe(self, topics="*", callback=None, predicate=None, maxsize=1000, replay=False):
+        """
+        :param topics: шаблон темы или их список
+        :param predicate: фильтр событий: predicate(event) -> bool
+        :param replay: сразу выдать текущие значения подходящих тем
+            (seq у них - номер события, которым значение было установлено)
+        """
+        subscription = Subscription(self, topics, callback, predicate, maxsize)
+        with self._lock:
+            self._subscriptions += (subscription,)
+            current = [event for event in self._topics.values() if subscription.matches(event.topic)] \
+                if replay else []
+        for event in sorted(current):
+            subscription._deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not subscription)
+
+    def value(self, topic, default=None):
+        """Последнее значение темы"""
+        event = self._topics.get(topic)
+        return event.value if event is not None else default
+
+    def publish(self, address, value, timestamp=None):
+        """
+        Значение регистра из опроса. Повтор прежнего значения событий не
+        порождает.
+
+        :return: число опубликованных событий
+        """
+        with self._lock:
+            self.published += 1
+            previous = self._values.get(address)
+            if previous == value:
+                return 0
+            self._values[address] = value
+            if timestamp is None:
+                timestamp = time.monotonic()
+
+            self.seq += 1
+            topic = self.topic(address)
+            events = [StateEvent(self.seq, timestamp, topic, value, previous)]
+            if address == self.status_register:
+                # фронты битов; при первом чтении публикуются все биты (previous = None)
+                changed = value ^ previous if previous is not None else -1
+                for mask, bit_topic in self._bit_topics:
+                    if changed & mask:
+                        self.seq += 1
+                        events.append(StateEvent(self.seq, timestamp, bit_topic, bool(value & mask),
+                                                 bool(previous & mask) if previous is not None else None))
+            for event in events:
+                self._topics[event.topic] = event
+            subscriptions = self._subscriptions
+
+        for subscription in subscriptions:
+            for event in events:
+                if subscription.matches(event.topic):
+                    subscription._deliver(event)
+        return len(events)
+
+    def reset(self):
+        """Забыть значения (после переподключения первое чтение снова станет событием)"""
+        with self._lock:
+            self._values.clear()
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "events": self.seq,
+            "subscriptions": len(self._subscriptions),
+            "dropped": sum(s.dropped for s in self._subscriptions),
+        }
@@ -0,0 +1,84 @@
+"""Модуль разбора слова статуса (REG_STATUS)
+
+Таблица битов строится из констант FS_* в constants.py, так что номера
+битов задаются в одном месте. Слово хранится как есть; изменившиеся биты
+считаются одним XOR с предыдущим словом, а имена флагов вычисляются
+только при обращении к ним.
+"""
+
+from collections.abc import Mapping
+from enum import IntFlag
+from src import constants as C
+
+# Номер бита -> имя (без префикса FS_), по возрастанию номера
+STATUS_BITS = dict(sorted((getattr(C, name), name[3:]) for name in dir(C) if name.startswith("FS_")))
+# Имя -> номер бита
+STATUS_BIT_NUMBERS = {name: bit for bit, name in STATUS_BITS.items()}
+
+StatusFlag = IntFlag("StatusFlag", {name: 1 << bit for bit, name in STATUS_BITS.items()})
+
+_KNOWN = sum(1 << bit for bit in STATUS_BITS)
+
+MOTOR_M1 = StatusFlag.M1_FWD | StatusFlag.M1_BACK
+MOTOR_M2 = StatusFlag.M2_FWD | StatusFlag.M2_BACK
+
+
+class StatusWord(Mapping):
+    """
+    Слово статуса с предыдущим значением.
+
+    Ведёт себя как словарь имя бита -> bool (значения вычисляются при
+    обращении), а rising/falling дают фронты относительно предыдущего слова.
+    """
+
+    __slots__ = ("word", "previous", "changed")
+
+    def __init__(self, word=0, previous=None):
+        """:param previous: предыдущее слово (None - первое чтение, изменившимися считаются все биты)"""
+        self.word = word
+        self.previous = previous
+        self.changed = word ^ previous if previous is not None else -1
+
+    def __getitem__(self, name):
+        return bool(self.word >> STATUS_BIT_NUMBERS[name] & 1)
+
+    def __iter__(self):
+        return iter(STATUS_BIT_NUMBERS)
+
+    def __len__(self):
+        return len(STATUS_BIT_NUMBERS)
+
+    def __contains__(self, name):
+        return name in STATUS_BIT_NUMBERS
+
+    def __int__(self):
+        return self.word
+
+    def bit(self, number):
+        return bool(self.word >> number & 1)
+
+    def test(self, mask):
+        """Установлен ли хотя бы один бит маски (StatusFlag или int)"""
+        return bool(self.word & mask)
+
+    @property
+    def flags(self):
+        return StatusFlag(self.word & _KNOWN)
+
+    @property
+    def rising(self):
+        """Биты, установившиеся с предыдущего слова"""
+        return self.word & self.changed
+
+    @property
+    def falling(self):
+        """Биты, сбросившиеся с предыдущего слова"""
+        return ~self.word & self.changed if self.previous is not None else 0
+
+    def changed_names(self):
+        """Имена изменившихся битов"""
+        return [name for bit, name in STATUS_BITS.items() if self.changed >> bit & 1]
+
+    def __repr__(self):
+        return f"StatusWord(0x{self.word:04X}, {self.flags!r})"
+
@@ -0,0 +1,136 @@
+"""Модуль истории опрашиваемых регистров (кольцевые буферы на NumPy)
+
+Каждый регистр хранится в заранее выделенном кольцевом буфере меток
+времени (time.monotonic) и значений. Буфер зеркальный: каждая запись
+дублируется во вторую половину массива, поэтому любое окно из последних
+capacity - 1 значений - непрерывный срез, и читатели получают его без
+копирования. Писатель один (поток опроса), блокировок нет: запись
+выполняется до увеличения счётчика count, а читатель по счётчику
+проверяет, не перезаписал ли писатель его окно за время чтения.
+"""
+
+import time
+import numpy as np
+from src import constants as C
+
+
+class RingBuffer:
+    """Кольцевой буфер (timestamp, value) одного регистра"""
+
+    def __init__(self, capacity=C.HISTORY_CAPACITY, dtype=np.uint16):
+        self.capacity = capacity
+        self._ts = np.zeros(2 * capacity, dtype=np.float64)
+        self._values = np.zeros(2 * capacity, dtype=dtype)
+        # всего записей с начала работы; позиция следующей - count % capacity.
+        # Читателям доступны capacity - 1 записей: ячейку следующей записи не отдаём
+        self.count = 0
+
+    def append(self, value, timestamp=None):
+        """Добавление значения (только из потока-писателя)"""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        pos = self.count % self.capacity
+        self._ts[pos] = self._ts[pos + self.capacity] = timestamp
+        self._values[pos] = self._values[pos + self.capacity] = value
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity - 1)
+
+    def last(self, n=None, count=None):
+        """
+        Последние n записей без копирования.
+
+        :param count: снимок self.count, относительно которого берётся окно
+        :return: (timestamps, values) - срезы буфера
+        """
+        if count is None:
+            count = self.count
+        available = min(count, self.capacity - 1)
+        n = available if n is None else min(n, available)
+        end = (count - 1) % self.capacity + self.capacity + 1 if count else 0
+        return self._ts[end - n:end], self._values[end - n:end]
+
+    def since(self, start, count=None):
+        """Записи с меткой времени не раньше start (монотонное время)"""
+        ts, values = self.last(count=count)
+        first = int(np.searchsorted(ts, start, side="left"))
+        return ts[first:], values[first:]
+
+    def intact(self, count, n):
+        """Не перезаписаны ли n записей окна, снятого при self.count == count"""
+        return self.count - count + n <= self.capacity
+
+
+class TimeSeriesStore:
+    """История значений регистров одного устройства"""
+
+    def __init__(self, addresses=(), capacity=C.HISTORY_CAPACITY, dtype=np.uint16):
+        self.capacity = capacity
+        self.dtype = dtype
+        self.buffers = {addr: RingBuffer(capacity, dtype) for addr in addresses}
+
+    def append(self, address, value, timestamp=None):
+        buffer = self.buffers.get(address)
+        if buffer is None:
+            buffer = self.buffers[address] = RingBuffer(self.capacity, self.dtype)
+        buffer.append(value, timestamp)
+
+    def window(self, address, seconds, now=None):
+        """
+        Записи регистра за последние seconds секунд без копирования.
+
+        Срезы действительны, пока писатель не сделает ещё
+        capacity - len(окна) записей; для долгой обработки их нужно копировать.
+
+        :return: (timestamps, values)
+        """
+        buffer = self.buffers[address]
+        if now is None:
+            now = time.monotonic()
+        for _ in range(3):
+            count = buffer.count
+            ts, values = buffer.since(now - seconds, count)
+            if buffer.intact(count, len(ts)):
+                return ts, values
+        # писатель обгоняет читателя: окно копируется
+        return ts.copy(), values.copy()
+
+    def time_weighted_mean(self, address, seconds, transform=None, now=None):
+        """
+        Среднее по времени за последние seconds секунд.
+
+        Значение действует до следующей записи (частота опроса меняется,
+        поэтому простое среднее по записям смещено к частым участкам);
+        запись, сделанная до начала окна, действует с его начала.
+
+        :param transform: векторная функция пересчёта значений (например, период → скорость)
+        :return: среднее или None, если записей нет
+        """
+        buffer = self.buffers.get(address)
+        if buffer is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        start = now - seconds
+        for _ in range(3):
+            count = buffer.count
+            ts, values = buffer.last(count=count)
+            first = max(int(np.searchsorted(ts, start, side="right")) - 1, 0)
+            ts, values = ts[first:], values[first:]
+            if not len(ts):
+                return None
+            edges = np.empty(len(ts) + 1)
+            edges[:-1] = ts
+            edges[0] = max(edges[0], start)
+            edges[-1] = now
+            durations = np.clip(np.diff(edges), 0.0, None)
+            values = transform(values) if transform is not None else values.astype(np.float64)
+            total = durations.sum()
+            result = float((values * durations).sum() / total) if total > 0 else float(values[-1])
+            if buffer.intact(count, len(ts)):
+                return result
+        return result
+
+    def stats(self):
+        return {addr: {"samples": buffer.count, "stored": len(buffer)} for addr, buffer in self.buffers.items()}
@@ -0,0 +1,272 @@
+"""Модуль приоритетного планировщика транзакций перед контроллером устройства"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from src import constants as C
+from src.device.metrics import Metrics
+
+PRIORITY_NAMES = {
+    C.PRIORITY_EMERGENCY: "emergency",
+    C.PRIORITY_CONTROL: "control",
+    C.PRIORITY_SETTINGS: "settings",
+    C.PRIORITY_POLL: "poll",
+}
+
+
+class _Request:
+    """Транзакция в очереди планировщика"""
+
+    __slots__ = ("priority", "seq", "addresses", "values", "wait_ack", "device_id", "result", "done",
+                 "future", "submitted", "deadline", "dispatched")
+
+    def __init__(self, priority, seq, addresses, values, deadline, device_id=None, wait_ack=True):
+        self.priority = priority
+        self.device_id = device_id
+        self.seq = seq
+        self.addresses = addresses
+        self.values = values
+        self.wait_ack = wait_ack
+        self.result = {}
+        self.done = 0
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.deadline = None if deadline is None else self.submitted + deadline
+        self.dispatched = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _LatencyStats:
+    """
+    Задержка от вызова до выхода кадра в порт для одного класса приоритета.
+
+    missed - транзакции, кадры которых в порт так и не ушли (порт закрыт,
+    ошибка записи): задержка для них не определена и не учитывается.
+    """
+
+    __slots__ = ("count", "total", "max", "last", "expired", "missed")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.expired = 0
+        self.missed = 0
+
+    def add(self, latency):
+        self.count += 1
+        self.total += latency
+        self.last = latency
+        if latency > self.max:
+            self.max = latency
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "last_ms": self.last * 1000,
+            "expired": self.expired,
+            "missed": self.missed,
+        }
+
+
+class TransactionScheduler:
+    """
+    Планировщик транзакций с классами приоритета.
+
+    Все обращения к порту выполняет один рабочий поток в порядке приоритета
+    (аварийная остановка, управление, настройки, фоновый опрос). Пакеты
+    фонового опроса длиннее preempt_frames кадров отправляются частями,
+    поэтому команда остановки ждёт не весь пакет, а не больше одной части.
+    По умолчанию часть вмещает весь набор фонового опроса, и он уходит
+    одной посылкой: вытеснение - между пакетами.
+
+    Интерфейс совпадает с SerialDeviceController, поэтому планировщик
+    подставляется вместо контроллера в DevicePoller и DeviceModel.
+    """
+
+    def __init__(self, controller, preempt_frames=C.PREEMPT_FRAMES):
+        """
+        :param controller: SerialDeviceController (или совместимый)
+        :param preempt_frames: размер части пакета фонового опроса, кадров
+        """
+        self.controller = controller
+        self.preempt_frames = preempt_frames
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {priority: _LatencyStats() for priority in PRIORITY_NAMES}
+        # Гистограммы ожидания в очереди по классам приоритета (queue_wait/<класс>)
+        self.metrics = Metrics()
+        self._queue_wait = {priority: self.metrics.histogram(f"queue_wait/{name}")
+                            for priority, name in PRIORITY_NAMES.items()}
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    # ------------------- Совместимость с контроллером -------------------
+
+    @property
+    def device_id(self):
+        return self.controller.device_id
+
+    @property
+    def baudrate(self):
+        return self.controller.baudrate
+
+    @property
+    def link_rtt(self):
+        return getattr(self.controller, "link_rtt", None)
+
+    def connect(self, port=None, baudrate=None, timeout=None):
+        return self.controller.connect(port=port, baudrate=baudrate, timeout=timeout)
+
+    def disconnect(self):
+        self.controller.disconnect()
+
+    def is_connected(self):
+        return self.controller.is_connected()
+
+    def close(self):
+        """Останавливает рабочий поток"""
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self.thread.join(timeout=1.0)
+
+    # ------------------- Постановка в очередь -------------------
+
+    def submit(self, addresses=(), values=None, priority=C.PRIORITY_POLL, deadline=None, device_id=None,
+               wait_ack=True):
+        """
+        Ставит транзакцию в очередь.
+
+        :param addresses: адреса для чтения
+        :param values: dict addr -> value для записи (тогда addresses не используется)
+        :param deadline: через сколько секунд транзакция теряет смысл; просроченная
+            транзакция не отправляется и завершается пустым результатом
+        :param device_id: адрес устройства на общей шине (None - по умолчанию)
+        :param wait_ack: для записи - ждать подтверждений (см. SerialDeviceController.write_registers)
+        :return: Future с dict addr -> value (чтение) или addr -> bool (запись)
+        """
+        addresses = tuple(values) if values is not None else tuple(addresses)
+        request = _Request(priority, next(self._seq), addresses, values, deadline, device_id, wait_ack)
+        with self._cond:
+            # после close() очередь никто не разбирает - сразу пустой результат
+            if not self.running:
+                request.future.set_result(self._empty_result(request))
+                return request.future
+            heapq.heappush(self._heap, request)
+            self._cond.notify()
+        return request.future
+
+    def read_register(self, address, priority=C.PRIORITY_SETTINGS, deadline=None, device_id=None):
+        return self.submit((address,), priority=priority, deadline=deadline,
+                           device_id=device_id).result().get(address)
+
+    def write_register(self, address, value, priority=C.PRIORITY_CONTROL, deadline=None, device_id=None):
+        return bool(self.submit(values={address: value}, priority=priority, deadline=deadline,
+                                device_id=device_id).result().get(address))
+
+    def read_registers(self, addresses, out=None, priority=C.PRIORITY_POLL, deadline=None, device_id=None):
+        result = self.submit(addresses, priority=priority, deadline=deadline, device_id=device_id).result()
+        if out is None:
+            return result
+        out.update(result)
+        return out
+
+    def write_registers(self, values, wait_ack=True, priority=C.PRIORITY_SETTINGS, deadline=None,
+                        device_id=None):
+        future = self.submit(values=dict(values), priority=priority, deadline=deadline, device_id=device_id,
+                             wait_ack=wait_ack)
+        if not wait_ack:
+            return dict.fromkeys(values, False)
+        return future.result()
+
+    def latency_stats(self):
+        """Задержка от вызова до отправки кадра по классам приоритета"""
+        return {PRIORITY_NAMES[priority]: stats.as_dict() for priority, stats in self.stats.items()}
+
+    def reset_stats(self):
+        self.stats = {priority: _LatencyStats() for priority in PRIORITY_NAMES}
+
+    # ------------------- Рабочий поток -------------------
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self.running and not self._heap:
+                    self._cond.wait()
+                if not self.running:
+                    break
+                request = heapq.heappop(self._heap)
+            try:
+                self._execute(request)
+            except Exception as e:
+                print(f"[TransactionScheduler] Ошибка: {e}")
+                if not request.future.done():
+                    request.future.set_result(request.result)
+
+        # оставшиеся транзакции завершаем пустым результатом
+        with self._cond:
+            for request in self._heap:
+                request.future.set_result(request.result)
+            self._heap.clear()
+
+    def _execute(self, request):
+        stats = self.stats.get(request.priority)
+        if request.deadline is not None and time.perf_counter() > request.deadline:
+            if stats is not None:
+                stats.expired += 1
+            request.future.set_result(self._empty_result(request))
+            return
+
+        if request.values is not None:
+            request.result = self.controller.write_registers(request.values, wait_ack=request.wait_ack,
+                                                             priority=request.priority,
+                                                             device_id=request.device_id)
+            self._account(request, stats)
+            request.future.set_result(request.result)
+            return
+
+        remaining = request.addresses[request.done:]
+        if request.priority >= C.PRIORITY_POLL:
+            remaining = remaining[:self.preempt_frames]
+        self.controller.read_registers(remaining, out=request.result, priority=request.priority,
+                                       device_id=request.device_id)
+        self._account(request, stats)
+        request.done += len(remaining)
+        if request.done < len(request.addresses):
+            # остаток пакета возвращается в очередь на своё место,
+            # более приоритетные транзакции выполнятся раньше
+            with self._cond:
+                heapq.heappush(self._heap, request)
+            return
+        request.future.set_result(request.result)
+
+    def _account(self, request, stats):
+        if request.dispatched or stats is None:
+            return
+        request.dispatched = True
+        tx_time = getattr(self.controller, "last_tx_time", None)
+        if tx_time is None:
+            tx_time = time.perf_counter()
+        elif tx_time < request.submitted:
+            # последняя отправка была раньше постановки в очередь - кадры не ушли
+            stats.missed += 1
+            return
+        latency = tx_time - request.submitted
+        stats.add(latency)
+        self._queue_wait[request.priority].record(latency)
+
+    @staticmethod
+    def _empty_result(request):
+        if request.values is not None:
+            return dict.fromkeys(request.values, False)
+        return dict.fromkeys(request.addresses)
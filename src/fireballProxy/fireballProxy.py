@@ -95,6 +95,7 @@ class FireballProxy:
         find_interval_sec: float = 1.0,
         model: Optional[DeviceModel] = None,
         desint_model: Optional[ArduinoDesint] = None,
+        bus=None,
     ):
         self.claim_class = claim_class
         self.claim_name = claim_name
@@ -112,6 +113,8 @@ class FireballProxy:
 
         self.model = model
         self.desint_model = desint_model
+        # FeederBus: сводное состояние нескольких дозаторов на одной шине
+        self.bus = bus
 
         # logger.debug("FireballProxy инициализирован (mask='%s', forward='%s')", claim_name, forward_name)
 
@@ -371,6 +374,18 @@ class FireballProxy:
                     ET.SubElement(intr_system, "T_GRIND").text = str(s.get('T_GRIND').get())
                     ET.SubElement(intr_system, "T_PURGING").text = str(s.get('T_PURGING').get())
 
+            if self.bus is not None:
+                # Все дозаторы на шине
+                bus = ET.SubElement(root, "Auger_bus")
+                for device_id, state in self.bus.status().items():
+                    device = ET.SubElement(bus, "device", id=str(device_id))
+                    ET.SubElement(device, "speed_m1").text = str(state["speed_m1"])
+                    ET.SubElement(device, "speed_m2").text = str(state["speed_m2"])
+                    ET.SubElement(device, "work_time").text = str(state["work_time"])
+                    flags = ET.SubElement(device, "flags")
+                    for name, value in state["flags"].items():
+                        ET.SubElement(flags, name).text = str(int(bool(value)))
+
             if self.desint_model is not None:
                 # Дезинтегратор
                 desint = ET.SubElement(root, "desint")
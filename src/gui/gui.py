@@ -3,6 +3,7 @@ import time
 import sys
 from pathlib import Path
 from tkinter import ttk, scrolledtext, messagebox, StringVar, BooleanVar
+import src.constants as C
 from src.device.device_model import DeviceModel
 
 
@@ -31,9 +32,14 @@ class DeviceGUI:
 
         self.interval_polling = StringVar(value="Обновление окна: ---мс")
         self.interval_upd_data = StringVar(value="Обновление данных: ---мс")
+        self.link_state = StringVar(value="")
         self.interval_work_auger = StringVar(value="Время подачи пробы: ---с")
 
         self._setup_ui()
+        # последний показанный снимок состояния (DeviceState)
+        self._shown_state = None
+        # фронты битов статуса копятся в подписке и разбираются в потоке Tk
+        self._status_events = self.model.stream.subscribe("status/*", replay=True)
         self._start_background_tasks()
 
         if self.model.poller is not None:
@@ -272,10 +278,13 @@ class DeviceGUI:
         ttk.Button(frame, text="Открыть", command=self.model.valve2_on).grid(row=4, column=1)
         ttk.Button(frame, text="Закрыть", command=self.model.valve2_off).grid(row=4, column=2)
 
-        self.model.increase_back_speed = BooleanVar(value=False)
+        # модель читает флаг из потока опроса, поэтому получает обычный bool
+        self.increase_back_speed = BooleanVar(value=False)
+        self.increase_back_speed.trace_add(
+            "write", lambda *_: setattr(self.model, "increase_back_speed", self.increase_back_speed.get()))
         self.model.manual = BooleanVar(value=False)
         ttk.Label(frame, text="Настройка:").grid(row=6, column=0, sticky="w")
-        ttk.Checkbutton(frame, text='Ускорить назад', variable=self.model.increase_back_speed).grid(row=6, column=1)
+        ttk.Checkbutton(frame, text='Ускорить назад', variable=self.increase_back_speed).grid(row=6, column=1)
         ttk.Checkbutton(frame, text='Ручной старт', variable=self.model.manual).grid(row=6, column=2)
 
     def start_process(self):
@@ -341,6 +350,7 @@ class DeviceGUI:
         frame.pack(fill='x', pady=5)
         ttk.Label(frame, textvariable=self.interval_polling).grid(row=0, column=0, padx=5, sticky='w')
         ttk.Label(frame, textvariable=self.interval_upd_data).grid(row=0, column=1, padx=5, sticky='w')
+        ttk.Label(frame, textvariable=self.link_state).grid(row=1, column=0, columnspan=2, padx=5, sticky='w')
 
     def _create_time_work_frame(self, parent):
         frame = ttk.LabelFrame(parent, text="Время работы", padding="5")
@@ -379,7 +389,11 @@ class DeviceGUI:
     def _find_device(self):
         port = self.model.find_device()
         if port:
+            for device in self.model.discovered:
+                self.append_command_log(f"Найдено: {device.port} @ {device.baudrate}, ID {device.device_id}, "
+                                        f"ответ {device.latency * 1000:.1f} мс")
             self.port_var.set(port)
+            self.baud_var.set(self.model.discovered[0].baudrate)
             self.append_command_log(f"✅ Устройство найдено на {port}")
         else:
             self.append_command_log("❌ Устройство не найдено")
@@ -417,19 +431,26 @@ class DeviceGUI:
         #     self.append_command_log(msg)
 
     def _read_settings(self):
-        settings = self.model.read_settings(self.setting_vars)
+        settings = self.model.read_settings(self.setting_vars, force=True)
         for name, val in settings.items():
             if name in self.setting_vars:
                 self.setting_vars[name].set(val)
 
     def _update_status(self):
-        status = self.model.status_flags
-        for name, val in status.items():
-            if name in self.status_vars:
-                self.status_vars[name].set(val)
-
-        self.inning_speed.set(self.model.get_speed_m1())
-        self.rotate_speed.set(self.model.get_speed_m2())
+        # биты статуса - только переключившиеся с прошлого обновления окна
+        for event in self._status_events.drain():
+            var = self.status_vars.get(event.topic[len("status/"):])
+            if var is not None:
+                var.set(event.value)
+
+        # снимок берётся один раз: периоды обоих моторов из одного цикла опроса
+        state = self.model.state
+        shown = self._shown_state
+        if shown is None or state.seq != shown.seq:
+            if shown is None or (state.period_m1, state.period_m2) != (shown.period_m1, shown.period_m2):
+                self.inning_speed.set(round(state.speed_m1, 2))
+                self.rotate_speed.set(round(state.speed_m2, 2))
+            self._shown_state = state
 
         work_time = self.model.get_work_time()
         if work_time is not None:
@@ -442,13 +463,27 @@ class DeviceGUI:
     def _update_interval_upd_data(self, interval):
         self.interval_upd_data.set(f"Обновление данных: {interval}мс")
 
+    def _update_link_state(self):
+        if self.model.supervisor is None:
+            return
+        m = self.model.supervisor.metrics()
+        if m["state"] == "degraded":
+            text = f"Связь потеряна: {m['degraded_now_s']:.1f} с, попыток {m['failed_attempts']}"
+        elif m["recoveries"]:
+            text = (f"Восстановлений: {m['recoveries']}, последнее за {m['last_recover_s']:.2f} с, "
+                    f"без связи всего {m['degraded_s']:.1f} с")
+        else:
+            text = ""
+        self.link_state.set(text)
+
     def _start_background_tasks(self):
         start_time = time.time()
         self._update_status()
 
         processing_time = time.time() - start_time
-        next_interval = max(2, int(processing_time * 1000 * 1.1))
+        next_interval = max(C.GUI_REFRESH_INTERVAL, int(processing_time * 1000 * 1.1))
         self.interval_polling.set(f"Обновление окна: {int(next_interval)}мс")
+        self._update_link_state()
 
         if self.window.winfo_exists():
             self.window.after(next_interval, self._start_background_tasks)
@@ -0,0 +1,228 @@
+"""Модуль кодирования и декодирования кадров VMK протокола (общий для RS232 и TCP)
+
+Формат кадра (5 байт):
+    byte1: 1 1 W D15 D14 ID2 ID1 ID0   (W - запись, D15/D14 - старшие биты данных)
+    byte2: 0 A6..A0                     (адрес регистра)
+    byte3: 0 D13..D7
+    byte4: 0 D6..D0
+    byte5: 0 CRC7                       (CRC7 по 7 младшим битам byte1..byte4)
+"""
+
+import time
+
+from src.crc import crc7_generate
+
+FRAME_SIZE = 5
+FRAME_MARKER = 0xC0
+WRITE_FLAG = 0x20
+ADDRESS_COUNT = 128
+
+
+def _gen_crc7_frame_tables():
+    """
+    Таблицы CRC7 для каждой позиции байта в кадре.
+
+    CRC7 линейна по входным битам (начальное значение 0), поэтому
+    CRC кадра равна XOR четырёх табличных значений - без цикла по байтам.
+    Таблицы индексируются полным байтом (0..255), маска 0x7F уже учтена.
+    """
+    tables = []
+    for pos in range(4):
+        table = [0] * 256
+        for byte in range(256):
+            frame = [0, 0, 0, 0]
+            frame[pos] = byte
+            table[byte] = crc7_generate(frame)
+        tables.append(tuple(table))
+    return tuple(tables)
+
+
+CRC7_FRAME_TABLES = _gen_crc7_frame_tables()
+_CRC_T0, _CRC_T1, _CRC_T2, _CRC_T3 = CRC7_FRAME_TABLES
+
+# Старшие биты данных D15/D14 из первого байта кадра
+_HIGH_BITS = tuple(((byte >> 3) & 0x03) << 14 for byte in range(256))
+
+
+def frame_crc(b1, b2, b3, b4):
+    """CRC7 кадра по четырём байтам (табличный расчёт)"""
+    return _CRC_T0[b1] ^ _CRC_T1[b2] ^ _CRC_T2[b3] ^ _CRC_T3[b4]
+
+
+def build_frame(device_id, address, write=False, data=0x0000):
+    """Собирает кадр согласно VMK протоколу"""
+    buf = bytearray(FRAME_SIZE)
+    encode_into(buf, 0, device_id, address, write, data)
+    return bytes(buf)
+
+
+def encode_into(buf, offset, device_id, address, write=False, data=0x0000):
+    """Кодирует кадр в готовый буфер buf начиная с offset"""
+    b1 = (
+            FRAME_MARKER |
+            (WRITE_FLAG if write else 0x00) |
+            ((data >> 15) & 0x01) << 4 |
+            ((data >> 14) & 0x01) << 3 |
+            (device_id & 0x07)
+    )
+    b2 = address & 0x7F
+    b3 = (data >> 7) & 0x7F
+    b4 = data & 0x7F
+    buf[offset] = b1
+    buf[offset + 1] = b2
+    buf[offset + 2] = b3
+    buf[offset + 3] = b4
+    buf[offset + 4] = frame_crc(b1, b2, b3, b4)
+
+
+def is_valid_at(buf, offset):
+    """Проверяет маркер и CRC кадра в buf[offset:offset + 5]"""
+    b1 = buf[offset]
+    if (b1 & FRAME_MARKER) != FRAME_MARKER:
+        return False
+    return frame_crc(b1, buf[offset + 1], buf[offset + 2], buf[offset + 3]) == (buf[offset + 4] & 0x7F)
+
+
+def decode_value_at(buf, offset):
+    """Значение данных кадра в buf[offset:offset + 5] (без проверок)"""
+    return _HIGH_BITS[buf[offset]] | (buf[offset + 2] & 0x7F) << 7 | buf[offset + 3] & 0x7F
+
+
+class VmkCodec:
+    """Кодек кадров одного устройства с заранее собранными кадрами чтения"""
+
+    def __init__(self, device_id):
+        self.device_id = device_id & 0x07
+        # Кадры чтения для всех 128 адресов собираются один раз
+        self.read_frames = tuple(build_frame(self.device_id, addr) for addr in range(ADDRESS_COUNT))
+        self._bursts = {}
+
+    def read_frame(self, address):
+        """Готовый кадр чтения регистра"""
+        return self.read_frames[address & 0x7F]
+
+    def read_burst(self, addresses):
+        """
+        Посылка из кадров чтения для набора адресов.
+        Посылки кешируются, поэтому повторный опрос того же набора не создаёт объектов.
+        """
+        burst = self._bursts.get(addresses)
+        if burst is None:
+            burst = b"".join(self.read_frames[addr & 0x7F] for addr in addresses)
+            if len(self._bursts) < 64:
+                self._bursts[addresses] = burst
+        return burst
+
+    def write_frame(self, address, data):
+        """Кадр записи регистра"""
+        return build_frame(self.device_id, address, write=True, data=data)
+
+    def encode_write_into(self, buf, offset, address, data):
+        """Кодирует кадр записи в готовый буфер"""
+        encode_into(buf, offset, self.device_id, address, write=True, data=data)
+
+    def address_at(self, buf, offset):
+        """
+        Адрес кадра в buf[offset:offset + 5], если кадр корректен и адресован
+        этому устройству, иначе -1
+        """
+        if (buf[offset] & 0x07) != self.device_id or not is_valid_at(buf, offset):
+            return -1
+        return buf[offset + 1] & 0x7F
+
+    def decode(self, frame, expected_address=None):
+        """Разбирает один кадр, возвращает значение или None"""
+        if len(frame) != FRAME_SIZE:
+            return None
+        address = self.address_at(frame, 0)
+        if address < 0 or (expected_address is not None and address != expected_address):
+            return None
+        return decode_value_at(frame, 0)
+
+
+class VmkStreamDecoder:
+    """
+    Потоковый декодер кадров с самосинхронизацией.
+
+    Начало кадра однозначно определяется маркером 0xC0: у остальных четырёх
+    байт кадра старший бит всегда сброшен. Если кадр не проходит проверку
+    (маркер, старшие биты, CRC7), декодер сдвигается к следующему байту-маркеру,
+    поэтому после потери или лишнего байта синхронизация восстанавливается
+    в пределах одного кадра.
+    """
+
+    def __init__(self, device_id=None, with_write=False):
+        """
+        :param device_id: принимать кадры только этого устройства (None - всех)
+        :param with_write: добавлять к кадру признак записи (для эмуляции устройства)
+        """
+        self.device_id = device_id
+        self.with_write = with_write
+        self._buf = bytearray()
+        self._in_sync = True
+        self.frames = 0
+        self.resyncs = 0
+        self.crc_errors = 0
+        self.dropped_bytes = 0
+
+    def reset(self):
+        """Сбрасывает накопленные байты (счётчики сохраняются)"""
+        self._buf.clear()
+        self._in_sync = True
+
+    def pending_bytes(self):
+        """Количество байт недособранного кадра"""
+        return len(self._buf)
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "resyncs": self.resyncs,
+            "crc_errors": self.crc_errors,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    def feed(self, data, timestamp=None):
+        """
+        Добавляет принятые байты и возвращает декодированные кадры.
+
+        :param data: bytes / bytearray / memoryview
+        :param timestamp: время приёма (по умолчанию time.monotonic())
+        :return: список (device_id, address, value, timestamp)
+            (с with_write - (device_id, address, value, timestamp, write))
+        """
+        buf = self._buf
+        buf += data
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        out = []
+        pos = 0
+        end = len(buf) - FRAME_SIZE
+        while pos <= end:
+            b1 = buf[pos]
+            if (b1 & FRAME_MARKER) == FRAME_MARKER \
+                    and not (buf[pos + 1] | buf[pos + 2] | buf[pos + 3] | buf[pos + 4]) & 0x80:
+                if frame_crc(b1, buf[pos + 1], buf[pos + 2], buf[pos + 3]) == buf[pos + 4]:
+                    if not self._in_sync:
+                        self._in_sync = True
+                        self.resyncs += 1
+                    self.frames += 1
+                    device_id = b1 & 0x07
+                    if self.device_id is None or device_id == self.device_id:
+                        if self.with_write:
+                            out.append((device_id, buf[pos + 1], decode_value_at(buf, pos), timestamp,
+                                        bool(b1 & WRITE_FLAG)))
+                        else:
+                            out.append((device_id, buf[pos + 1], decode_value_at(buf, pos), timestamp))
+                    pos += FRAME_SIZE
+                    continue
+                self.crc_errors += 1
+            # байт не является началом корректного кадра - ищем следующий маркер
+            self._in_sync = False
+            self.dropped_bytes += 1
+            pos += 1
+
+        if pos:
+            del buf[:pos]
+        return out
@@ -0,0 +1,49 @@
+"""Длительности этапов и сводка серии циклов"""
+
+import pytest
+
+from src.device import feeder_fsm as fsm
+from src.device.batch_runner import BatchRunner, RunRecord
+from src.device.feeder_fsm import Transition
+
+
+def test_stages_from_transitions():
+    transitions = [
+        Transition(10.0, fsm.IDLE, fsm.DELAY, "START"),
+        Transition(11.0, fsm.DELAY, fsm.FEED, "M1_FWD"),
+        Transition(14.5, fsm.FEED, fsm.END_GRIND, "END_BLK"),
+        Transition(16.5, fsm.END_GRIND, fsm.RETURN, "M1_BACK"),
+        Transition(19.0, fsm.RETURN, fsm.PURGE, "BEG_BLK"),
+        Transition(19.5, fsm.PURGE, fsm.IDLE, "START off"),
+    ]
+    stages = BatchRunner._stages(transitions, finished=20.0)
+    assert stages == pytest.approx({
+        fsm.DELAY: 1.0, fsm.FEED: 3.5, fsm.END_GRIND: 2.0, fsm.RETURN: 2.5, fsm.PURGE: 0.5})
+    assert fsm.IDLE not in stages
+
+
+def test_stages_repeated_and_unfinished():
+    transitions = [
+        Transition(0.0, fsm.IDLE, fsm.FEED, "M1_FWD"),
+        Transition(1.0, fsm.FEED, fsm.END_GRIND, "END_BLK"),
+        Transition(2.0, fsm.END_GRIND, fsm.FEED, "M1_FWD"),
+    ]
+    # повторный заход суммируется, последний этап длится до конца цикла
+    assert BatchRunner._stages(transitions, finished=4.5) == pytest.approx({fsm.FEED: 3.5, fsm.END_GRIND: 1.0})
+    assert BatchRunner._stages([], finished=1.0) == {}
+
+
+def test_stats_counts_completed_runs_only():
+    runner = BatchRunner(model=None, runs=3)
+    runner.started, runner.finished = 0.0, 36.0
+    runner.records = [
+        RunRecord(0, 0.0, 10.0, {fsm.FEED: 4.0}, True, None, {}),
+        RunRecord(1, 15.0, 8.0, {fsm.FEED: 2.0}, True, None, {}),
+        RunRecord(2, 28.0, 3.0, {fsm.FEED: 1.0}, False, "таймаут в FEED", {}),
+    ]
+    stats = runner.stats()
+    assert (stats["runs"], stats["completed"], stats["failed"]) == (3, 2, 1)
+    assert stats["mean_cycle_s"] == pytest.approx(9.0)
+    assert stats["mean_stage_s"] == pytest.approx({fsm.FEED: 3.0})
+    assert stats["samples_per_hour"] == pytest.approx(200.0)
+    assert stats["cycle_per_hour"] == pytest.approx(400.0)
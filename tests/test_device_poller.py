@@ -0,0 +1,48 @@
+"""Расписание опроса DevicePoller и отчёт о времени цикла"""
+
+import time
+
+import pytest
+
+from src import constants as C
+from src.device.device_poller import DevicePoller, bus_load
+
+
+class FakeController:
+    baudrate = C.DEFAULT_BAUDRATE
+    link_rtt = None
+
+    def __init__(self):
+        self.reads = []
+
+    def is_connected(self):
+        return True
+
+    def read_registers(self, addresses, out=None, priority=None):
+        self.reads.append(tuple(addresses))
+        out.update(dict.fromkeys(addresses, 0))
+        return out
+
+
+def test_cycle_time_reported_once_per_full_cycle():
+    controller = FakeController()
+    poller = DevicePoller(controller)
+    poller.init_polling_config((C.REG_STATUS, C.REG_PERIOD_M1), rates={C.REG_STATUS: 200, C.REG_PERIOD_M1: 20})
+    periods = []
+    poller.init_func_time_calc(periods.append)
+    poller.start()
+    time.sleep(0.3)
+    poller.stop()
+    # посылок с одним STATUS много, а цикл - пока не прочитан и PERIOD_M1 (50 мс)
+    assert poller.bursts > 3 * poller.cycles
+    assert len(periods) == poller.cycles
+    assert all(period >= 40 for period in periods[1:])
+
+
+def test_bus_budget_uses_bus_load():
+    poller = DevicePoller(FakeController())
+    rates = {C.REG_STATUS: 250, C.REG_PERIOD_M1: 50}
+    poller.init_polling_config(tuple(rates), rates=rates)
+    budget = poller.check_bus_budget()
+    assert budget["utilization"] == pytest.approx(bus_load(rates, C.DEFAULT_BAUDRATE))
+    assert budget["fits"] == (budget["utilization"] <= C.POLL_BUS_BUDGET)
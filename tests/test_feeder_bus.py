@@ -0,0 +1,51 @@
+"""Регистрация устройств и порядок их опроса на общей шине"""
+
+import time
+
+import pytest
+
+from src.device.feeder_bus import FeederBus
+from src.device.serial_device_controller import SerialDeviceController
+
+
+def test_add_device_rejects_bad_ids():
+    bus = FeederBus(SerialDeviceController(), threaded=False)
+    bus.add_device(1, {})
+    with pytest.raises(ValueError):
+        bus.add_device(1, {})
+    with pytest.raises(ValueError):
+        bus.add_device(8, {})
+    with pytest.raises(ValueError):
+        bus.add_device(-1, {})
+    assert list(bus.devices) == [1]
+
+
+def _bus_with_pollers(*rates):
+    bus = FeederBus(SerialDeviceController(), threaded=False)
+    for device_id, rate in enumerate(rates):
+        bus.add_device(device_id, {}, rate=rate)
+    return bus, [poller for _, poller in bus.devices.values()]
+
+
+def test_overdue_rated_device_goes_first():
+    bus, (fast, slow, background) = _bus_with_pollers(100, 50, None)
+    now = time.perf_counter()
+    fast.next_due, slow.next_due, background.next_due = now - 0.001, now - 0.002, now - 1.0
+    # устройство без частоты ждало дольше всех, но срок есть только у устройств с частотой
+    assert bus._next([fast, slow, background]) is slow
+
+
+def test_unrated_devices_use_slack_in_turn():
+    bus, (rated, first, second) = _bus_with_pollers(10, None, None)
+    now = time.perf_counter()
+    rated.next_due = now + 0.1
+    first.next_due, second.next_due = now - 0.001, now - 0.002
+    assert bus._next([rated, first, second]) is second
+
+
+def test_waits_for_nearest_deadline():
+    bus, (rated,) = _bus_with_pollers(100)
+    rated.next_due = time.perf_counter() + 0.005
+    start = time.perf_counter()
+    assert bus._next([rated]) is None
+    assert time.perf_counter() - start >= 0.004
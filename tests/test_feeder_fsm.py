@@ -0,0 +1,124 @@
+"""Переходы автомата цикла подачи по фронтам статуса"""
+
+from src import constants as C
+from src.device import feeder_fsm as fsm
+from src.device.feeder_fsm import FeederStateMachine
+from src.device.status_word import StatusWord
+
+
+class FakeModel:
+    """DeviceModel без порта: команды записываются в журнал и подтверждаются"""
+
+    desint = None
+
+    def __init__(self, timings=None):
+        self.sent = []
+        self.log = []
+        self.command_loger = self.log.append
+        self.timings = {"T_START": 1000, "T_GRIND": 2000, "T_PURGING": 500} if timings is None else timings
+        self.settings = {}
+        self.settings_vars = {}
+
+    def read_timings(self):
+        return dict(self.timings)
+
+    def __getattr__(self, name):
+        if name.startswith(("motor", "valve")):
+            return lambda: self.sent.append(name) or True
+        raise AttributeError(name)
+
+
+def bits(*numbers):
+    return sum(1 << number for number in numbers)
+
+
+def feed(machine, words, start=0.0):
+    previous = None
+    for index, word in enumerate(words):
+        machine.on_status(StatusWord(word, previous), now=start + index)
+        previous = word
+
+
+def test_observed_cycle_follows_edges():
+    machine = FeederStateMachine(FakeModel())
+    transitions = []
+    machine.init_func_transition(transitions.append)
+    start = bits(C.FS_START)
+    feed(machine, [
+        bits(C.FS_BEG_BLK),
+        bits(C.FS_BEG_BLK, C.FS_START),
+        start | bits(C.FS_M1_FWD, C.FS_M2_FWD),
+        start | bits(C.FS_M1_FWD, C.FS_M2_FWD),
+        start | bits(C.FS_END_BLK, C.FS_M1_FWD, C.FS_M2_FWD),
+        start | bits(C.FS_END_BLK, C.FS_M2_FWD),
+        start | bits(C.FS_M1_BACK, C.FS_M2_FWD),
+        start | bits(C.FS_BEG_BLK, C.FS_VALVE1_ON),
+        bits(C.FS_BEG_BLK),
+    ])
+    assert [(t.target, t.reason) for t in transitions] == [
+        (fsm.DELAY, "START"),
+        (fsm.FEED, "M1_FWD"),
+        (fsm.END_GRIND, "END_BLK"),
+        (fsm.RETURN, "M1_BACK"),
+        (fsm.PURGE, "BEG_BLK"),
+        (fsm.IDLE, "START off"),
+    ]
+    # в наблюдаемом цикле хост ничего не пишет
+    assert machine.model.sent == []
+    assert machine.commands == 0
+
+
+def test_level_does_not_retrigger():
+    machine = FeederStateMachine(FakeModel())
+    # START уже установлен на первом чтении - это фронт, дальше только уровень
+    feed(machine, [bits(C.FS_START)] * 5)
+    assert machine.state == fsm.DELAY
+    assert len(machine.transitions) == 1
+
+
+def test_start_off_returns_to_idle_from_any_stage():
+    machine = FeederStateMachine(FakeModel())
+    feed(machine, [0, bits(C.FS_START), bits(C.FS_START, C.FS_M1_FWD), bits(C.FS_M1_FWD)])
+    assert machine.state == fsm.IDLE
+    assert machine.transitions[-1].reason == "START off"
+
+
+def test_interlock_stops_m2_once_per_edge():
+    machine = FeederStateMachine(FakeModel())
+    locked = bits(C.FS_BEG_BLK, C.FS_M2_FWD)
+    feed(machine, [bits(C.FS_BEG_BLK), locked, locked, locked, bits(C.FS_BEG_BLK), locked])
+    assert machine.model.sent == ["motor2_stop", "motor2_stop"]
+    # M1 вращается - блокировка не срабатывает
+    machine = FeederStateMachine(FakeModel())
+    feed(machine, [locked | bits(C.FS_M1_BACK)])
+    assert machine.model.sent == []
+
+
+class FakeVar:
+    """Переменная окна (tk.IntVar): get() падает, если поле пустое"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        if self.value == "":
+            raise ValueError("пустое поле")
+        return self.value
+
+
+def test_unread_timings_fall_back_to_settings():
+    model = FakeModel(timings={"T_START": 1000})
+    model.settings_vars = {"T_GRIND": FakeVar(1500), "T_PURGING": FakeVar("")}
+    model.settings = {"T_PURGING": {"default": 3000}}
+    machine = FeederStateMachine(model)
+    assert machine._load_timings() == {"T_START": 1000, "T_GRIND": 1500, "T_PURGING": 3000}
+    assert model.log[-1].startswith("[WARN]")
+
+
+def test_manual_start_refused_without_timings():
+    model = FakeModel(timings={"T_START": 1000, "T_GRIND": 2000})
+    machine = FeederStateMachine(model)
+    assert not machine.start_manual()
+    assert machine.state == fsm.IDLE and not machine.manual
+    assert model.sent == []
+    assert "T_PURGING" in model.log[-1]
@@ -0,0 +1,64 @@
+"""Корзины и процентили гистограмм задержек"""
+
+import json
+
+import pytest
+
+from src.device.metrics import Histogram, Metrics, bucket_index, bucket_value, BUCKETS, SUB_BITS
+
+
+def test_small_values_are_exact():
+    for us in range(1 << SUB_BITS):
+        assert bucket_value(bucket_index(us)) == us
+
+
+@pytest.mark.parametrize("us", [128, 129, 255, 256, 1000, 5800, 123456, 10 ** 9])
+def test_bucket_relative_error(us):
+    upper = bucket_value(bucket_index(us))
+    assert upper >= us
+    assert (upper - us) / us <= 1 / (1 << (SUB_BITS - 1))
+
+
+def test_bucket_index_monotonic():
+    previous = -1
+    for us in range(0, 1 << 16, 7):
+        index = bucket_index(us)
+        assert previous <= index < BUCKETS
+        previous = index
+    assert bucket_index(1 << 60) == BUCKETS - 1
+
+
+def test_percentile_and_snapshot_reset():
+    histogram = Histogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    assert histogram.percentile(50) == pytest.approx(0.050, rel=0.02)
+    assert histogram.percentile(99) == pytest.approx(0.099, rel=0.02)
+    snapshot = histogram.snapshot(reset=True)
+    assert snapshot["count"] == 100
+    assert snapshot["mean_ms"] == pytest.approx(50.5)
+    assert snapshot["min_ms"] == pytest.approx(1.0)
+    assert snapshot["max_ms"] == pytest.approx(100.0)
+    assert histogram.count == 0
+    assert histogram.snapshot()["p50_ms"] == 0.0
+
+
+def test_negative_recorded_as_zero():
+    histogram = Histogram()
+    histogram.record(-0.001)
+    assert histogram.buckets() == [(0, 1)]
+
+
+def test_metrics_export(tmp_path):
+    metrics = Metrics()
+    metrics.record("read", 0.002)
+    metrics.record("read", 0.003)
+    metrics.record("lock", 0.0)
+    path = tmp_path / "metrics.json"
+    text = metrics.export(path, reset=True)
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data == json.loads(text)
+    assert sorted(data) == ["lock", "read"]
+    assert data["read"]["count"] == 2
+    assert sum(n for _, n in data["read"]["buckets"]) == 2
+    assert metrics.histogram("read").count == 0
@@ -0,0 +1,74 @@
+"""Выбор частот опроса по фазе процесса (PollPolicy)"""
+
+import pytest
+
+from src import constants as C
+from src.device.device_poller import bus_load
+from src.device.poll_policy import PollPolicy, PHASE_IDLE, PHASE_RUN, PHASE_FEED, PHASE_RETURN
+
+RATES = {PHASE_IDLE: 10, PHASE_RUN: 50, PHASE_FEED: 100, PHASE_RETURN: 120}
+
+
+def bits(*numbers):
+    return sum(1 << number for number in numbers)
+
+
+@pytest.mark.parametrize("status, phase", [
+    (0, PHASE_IDLE),
+    (bits(C.FS_BEG_BLK), PHASE_IDLE),
+    (bits(C.FS_START), PHASE_RUN),
+    (bits(C.FS_RUN), PHASE_RUN),
+    (bits(C.FS_START, C.FS_M1_FWD), PHASE_FEED),
+    (bits(C.FS_M2_FWD), PHASE_FEED),
+    (bits(C.FS_START, C.FS_M1_BACK, C.FS_M2_FWD), PHASE_RETURN),
+    (bits(C.FS_M2_BACK), PHASE_RETURN),
+])
+def test_phase_of(status, phase):
+    assert PollPolicy.phase_of(status) == phase
+
+
+def test_idle_polls_status_only():
+    policy = PollPolicy(RATES, period_rate=20)
+    assert policy.rates(0, baudrate=115200) == {C.REG_STATUS: 10, C.REG_PERIOD_M1: 0, C.REG_PERIOD_M2: 0}
+
+
+def test_period_polled_only_while_motor_moves():
+    policy = PollPolicy(RATES, period_rate=20)
+    rates = policy.rates(bits(C.FS_START, C.FS_M1_FWD), baudrate=115200)
+    assert rates == {C.REG_STATUS: 100, C.REG_PERIOD_M1: 20, C.REG_PERIOD_M2: 0}
+    rates = policy.rates(bits(C.FS_START, C.FS_M1_BACK, C.FS_M2_FWD), baudrate=115200)
+    assert rates == {C.REG_STATUS: 120, C.REG_PERIOD_M1: 20, C.REG_PERIOD_M2: 20}
+
+
+def test_rates_scaled_to_budget():
+    policy = PollPolicy({PHASE_FEED: 1000}, period_rate=200, budget=0.5)
+    status = bits(C.FS_M1_FWD, C.FS_M2_FWD)
+    rates = policy.rates(status, baudrate=9600, turnaround=0.001)
+    assert bus_load(rates, 9600, 0.001) == pytest.approx(0.5)
+    # пропорции между регистрами сохраняются
+    assert rates[C.REG_STATUS] / rates[C.REG_PERIOD_M1] == pytest.approx(5.0)
+
+
+def test_phase_transitions_counted():
+    policy = PollPolicy(RATES)
+    for status in (0, 0, bits(C.FS_START), bits(C.FS_START, C.FS_M1_FWD), 0):
+        policy.rates(status)
+    assert policy.phase == PHASE_IDLE
+    assert policy.transitions == 4
+
+
+@pytest.mark.parametrize("turnaround", [0.0, 0.0005])
+def test_status_takes_budget_left_by_periods(turnaround):
+    policy = PollPolicy({PHASE_FEED: 400}, period_rate=50, budget=0.8)
+    status = bits(C.FS_M1_FWD, C.FS_M2_FWD)
+    rates = policy.rates(status, baudrate=38400, turnaround=turnaround)
+    # периоды не урезаются, статус занимает остаток шины
+    assert rates[C.REG_PERIOD_M1] == rates[C.REG_PERIOD_M2] == 50
+    assert 150 < rates[C.REG_STATUS] < 400
+    assert bus_load(rates, 38400, turnaround) == pytest.approx(0.8, abs=0.005)
+
+
+def test_status_capped_by_phase_rate():
+    policy = PollPolicy({PHASE_FEED: 400}, period_rate=50, budget=0.8)
+    rates = policy.rates(bits(C.FS_M1_FWD), baudrate=115200, turnaround=0.0005)
+    assert rates == {C.REG_STATUS: 400, C.REG_PERIOD_M1: 50, C.REG_PERIOD_M2: 0}
@@ -0,0 +1,61 @@
+"""Теневая копия регистров: отбор записей и чтений"""
+
+import time
+
+from src.device.register_cache import RegisterCache
+
+
+def test_diff_skips_unchanged():
+    cache = RegisterCache(ttl=5.0)
+    cache.store(0x01, 100)
+    cache.store(0x02, 200)
+    assert cache.diff({0x01: 100, 0x02: 201, 0x03: 5}) == {0x02: 201, 0x03: 5}
+    assert cache.stats()["writes"] == 2
+    assert cache.stats()["writes_saved"] == 1
+
+
+def test_unconfirmed_write_is_resent():
+    cache = RegisterCache(ttl=5.0)
+    cache.store(0x01, 100)
+    assert cache.diff({0x01: 101}) == {0x01: 101}
+    # подтверждения не было - запись повторяется даже с тем же значением
+    assert cache.diff({0x01: 101}) == {0x01: 101}
+    cache.store(0x01, 101)
+    assert cache.diff({0x01: 101}) == {}
+    assert cache.stats()["dirty"] == 0
+
+
+def test_diff_ignores_ttl():
+    cache = RegisterCache(ttl=5.0)
+    cache.store(0x01, 100, timestamp=time.monotonic() - 10)
+    # подтверждённое значение не перезаписывается, даже если устарело для чтения
+    assert cache.diff({0x01: 100}) == {}
+    assert cache.stale([0x01]) == [0x01]
+
+
+def test_stale_respects_ttl():
+    cache = RegisterCache(ttl=5.0)
+    now = time.monotonic()
+    cache.store(0x01, 1, timestamp=now)
+    cache.store(0x02, 2, timestamp=now - 10)
+    assert cache.stale([0x01, 0x02, 0x03]) == [0x02, 0x03]
+    assert cache.get(0x01) == 1
+    assert cache.get(0x02) is None
+    assert cache.stats()["reads_saved"] == 1
+
+
+def test_no_ttl_never_expires():
+    cache = RegisterCache(ttl=None)
+    cache.store(0x01, 1, timestamp=0.0)
+    assert cache.stale([0x01]) == []
+
+
+def test_invalidate():
+    cache = RegisterCache(ttl=5.0)
+    cache.store(0x01, 1)
+    cache.store(0x02, 2)
+    cache.invalidate(0x01)
+    assert cache.stale([0x01, 0x02]) == [0x01]
+    cache.invalidate()
+    assert cache.stale([0x01, 0x02]) == [0x01, 0x02]
+    assert cache.diff({0x02: 2}) == {0x02: 2}
@@ -0,0 +1,46 @@
+"""Поток изменений состояния: события подписчикам и сброс при подключении"""
+
+from src import constants as C
+from src.device.device_model import DeviceModel
+from src.device.state_stream import StateStream
+from src.device.status_word import STATUS_BITS
+
+
+class FakeController:
+    baudrate = C.DEFAULT_BAUDRATE
+    device_id = C.DEFAULT_DEVICE_ID
+
+    def connect(self, port=None, baudrate=None, timeout=None):
+        return True
+
+    def is_connected(self):
+        return True
+
+
+def test_only_changes_and_status_edges_published():
+    stream = StateStream()
+    subscription = stream.subscribe("status/*")
+    stream.publish(C.REG_STATUS, 1 << C.FS_BEG_BLK)
+    stream.publish(C.REG_STATUS, 1 << C.FS_BEG_BLK)
+    stream.publish(C.REG_STATUS, 1 << C.FS_START)
+    events = subscription.drain()
+    # первое чтение - все биты, затем два переключившихся
+    assert len(events) == len(STATUS_BITS) + 2
+    assert [(e.topic, e.value) for e in events[-2:]] == [("status/START", True), ("status/BEG_BLK", False)]
+
+
+def test_replay_gives_current_values():
+    stream = StateStream()
+    stream.publish(C.REG_PERIOD_M1, 500)
+    subscription = stream.subscribe("register/PERIOD_M?", replay=True)
+    assert [(e.topic, e.value) for e in subscription.drain()] == [("register/PERIOD_M1", 500)]
+
+
+def test_connect_republishes_first_read():
+    model = DeviceModel(FakeController(), {})
+    subscription = model.stream.subscribe("status/BEG_BLK")
+    model.ingest(C.REG_STATUS, 1 << C.FS_BEG_BLK)
+    model.connect()
+    # то же значение после переподключения снова приходит подписчикам (окно, журналы)
+    model.ingest(C.REG_STATUS, 1 << C.FS_BEG_BLK)
+    assert [e.value for e in subscription.drain()] == [True, True]
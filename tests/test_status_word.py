@@ -0,0 +1,52 @@
+"""Разбор слова статуса: флаги, фронты, интерфейс словаря"""
+
+from src import constants as C
+from src.device.status_word import StatusWord, StatusFlag, STATUS_BITS, MOTOR_M1, MOTOR_M2
+
+
+def bits(*numbers):
+    return sum(1 << number for number in numbers)
+
+
+def test_status_bits_follow_constants():
+    assert STATUS_BITS[C.FS_START] == "START"
+    assert STATUS_BITS[C.FS_PING] == "PING"
+    assert list(STATUS_BITS) == sorted(STATUS_BITS)
+    assert StatusFlag.M2_BACK == 1 << C.FS_M2_BACK
+
+
+def test_mapping_interface():
+    status = StatusWord(bits(C.FS_START, C.FS_M1_FWD))
+    assert status["START"] and status["M1_FWD"]
+    assert not status["END_BLK"]
+    assert "RUN" in status and "UNKNOWN" not in status
+    assert len(status) == len(STATUS_BITS)
+    assert [name for name, value in status.items() if value] == ["START", "M1_FWD"]
+    assert int(status) == bits(C.FS_START, C.FS_M1_FWD)
+
+
+def test_first_read_marks_all_changed():
+    status = StatusWord(bits(C.FS_RUN))
+    assert status.changed == -1
+    assert status.rising == bits(C.FS_RUN)
+    assert status.falling == 0
+    assert status.changed_names() == list(STATUS_BITS.values())
+
+
+def test_rising_and_falling_edges():
+    previous = bits(C.FS_START, C.FS_M1_FWD)
+    status = StatusWord(bits(C.FS_START, C.FS_END_BLK), previous)
+    assert status.rising == bits(C.FS_END_BLK)
+    assert status.falling == bits(C.FS_M1_FWD)
+    assert status.changed_names() == ["END_BLK", "M1_FWD"]
+    assert StatusWord(previous, previous).changed_names() == []
+
+
+def test_masks_and_flags():
+    status = StatusWord(bits(C.FS_M2_BACK, 13))
+    assert status.test(MOTOR_M2)
+    assert not status.test(MOTOR_M1)
+    assert status.test(1 << 13)
+    assert status.bit(C.FS_M2_BACK)
+    # неизвестные биты в flags не попадают
+    assert status.flags == StatusFlag.M2_BACK
@@ -0,0 +1,85 @@
+"""Кольцевые буферы истории опроса"""
+
+import numpy as np
+import pytest
+
+from src.device.timeseries import RingBuffer, TimeSeriesStore
+
+
+def fill(buffer, values, start=0.0, step=1.0):
+    for index, value in enumerate(values):
+        buffer.append(value, start + index * step)
+
+
+def test_last_before_wrap():
+    buffer = RingBuffer(8)
+    fill(buffer, [1, 2, 3])
+    ts, values = buffer.last()
+    assert list(values) == [1, 2, 3]
+    assert list(ts) == [0.0, 1.0, 2.0]
+    assert list(buffer.last(2)[1]) == [2, 3]
+    assert len(buffer) == 3
+
+
+def test_empty_buffer():
+    buffer = RingBuffer(8)
+    ts, values = buffer.last()
+    assert len(ts) == 0 and len(values) == 0
+    assert len(buffer) == 0
+
+
+@pytest.mark.parametrize("total", [7, 8, 9, 15, 16, 17, 100])
+def test_wraparound_is_contiguous(total):
+    capacity = 8
+    buffer = RingBuffer(capacity)
+    fill(buffer, range(total))
+    ts, values = buffer.last()
+    # доступны capacity - 1 последних записей, по порядку и без копирования
+    expected = list(range(max(total - (capacity - 1), 0), total))
+    assert list(values) == expected
+    assert list(ts) == [float(value) for value in expected]
+    assert np.shares_memory(values, buffer._values)
+    assert len(buffer) == len(expected)
+
+
+def test_since_and_snapshot_count():
+    buffer = RingBuffer(8)
+    fill(buffer, range(20))
+    assert list(buffer.since(16.0)[1]) == [16, 17, 18, 19]
+    # окно по снимку count не видит более поздних записей
+    count = buffer.count
+    buffer.append(20, 20.0)
+    assert list(buffer.last(3, count=count)[1]) == [17, 18, 19]
+
+
+def test_intact():
+    buffer = RingBuffer(8)
+    fill(buffer, range(10))
+    count = buffer.count
+    assert buffer.intact(count, 7)
+    buffer.append(10, 10.0)
+    assert buffer.intact(count, 7)
+    buffer.append(11, 11.0)
+    assert not buffer.intact(count, 7)
+
+
+def test_store_window():
+    store = TimeSeriesStore((0x00,), capacity=64)
+    for index in range(10):
+        store.append(0x00, index, timestamp=float(index))
+    ts, values = store.window(0x00, 3.0, now=9.0)
+    assert list(values) == [6, 7, 8, 9]
+    store.append(0x06, 5, timestamp=1.0)
+    assert store.stats()[0x06] == {"samples": 1, "stored": 1}
+
+
+def test_time_weighted_mean():
+    store = TimeSeriesStore((0x00,), capacity=64)
+    # 0 держится 1 с, 10 - 3 с
+    store.append(0x00, 0, timestamp=0.0)
+    store.append(0x00, 10, timestamp=1.0)
+    assert store.time_weighted_mean(0x00, 4.0, now=4.0) == pytest.approx(7.5)
+    # значение, записанное до окна, действует с начала окна
+    assert store.time_weighted_mean(0x00, 2.0, now=4.0) == pytest.approx(10.0)
+    assert store.time_weighted_mean(0x00, 4.0, transform=lambda v: v * 2.0, now=4.0) == pytest.approx(15.0)
+    assert store.time_weighted_mean(0x07, 1.0) is None
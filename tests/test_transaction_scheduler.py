@@ -0,0 +1,162 @@
+"""Порядок выполнения и сроки транзакций TransactionScheduler"""
+
+import threading
+import time
+
+from src import constants as C
+from src.device.transaction_scheduler import TransactionScheduler
+
+
+class FakeController:
+    """Контроллер без порта: журнал обращений, первое обращение ждёт gate"""
+
+    device_id = C.DEFAULT_DEVICE_ID
+    baudrate = C.DEFAULT_BAUDRATE
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.last_tx_time = 0.0
+        # False - порт закрыт: кадры не уходят, last_tx_time не меняется
+        self.sending = True
+        self.wait_ack = []
+
+    def _enter(self):
+        if self.sending:
+            self.last_tx_time = time.perf_counter()
+        if not self.started.is_set():
+            self.started.set()
+            self.gate.wait(2.0)
+
+    def read_registers(self, addresses, out=None, priority=None, **kwargs):
+        self._enter()
+        self.calls.append(("read", tuple(addresses), priority))
+        result = {addr: addr for addr in addresses}
+        if out is not None:
+            out.update(result)
+            return out
+        return result
+
+    def write_registers(self, values, wait_ack=True, priority=None, **kwargs):
+        self._enter()
+        self.calls.append(("write", tuple(values), priority))
+        self.wait_ack.append(wait_ack)
+        return dict.fromkeys(values, wait_ack)
+
+    def is_connected(self):
+        return True
+
+
+def _blocked_scheduler(**kwargs):
+    """Планировщик, рабочий поток которого занят первой транзакцией"""
+    controller = FakeController()
+    scheduler = TransactionScheduler(controller, **kwargs)
+    first = scheduler.submit((0x00,), priority=C.PRIORITY_POLL)
+    assert controller.started.wait(1.0)
+    return controller, scheduler, first
+
+
+def test_priority_order():
+    controller, scheduler, first = _blocked_scheduler()
+    try:
+        poll = scheduler.submit((0x06,), priority=C.PRIORITY_POLL)
+        settings = scheduler.submit((0x0A,), priority=C.PRIORITY_SETTINGS)
+        stop = scheduler.submit(values={0x02: 3}, priority=C.PRIORITY_EMERGENCY)
+        control = scheduler.submit(values={0x03: 1}, priority=C.PRIORITY_CONTROL)
+        controller.gate.set()
+        for future in (first, poll, settings, stop, control):
+            future.result(1.0)
+        order = [call[2] for call in controller.calls[1:]]
+        assert order == [C.PRIORITY_EMERGENCY, C.PRIORITY_CONTROL, C.PRIORITY_SETTINGS, C.PRIORITY_POLL]
+        assert stop.result() == {0x02: True}
+    finally:
+        scheduler.close()
+
+
+def test_fifo_within_priority():
+    controller, scheduler, first = _blocked_scheduler()
+    try:
+        futures = [scheduler.submit((addr,), priority=C.PRIORITY_SETTINGS) for addr in (0x0A, 0x0B, 0x0C)]
+        controller.gate.set()
+        for future in futures:
+            future.result(1.0)
+        assert [call[1] for call in controller.calls[1:]] == [(0x0A,), (0x0B,), (0x0C,)]
+    finally:
+        scheduler.close()
+
+
+def test_expired_request_is_not_sent():
+    controller, scheduler, first = _blocked_scheduler()
+    try:
+        late = scheduler.submit((0x0A, 0x0B), priority=C.PRIORITY_SETTINGS, deadline=0.0)
+        late_write = scheduler.submit(values={0x05: 1}, priority=C.PRIORITY_CONTROL, deadline=0.0)
+        time.sleep(0.01)
+        controller.gate.set()
+        assert late.result(1.0) == {0x0A: None, 0x0B: None}
+        assert late_write.result(1.0) == {0x05: False}
+        assert len(controller.calls) == 1
+        assert scheduler.stats[C.PRIORITY_SETTINGS].expired == 1
+        assert scheduler.stats[C.PRIORITY_CONTROL].expired == 1
+    finally:
+        scheduler.close()
+
+
+def test_stop_preempts_long_poll_burst():
+    controller = FakeController()
+    scheduler = TransactionScheduler(controller, preempt_frames=1)
+    try:
+        burst = scheduler.submit((0x00, 0x06, 0x07), priority=C.PRIORITY_POLL)
+        assert controller.started.wait(1.0)
+        # первая часть пакета опроса в работе - аварийная команда уходит следующей
+        stop = scheduler.submit(values={0x02: 3}, priority=C.PRIORITY_EMERGENCY)
+        controller.gate.set()
+        assert burst.result(1.0) == {0x00: 0x00, 0x06: 0x06, 0x07: 0x07}
+        stop.result(1.0)
+        assert [call[:2] for call in controller.calls] == [
+            ("read", (0x00,)), ("write", (0x02,)), ("read", (0x06,)), ("read", (0x07,))]
+    finally:
+        scheduler.close()
+
+
+def test_pending_requests_resolved_on_close():
+    controller, scheduler, first = _blocked_scheduler()
+    pending = scheduler.submit((0x0A,), priority=C.PRIORITY_SETTINGS)
+    closer = threading.Thread(target=scheduler.close)
+    closer.start()
+    controller.gate.set()
+    closer.join(2.0)
+    assert pending.result(1.0) == {}
+
+
+def test_submit_after_close_resolves_immediately():
+    scheduler = TransactionScheduler(FakeController())
+    scheduler.close()
+    assert scheduler.submit((0x0A,), priority=C.PRIORITY_SETTINGS).result(0.1) == {0x0A: None}
+    assert scheduler.submit(values={0x02: 3}, priority=C.PRIORITY_EMERGENCY).result(0.1) == {0x02: False}
+
+
+def test_write_without_ack_is_passed_to_controller():
+    controller, scheduler, first = _blocked_scheduler()
+    try:
+        assert scheduler.write_registers({0x0A: 1}, wait_ack=False) == {0x0A: False}
+        controller.gate.set()
+        assert scheduler.write_registers({0x0B: 2}) == {0x0B: True}
+        assert controller.wait_ack == [False, True]
+    finally:
+        scheduler.close()
+
+
+def test_unsent_request_counted_as_missed():
+    controller, scheduler, first = _blocked_scheduler()
+    try:
+        controller.gate.set()
+        first.result(1.0)
+        controller.sending = False
+        scheduler.read_register(0x0A)
+        stats = scheduler.latency_stats()
+        assert stats["settings"]["missed"] == 1
+        assert stats["settings"]["count"] == 0
+        assert stats["poll"]["count"] == 1
+    finally:
+        scheduler.close()
@@ -0,0 +1,132 @@
+"""Проверка раскладки битов кадра VMK и потокового декодера"""
+
+import random
+
+import pytest
+
+from src.crc import crc7_generate
+from src.vmk_codec import (
+    FRAME_MARKER, FRAME_SIZE, WRITE_FLAG,
+    VmkCodec, VmkStreamDecoder, build_frame, decode_value_at, frame_crc,
+)
+
+
+@pytest.mark.parametrize("data, high", [
+    (0x0000, 0b00),
+    (0x4000, 0b01),   # D14
+    (0x8000, 0b10),   # D15
+    (0xC000, 0b11),
+    (0xFFFF, 0b11),
+    (0x3FFF, 0b00),
+])
+def test_high_bits_in_byte1(data, high):
+    frame = build_frame(0x03, 0x10, write=True, data=data)
+    # D15 - бит 4, D14 - бит 3 первого байта
+    assert (frame[0] >> 3) & 0x03 == high
+    assert frame[0] >> 4 & 1 == data >> 15 & 1
+    assert frame[0] >> 3 & 1 == data >> 14 & 1
+    assert decode_value_at(frame, 0) == data
+
+
+def test_data_roundtrip_all_high_combinations():
+    rng = random.Random(1)
+    for _ in range(2000):
+        data = rng.randrange(0x10000)
+        frame = build_frame(rng.randrange(8), rng.randrange(128), rng.random() < 0.5, data)
+        assert decode_value_at(frame, 0) == data
+        assert frame[2] == (data >> 7) & 0x7F
+        assert frame[3] == data & 0x7F
+
+
+def test_low_bytes_keep_top_bit_clear():
+    frame = build_frame(0x07, 0x7F, write=True, data=0xFFFF)
+    assert frame[0] & FRAME_MARKER == FRAME_MARKER
+    assert all(byte & 0x80 == 0 for byte in frame[1:])
+
+
+def test_frame_crc_matches_crc7_generate():
+    rng = random.Random(2)
+    for _ in range(5000):
+        b1, b2, b3, b4 = (rng.randrange(256) for _ in range(4))
+        assert frame_crc(b1, b2, b3, b4) == crc7_generate([b1, b2, b3, b4])
+
+
+def test_built_frame_crc():
+    frame = build_frame(0x03, 0x2A, write=False, data=0x1234)
+    assert frame[4] == crc7_generate(frame[:4])
+
+
+def test_write_flag():
+    assert build_frame(0x03, 0x01, write=True)[0] & WRITE_FLAG
+    assert not build_frame(0x03, 0x01, write=False)[0] & WRITE_FLAG
+    assert VmkCodec(0x03).write_frame(0x01, 5)[0] & WRITE_FLAG
+    assert not VmkCodec(0x03).read_frame(0x01)[0] & WRITE_FLAG
+
+
+@pytest.mark.parametrize("device_id", [0x00, 0x03, 0x07, 0x08, 0x0B, 0xFF])
+def test_device_id_masked(device_id):
+    frame = build_frame(device_id, 0x01, write=True, data=0xC000)
+    assert frame[0] & 0x07 == device_id & 0x07
+    # ID не задевает биты D15/D14 и признак записи
+    assert frame[0] & ~0x07 == FRAME_MARKER | WRITE_FLAG | 0x18
+    assert VmkCodec(device_id).device_id == device_id & 0x07
+
+
+def test_codec_decode_checks_id_and_address():
+    codec = VmkCodec(0x03)
+    frame = build_frame(0x03, 0x05, data=0xBEEF)
+    assert codec.decode(frame) == 0xBEEF
+    assert codec.decode(frame, expected_address=0x05) == 0xBEEF
+    assert codec.decode(frame, expected_address=0x06) is None
+    assert codec.decode(build_frame(0x02, 0x05, data=0xBEEF)) is None
+
+
+def test_stream_decoder_split_chunks():
+    decoder = VmkStreamDecoder(0x03)
+    data = build_frame(0x03, 0x01, data=1) + build_frame(0x03, 0x02, data=0xFFFF)
+    out = []
+    for pos in range(0, len(data), 3):
+        out += decoder.feed(data[pos:pos + 3], timestamp=0.0)
+    assert [(addr, value) for _, addr, value, _ in out] == [(0x01, 1), (0x02, 0xFFFF)]
+    assert decoder.pending_bytes() == 0
+
+
+def test_stream_decoder_resync_after_garbage():
+    decoder = VmkStreamDecoder(0x03)
+    garbage = bytes([0x12, 0xC3, 0x7F, 0x00])
+    out = decoder.feed(garbage + build_frame(0x03, 0x0A, data=0x8001), timestamp=0.0)
+    assert [(addr, value) for _, addr, value, _ in out] == [(0x0A, 0x8001)]
+    assert decoder.resyncs == 1
+    assert decoder.dropped_bytes == len(garbage)
+
+
+def test_stream_decoder_resync_after_crc_error():
+    decoder = VmkStreamDecoder(0x03)
+    bad = bytearray(build_frame(0x03, 0x0B, data=0x0042))
+    bad[4] ^= 0x01
+    good = build_frame(0x03, 0x0C, data=0x4321)
+    out = decoder.feed(bytes(bad) + good, timestamp=0.0)
+    assert [(addr, value) for _, addr, value, _ in out] == [(0x0C, 0x4321)]
+    assert decoder.crc_errors == 1
+    assert decoder.resyncs == 1
+    assert decoder.dropped_bytes == FRAME_SIZE
+
+
+def test_stream_decoder_lost_byte():
+    decoder = VmkStreamDecoder(0x03)
+    first = build_frame(0x03, 0x01, data=0x0101)
+    second = build_frame(0x03, 0x02, data=0x0202)
+    out = decoder.feed(first[:2] + first[3:] + second, timestamp=0.0)
+    assert [(addr, value) for _, addr, value, _ in out] == [(0x02, 0x0202)]
+
+
+def test_stream_decoder_filters_device():
+    decoder = VmkStreamDecoder(0x03)
+    out = decoder.feed(build_frame(0x05, 0x01, data=7) + build_frame(0x03, 0x02, data=9), timestamp=1.0)
+    assert out == [(0x03, 0x02, 9, 1.0)]
+
+
+def test_stream_decoder_reports_write_flag():
+    decoder = VmkStreamDecoder(with_write=True)
+    out = decoder.feed(build_frame(0x05, 0x01, write=True, data=7) + build_frame(0x03, 0x02), timestamp=1.0)
+    assert out == [(0x05, 0x01, 7, 1.0, True), (0x03, 0x02, 0, 1.0, False)]
@@ -0,0 +1,32 @@
+"""
+Сводный отчёт по файлу захвата (NumPy, без загрузки файла в память целиком):
+    python -m tools.analyze_capture run.vmkcap
+    python -m tools.analyze_capture run.vmkcap --device-id 3 --top 5
+"""
+
+import argparse
+import json
+import time
+
+from src import constants as C
+from src.device.capture_analyzer import load_capture, decode_records, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="файл захвата")
+    parser.add_argument("--device-id", type=int, default=C.DEFAULT_DEVICE_ID)
+    parser.add_argument("--top", type=int, default=10, help="сколько самых длинных серий ошибок показать")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    baudrate, records = load_capture(args.path)
+    frames = decode_records(records)
+    report = summary(frames, args.device_id, args.top)
+    report["baudrate"] = baudrate
+    report["analysis_s"] = time.perf_counter() - start
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Серия циклов подачи без оператора с журналом циклов и подсчётом проб в час:
+    python -m tools.batch_run --runs 20 --gap 5 --out runs.jsonl
+    python -m tools.batch_run --runs 20 --manual --port COM3 --baudrate 38400
+    python -m tools.batch_run --runs 5 --simulator
+
+Порт, скорость и MOTOR_SPEED_* берутся из config.json (если есть), ключи
+командной строки их переопределяют. --simulator - эмулятор на pty (Linux).
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from src import constants as C
+from src.device.batch_runner import BatchRunner
+from src.device.device_model import DeviceModel
+from src.device.device_poller import DevicePoller
+from src.device.serial_device_controller import SerialDeviceController
+from src.device.transaction_scheduler import TransactionScheduler
+
+CONFIG = {"port": "COM3", "baudrate": 38400, "device_id": 3, "MOTOR_SPEED_1": 137270, "MOTOR_SPEED_2": 1405000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="число циклов")
+    parser.add_argument("--gap", type=float, default=C.BATCH_GAP, help="пауза между циклами, с")
+    parser.add_argument("--manual", action="store_true", help="цикл ведёт хост (ручной старт)")
+    parser.add_argument("--fast-back", action="store_true", help="ускоренное движение назад")
+    parser.add_argument("--out", default="batch_runs.jsonl", help="журнал циклов (дописывается)")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--port", default=None)
+    parser.add_argument("--baudrate", type=int, default=None)
+    parser.add_argument("--simulator", action="store_true")
+    args = parser.parse_args()
+
+    config = dict(CONFIG)
+    if Path(args.config).exists():
+        with open(args.config, encoding="utf-8") as f:
+            config.update(json.load(f))
+    simulator = None
+    if args.simulator:
+        from src.device.simulator import VmkSimulator
+        simulator = VmkSimulator(device_ids=(config["device_id"],), travel=2000)
+        config["port"] = simulator.start()
+    if args.port:
+        config["port"] = args.port
+    if args.baudrate:
+        config["baudrate"] = args.baudrate
+
+    controller = SerialDeviceController(port=config["port"], baudrate=config["baudrate"],
+                                        device_id=config["device_id"])
+    scheduler = TransactionScheduler(controller)
+    poller = DevicePoller(scheduler, interval=0.005)
+    model = DeviceModel(scheduler, config, poller)
+    model.init_command_loger(print)
+    model.increase_back_speed = args.fast_back
+    if not model.connect(config["port"], config["baudrate"]):
+        print(f"[ERROR] Нет соединения с {config['port']}")
+        return
+
+    runner = BatchRunner(model, args.runs, gap=args.gap, manual=args.manual, path=args.out)
+    runner.start()
+    try:
+        runner.wait()
+    except KeyboardInterrupt:
+        runner.cancel("прервано оператором")
+    finally:
+        model.disconnect()
+        scheduler.close()
+        if simulator is not None:
+            simulator.stop()
+    print(json.dumps(runner.stats(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Сравнение задержки запросов при конкурентной нагрузке:
+SerialDeviceController (потоки + блокировка) и AsyncSerialDeviceController (asyncio).
+
+Устройство эмулируется на псевдотерминале (только Linux):
+    python -m tools.bench_async_controller --clients 8 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from src import constants as C
+from src.device.serial_device_controller import SerialDeviceController
+from src.device.async_serial_device_controller import AsyncSerialDeviceController
+from src.device.simulator import VmkSimulator
+
+
+def start_pty_device(device_id=C.DEFAULT_DEVICE_ID, turnaround=0.0005, on_frame=None):
+    """
+    VMK-устройство на pty (VmkSimulator) для бенчмарков.
+
+    :param on_frame: callback(address, timestamp) на каждый принятый кадр
+    """
+    callback = None
+    if on_frame is not None:
+        def callback(_, address, __, timestamp):
+            on_frame(address, timestamp)
+    return VmkSimulator((device_id,), latency=turnaround, on_frame=callback).start()
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    if not latencies:
+        return {}
+
+    def pick(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": latencies[-1] * 1000}
+
+
+def bench_threaded(port, clients, requests):
+    controller = SerialDeviceController(port=port)
+    controller.connect()
+    latencies = []
+    errors = []
+
+    def client(index):
+        address = index % 16
+        for _ in range(requests):
+            start = time.perf_counter()
+            if controller.read_register(address) is None:
+                errors.append(address)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    controller.disconnect()
+    return dict(percentiles(latencies), tps=len(latencies) / elapsed, errors=len(errors))
+
+
+async def bench_async(port, clients, requests):
+    controller = AsyncSerialDeviceController(port=port)
+    await controller.connect()
+    latencies = []
+    errors = []
+
+    async def client(index):
+        address = index % 16
+        for _ in range(requests):
+            start = time.perf_counter()
+            if await controller.read_register(address) is None:
+                errors.append(address)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    bursts = controller.bursts
+    await controller.disconnect()
+    return dict(percentiles(latencies), tps=len(latencies) / elapsed, errors=len(errors),
+                frames_per_burst=len(latencies) / max(bursts, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--turnaround", type=float, default=0.0005, help="задержка ответа устройства, с")
+    args = parser.parse_args()
+
+    port = start_pty_device(turnaround=args.turnaround)
+    result = {
+        "clients": args.clients,
+        "requests": args.requests,
+        "threaded": bench_threaded(port, args.clients, args.requests),
+        "async": asyncio.run(bench_async(port, args.clients, args.requests)),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Масштабирование FeederFarm по числу портов: суммарное число транзакций в секунду
+при опросе 1..N эмулированных дозаторов на отдельных псевдотерминалах (только Linux):
+    python -m tools.bench_feeder_farm --ports 4 --duration 3
+"""
+
+import argparse
+import json
+import os
+import time
+
+from src.device.feeder_farm import FeederFarm
+from tools.bench_async_controller import start_pty_device
+
+CONFIG = {"MOTOR_SPEED_1": 1000.0, "MOTOR_SPEED_2": 1000.0}
+
+
+def bench_farm(ports, duration, turnaround):
+    names = [start_pty_device(turnaround=turnaround) for _ in range(ports)]
+    farm = FeederFarm([{"port": name} for name in names], CONFIG)
+    farm.start()
+    time.sleep(0.3)
+    before = sum(slot.samples for slot in farm.slots.values())
+    start = time.perf_counter()
+    time.sleep(duration)
+    samples = sum(slot.samples for slot in farm.slots.values()) - before
+    elapsed = time.perf_counter() - start
+    status = farm.status()
+    farm.stop()
+    return {
+        "ports": ports,
+        "tps": samples / elapsed,
+        "failures": sum(item["failures"] for item in status.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ports", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--turnaround", type=float, default=0.0005, help="время ответа устройства, с")
+    args = parser.parse_args()
+
+    results = []
+    for ports in range(1, args.ports + 1):
+        result = bench_farm(ports, args.duration, args.turnaround)
+        base = results[0]["tps"] if results else result["tps"]
+        result["scaling"] = result["tps"] / (base * ports) if base else 0.0
+        results.append(result)
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Бенчмарк канала связи: SerialDeviceController и DevicePoller против эмулятора
+дозатора на pty (только Linux) для набора скоростей порта, интервалов опроса
+и размеров набора регистров. Результат - JSON для сравнения между запусками:
+    python -m tools.bench_protocol --out bench.json
+    python -m tools.bench_protocol --baseline bench.json --tolerance 0.2
+"""
+
+import argparse
+import json
+import platform
+import time
+
+from src.device.device_model import DeviceModel
+from src.device.device_poller import DevicePoller
+from src.device.serial_device_controller import SerialDeviceController
+from src.device.simulator import VmkSimulator
+from tools.bench_async_controller import percentiles
+
+CONFIG = {"MOTOR_SPEED_1": 137270, "MOTOR_SPEED_2": 1405000}
+
+
+def start_simulator(args, baudrate):
+    simulator = VmkSimulator(latency=args.latency, jitter=args.jitter, loss=args.loss,
+                             corruption=args.corruption, baudrate=baudrate, seed=args.seed)
+    return simulator, simulator.start()
+
+
+def bench_controller(args, baudrate, size):
+    """Пакетное чтение size регистров подряд в течение args.duration"""
+    simulator, port = start_simulator(args, baudrate)
+    controller = SerialDeviceController(port=port, baudrate=baudrate)
+    controller.connect()
+    addresses = tuple(range(size))
+    values = {}
+    latencies = []
+    missing = 0
+    deadline = time.perf_counter() + args.duration
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        values.clear()
+        t0 = time.perf_counter()
+        controller.read_registers(addresses, out=values)
+        latencies.append(time.perf_counter() - t0)
+        missing += sum(1 for addr in addresses if values.get(addr) is None)
+    elapsed = time.perf_counter() - start
+    decoder = controller.decoder.stats()
+    timeouts = controller.timeouts
+    controller.disconnect()
+    simulator.stop()
+
+    transactions = len(latencies)
+    return dict(
+        percentiles(latencies),
+        baudrate=baudrate,
+        registers=size,
+        transactions=transactions,
+        tps=transactions / elapsed,
+        registers_per_s=(transactions * size - missing) / elapsed,
+        error_rate=missing / (transactions * size) if transactions else 0.0,
+        # посылка, закончившаяся таймаутом, повторяется следующим циклом
+        retry_rate=timeouts / transactions if transactions else 0.0,
+        crc_errors=decoder["crc_errors"],
+        resyncs=decoder["resyncs"],
+    )
+
+
+def bench_poller(args, baudrate, interval):
+    """Цикл DevicePoller + DeviceModel с заданным интервалом опроса"""
+    simulator, port = start_simulator(args, baudrate)
+    controller = SerialDeviceController(port=port, baudrate=baudrate)
+    poller = DevicePoller(controller, interval=interval)
+    model = DeviceModel(controller, CONFIG, poller)
+    # все регистры с одним периодом interval (без частот и политики DeviceModel)
+    poller.init_polling_config(model.polling_config)
+    poller.init_policy(None)
+    cycles = []
+    poller.init_func_calc_update_from_poller(lambda: cycles.append(time.perf_counter()))
+    model.connect(port, baudrate)
+    time.sleep(args.duration)
+    poller.stop()
+    model.disconnect()
+    simulator.stop()
+
+    periods = [b - a for a, b in zip(cycles, cycles[1:])]
+    elapsed = cycles[-1] - cycles[0] if len(cycles) > 1 else 0.0
+    return dict(
+        percentiles(periods),
+        baudrate=baudrate,
+        interval_ms=interval * 1000,
+        registers=len(poller.polling_config),
+        cycles_per_s=len(periods) / elapsed if elapsed else 0.0,
+        retry_rate=controller.timeouts / len(cycles) if cycles else 0.0,
+        # гистограммы опроса и контроллера: цикл, опоздание пробуждения, ожидание порта, задержка ответа
+        histograms=dict(poller.metrics.snapshot(), **controller.metrics.snapshot()),
+    )
+
+
+def compare(result, baseline, tolerance):
+    """Сравнение с предыдущим запуском: ухудшение tps или p99 больше чем на tolerance"""
+    regressions = []
+    for section, key, keys in (("controller", ("baudrate", "registers"), ("tps", "p99_ms")),
+                               ("poller", ("baudrate", "interval_ms"), ("cycles_per_s", "p99_ms"))):
+        old = {tuple(item[k] for k in key): item for item in baseline.get(section, [])}
+        for item in result[section]:
+            prev = old.get(tuple(item[k] for k in key))
+            if prev is None:
+                continue
+            rate, latency = keys
+            label = f"{section} " + ", ".join(f"{k}={item[k]}" for k in key)
+            if prev[rate] and item[rate] < prev[rate] * (1 - tolerance):
+                regressions.append(f"{label}: {rate} {prev[rate]:.1f} → {item[rate]:.1f}")
+            if prev[latency] and item[latency] > prev[latency] * (1 + tolerance):
+                regressions.append(f"{label}: {latency} {prev[latency]:.2f} → {item[latency]:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baudrates", type=int, nargs="+", default=[9600, 38400, 115200])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 8, 16], help="регистров в посылке")
+    parser.add_argument("--intervals", type=float, nargs="+", default=[0.0, 0.005, 0.02],
+                        help="интервалы DevicePoller, с")
+    parser.add_argument("--duration", type=float, default=1.0, help="длительность одного замера, с")
+    parser.add_argument("--latency", type=float, default=0.0005, help="время ответа устройства, с")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0, help="вероятность потери байта ответа")
+    parser.add_argument("--corruption", type=float, default=0.0, help="вероятность искажения байта ответа")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="файл для результата (JSON)")
+    parser.add_argument("--baseline", help="результат предыдущего запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение, доля")
+    args = parser.parse_args()
+
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "controller": [bench_controller(args, baudrate, size)
+                       for baudrate in args.baudrates for size in args.sizes],
+        "poller": [bench_poller(args, baudrate, interval)
+                   for baudrate in args.baudrates for interval in args.intervals],
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"[REGRESSION] {line}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Задержка от вызова motor1_stop() до прихода кадра остановки в устройство
+при насыщенном фоновом опросе: напрямую через SerialDeviceController
+и через TransactionScheduler.
+
+Время прихода кадра фиксирует эмулятор устройства на pty (только Linux):
+    python -m tools.bench_stop_latency --stops 50 --turnaround 0.002
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from src import constants as C
+from src.device.device_model import DeviceModel
+from src.device.device_poller import DevicePoller
+from src.device.serial_device_controller import SerialDeviceController
+from src.device.transaction_scheduler import TransactionScheduler
+from tools.bench_async_controller import start_pty_device, percentiles
+
+CONFIG = {"MOTOR_SPEED_1": 137270, "MOTOR_SPEED_2": 1405000}
+
+
+def run(use_scheduler, stops, turnaround, poll_threads):
+    arrivals = []
+    port = start_pty_device(turnaround=turnaround,
+                            on_frame=lambda address, ts: address == C.REG_COM_M1 and arrivals.append(ts))
+    controller = SerialDeviceController(port=port)
+    front = TransactionScheduler(controller) if use_scheduler else controller
+    poller = DevicePoller(front, interval=0)
+    model = DeviceModel(front, CONFIG, poller)
+    # все регистры с одним периодом interval (без частот и политики DeviceModel)
+    poller.init_polling_config(model.polling_config)
+    poller.init_policy(None)
+    model.connect(port)
+
+    # дополнительная нагрузка опросом поверх DevicePoller
+    running = True
+
+    def load():
+        while running:
+            front.read_registers((C.REG_STATUS, C.REG_PERIOD_M1, C.REG_PERIOD_M2), priority=C.PRIORITY_POLL)
+
+    threads = [threading.Thread(target=load, daemon=True) for _ in range(poll_threads)]
+    for t in threads:
+        t.start()
+
+    latencies = []
+    for _ in range(stops):
+        time.sleep(random.uniform(0.005, 0.02))
+        arrivals.clear()
+        start = time.perf_counter()
+        model.motor1_stop()
+        if arrivals:
+            latencies.append(arrivals[0] - start)
+
+    running = False
+    for t in threads:
+        t.join(timeout=1.0)
+    model.disconnect()
+    result = dict(percentiles(latencies), lost=stops - len(latencies))
+    if use_scheduler:
+        result["scheduler"] = front.latency_stats()
+        front.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stops", type=int, default=50)
+    parser.add_argument("--turnaround", type=float, default=0.002, help="задержка ответа устройства, с")
+    parser.add_argument("--poll-threads", type=int, default=2, help="дополнительные потоки опроса")
+    args = parser.parse_args()
+    result = {
+        "direct": run(False, args.stops, args.turnaround, args.poll_threads),
+        "scheduler": run(True, args.stops, args.turnaround, args.poll_threads),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
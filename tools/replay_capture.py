@@ -0,0 +1,47 @@
+"""
+Воспроизведение файла захвата через декодер и DeviceModel (быстрее реального времени):
+    python -m tools.replay_capture run.vmkcap
+    python -m tools.replay_capture run.vmkcap --speed 10
+    python -m tools.replay_capture run.vmkcap --profile
+"""
+
+import argparse
+import cProfile
+import json
+import pstats
+
+from src.device.capture import ReplayController, replay
+from src.device.device_model import DeviceModel
+
+CONFIG = {"MOTOR_SPEED_1": 137270, "MOTOR_SPEED_2": 1405000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="файл захвата")
+    parser.add_argument("--device-id", type=int, default=None)
+    parser.add_argument("--speed", type=float, default=None, help="ускорение (по умолчанию - без пауз)")
+    parser.add_argument("--profile", action="store_true", help="профиль декодера и модели (cProfile)")
+    args = parser.parse_args()
+
+    controller = ReplayController()
+    model = DeviceModel(controller, CONFIG)
+    model.init_command_loger(lambda message: None)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    result = replay(args.path, model, args.device_id, args.speed)
+    if profiler is not None:
+        profiler.disable()
+
+    result["model_writes"] = len(controller.writes)
+    result["status_flags"] = dict(model.status_flags)
+    result["last_values"] = {f"0x{addr:02X}": val for addr, val in sorted(model.last_values.items())}
+    print(json.dumps(result, indent=2))
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+
+if __name__ == "__main__":
+    main()